@@ -0,0 +1,65 @@
+"""Throughput of per-chunk vs batched decoding in TranscriptionWorker.
+
+    python -m benchmarks.bench_batching grabacion1.wav [grabacion2.wav ...] \
+        [--batch-size 4] [--model small] [--device cpu]
+
+The recordings are split into CHUNK_SECONDS chunks with AudioBuffer, tagged
+alternately MIC/SISTEMA, and decoded once one chunk at a time and once in
+batches of --batch-size.
+"""
+import argparse
+import time
+
+from transcriber import transcription
+from transcriber.audio_io import load_audio
+from transcriber.buffer import AudioBuffer, SAMPLE_RATE
+from transcriber.transcription import TranscriptionWorker
+
+
+def _chunks(paths):
+    chunks = []
+    for path in paths:
+        buf = AudioBuffer("BENCH", lambda c, s, t: chunks.append(c))
+        buf.push(load_audio(path))
+        buf.flush()
+    sources = ("MIC", "SISTEMA")
+    return [(c, sources[i % 2], 0.0) for i, c in enumerate(chunks)]
+
+
+def _run(worker, items, batch_size):
+    results = []
+    worker.on_result = lambda text, source, info: results.append((source, text))
+    t0 = time.perf_counter()
+    for i in range(0, len(items), batch_size):
+        worker._process_batch(items[i:i + batch_size])
+    return time.perf_counter() - t0, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--model", default=transcription.MODEL_SIZE)
+    parser.add_argument("--device", default="auto")
+    parser.add_argument("--compute-type", default="default")
+    args = parser.parse_args()
+
+    from faster_whisper import WhisperModel
+
+    items = _chunks(args.files)
+    audio_seconds = sum(len(it[0]) for it in items) / SAMPLE_RATE
+    worker = TranscriptionWorker(on_result=None)
+    worker.use_model(WhisperModel(args.model, device=args.device, compute_type=args.compute_type))
+
+    # Primera pasada descartada: calienta el modelo
+    _run(worker, items[:args.batch_size], args.batch_size)
+
+    print(f"{len(items)} chunks, {audio_seconds:.1f}s de audio, modelo {args.model}")
+    for name, size in (("por chunk", 1), (f"lote x{args.batch_size}", args.batch_size)):
+        elapsed, results = _run(worker, items, size)
+        print(f"{name:>12}: {elapsed:7.2f}s  {len(items) / elapsed:6.2f} chunks/s  "
+              f"RTF {elapsed / audio_seconds:.3f}  ({len(results)} resultados)")
+
+
+if __name__ == "__main__":
+    main()
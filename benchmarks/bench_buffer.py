@@ -0,0 +1,65 @@
+"""Micro-benchmark: per-push cost of AudioBuffer vs the old np.concatenate buffer.
+
+    python -m benchmarks.bench_buffer
+
+Pushes 4096-frame blocks (the capture block size) into buffers whose chunk
+size grows well past CHUNK_SECONDS. The concatenate version copies the whole
+pending buffer on every push, so its cost grows with the chunk size; the ring
+buffer only copies the incoming block.
+"""
+import threading
+import time
+
+import numpy as np
+
+from transcriber.buffer import AudioBuffer, SAMPLE_RATE
+
+BLOCK = 4096
+CHUNK_SECONDS_CASES = (4, 30, 120, 600)
+
+
+class ConcatBuffer:
+    """Copia de la implementacion anterior (np.concatenate en cada push)."""
+
+    def __init__(self, source, on_chunk_ready, chunk_samples):
+        self.source = source
+        self.on_chunk_ready = on_chunk_ready
+        self.chunk_samples = chunk_samples
+        self._buffer = np.array([], dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def push(self, audio):
+        with self._lock:
+            self._buffer = np.concatenate([self._buffer, audio])
+            while len(self._buffer) >= self.chunk_samples:
+                chunk = self._buffer[:self.chunk_samples].copy()
+                self._buffer = self._buffer[self.chunk_samples:]
+                self.on_chunk_ready(chunk, self.source, None)
+
+
+def _time_pushes(buf, n_pushes):
+    block = np.random.default_rng(0).standard_normal(BLOCK).astype(np.float32)
+    times = np.empty(n_pushes)
+    for i in range(n_pushes):
+        t0 = time.perf_counter()
+        buf.push(block)
+        times[i] = time.perf_counter() - t0
+    return times * 1e6
+
+
+def main():
+    print(f"{'chunk_s':>8} {'impl':>8} {'mean_us':>9} {'p99_us':>9} {'max_us':>9}")
+    for chunk_seconds in CHUNK_SECONDS_CASES:
+        chunk_samples = SAMPLE_RATE * chunk_seconds
+        n_pushes = 2 * chunk_samples // BLOCK + 1
+        for name, buf in (
+            ("concat", ConcatBuffer("BENCH", lambda c, s, t: None, chunk_samples)),
+            ("ring", AudioBuffer("BENCH", lambda c, s, t: None, chunk_samples=chunk_samples)),
+        ):
+            us = _time_pushes(buf, n_pushes)
+            print(f"{chunk_seconds:>8} {name:>8} {us.mean():>9.1f} "
+                  f"{np.percentile(us, 99):>9.1f} {us.max():>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
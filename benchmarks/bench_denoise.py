@@ -0,0 +1,71 @@
+"""CPU cost of the streaming denoiser vs per-chunk noisereduce.
+
+    python -m benchmarks.bench_denoise [--fixture llamada.wav]
+
+noisereduce (the old TranscriptionWorker._denoise path) re-estimates the
+noise and runs a full STFT/ISTFT on every 4 s chunk on the model thread.
+StreamingDenoiser runs on DSP-sized blocks and keeps its noise profile.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from transcriber.audio_io import load_audio
+from transcriber.buffer import CHUNK_SAMPLES, SAMPLE_RATE
+from transcriber.denoise import StreamingDenoiser
+
+from .harness import default_fixture, latency_stats
+
+DSP_BLOCK = 4096 * SAMPLE_RATE // 48000   # bloque de captura a 48 kHz, ya en 16 kHz
+
+
+def _noisereduce(audio):
+    try:
+        import noisereduce as nr
+    except ImportError:
+        return None
+    times = []
+    for start in range(0, len(audio) - CHUNK_SAMPLES + 1, CHUNK_SAMPLES):
+        chunk = audio[start:start + CHUNK_SAMPLES]
+        t0 = time.perf_counter()
+        nr.reduce_noise(y=chunk, sr=SAMPLE_RATE, stationary=True, prop_decrease=0.75)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _streaming(audio):
+    denoiser = StreamingDenoiser()
+    times = []
+    for start in range(0, len(audio), DSP_BLOCK):
+        t0 = time.perf_counter()
+        denoiser.process(audio[start:start + DSP_BLOCK])
+        times.append(time.perf_counter() - t0)
+    return times, denoiser
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture")
+    args = parser.parse_args()
+
+    audio = load_audio(args.fixture or default_fixture())
+    seconds = len(audio) / SAMPLE_RATE
+    # ruido de fondo para que el denoiser no tome el camino "senal limpia"
+    audio = audio + 0.01 * np.random.default_rng(0).standard_normal(len(audio)).astype(np.float32)
+
+    times, denoiser = _streaming(audio)
+    print(f"{'streaming':>12}: {sum(times) / seconds * 1000:7.2f} ms CPU por s de audio, "
+          f"por bloque {latency_stats(times)['p95_ms']:.2f} ms p95, "
+          f"{denoiser.clean_frames}/{denoiser.processed_frames} frames sin FFT")
+
+    times = _noisereduce(audio)
+    if times is None:
+        print(f"{'noisereduce':>12}: no instalado")
+        return
+    print(f"{'noisereduce':>12}: {sum(times) / seconds * 1000:7.2f} ms CPU por s de audio, "
+          f"por chunk {latency_stats(times)['p95_ms']:.2f} ms p95 (en el hilo del modelo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Per-source overhead of AudioCapture with 1 to 8 concurrent sources.
+
+    python -m benchmarks.bench_sources [--fixture llamada.wav] [--sources 1,2,4,8] \
+        [--seconds 10] [--stub-rtf 0.02] [--workers 2]
+
+Every source replays the fixture through its own FileCaptureSource, DSP
+chain, AudioBuffer and SpeechGate inside one AudioCapture, and the chunks go
+to a TranscriptionPool with a stub model, as in the app. For each number of
+sources two runs are made:
+
+  - flat out (speed 0): DSP time per second of audio per source, and how many
+    times real time the whole capture side runs;
+  - real time (speed 1, --seconds): CPU used per source, and the block
+    latency from the capture callback to AudioBuffer. If p95 stays near the
+    DSP cost of one block, the sources keep up; if it grows over the run,
+    the DSP thread is falling behind.
+"""
+import argparse
+import threading
+import time
+
+from transcriber.audio_capture import AudioCapture
+from transcriber.buffer import CHUNK_SAMPLES
+from transcriber.pool import TranscriptionPool
+from transcriber.sources import FileCaptureSource
+
+from .harness import StubModel, default_fixture, latency_stats
+
+SOURCE_COUNTS = (1, 2, 4, 8)
+
+
+class _TimedCapture(AudioCapture):
+    """AudioCapture that records how long each block took to reach its AudioBuffer."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    def _push(self, name, audio, captured_at):
+        self.latencies.append(time.monotonic() - captured_at)
+        super()._push(name, audio, captured_at)
+
+
+def _pool(stub_rtf, workers):
+    done = threading.Semaphore(0)
+    pool = TranscriptionPool(on_result=lambda text, source, info: None, num_workers=workers,
+                             max_queued_seconds=10 ** 6)
+    for w in pool.workers:
+        w.use_model(StubModel(stub_rtf))
+    pool.on_done = lambda source: done.release()
+    pool.start()
+    return pool, done
+
+
+def _run(fixture, n, speed, seconds, stub_rtf, workers):
+    pool, done = _pool(stub_rtf, workers)
+    enqueued = [0]
+
+    def on_chunk(chunk, source, captured_at):
+        enqueued[0] += 1
+        pool.enqueue(chunk, source, captured_at)
+
+    capture = _TimedCapture(on_chunk, chunk_samples=CHUNK_SAMPLES, echo_mode=None)
+    sources = [FileCaptureSource(f"F{i}", fixture, speed=speed) for i in range(n)]
+    for source in sources:
+        capture.add_source(source)
+
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    capture.start()
+    if speed > 0:
+        time.sleep(seconds)
+    else:
+        for source in sources:
+            source.wait()
+    capture.stop()      # procesa todo lo ya enviado al DSP
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    for _ in range(enqueued[0]):
+        done.acquire()
+    pool.stop()
+
+    audio_seconds = n * (sources[0].duration if speed == 0 else seconds * speed)
+    return {
+        "wall": wall,
+        "realtime_x": audio_seconds / wall,
+        "ms_per_audio_s": cpu * 1000 / audio_seconds,
+        "cpu_per_source": cpu / wall / n,
+        "chunks": enqueued[0],
+        "latency": latency_stats(capture.latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixture", help="WAV a usar (por defecto uno sintetico de 60 s)")
+    parser.add_argument("--sources", default=",".join(map(str, SOURCE_COUNTS)))
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="duracion de la pasada en tiempo real")
+    parser.add_argument("--stub-rtf", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    fixture = args.fixture or default_fixture()
+    # Primera pasada descartada: importa scipy y disena los filtros del resampler
+    _run(fixture, 1, 0, args.seconds, args.stub_rtf, args.workers)
+    print(f"{'fuentes':>7} {'x t.real':>9} {'ms/s audio':>10} | "
+          f"{'CPU/fuente':>10} {'p50_ms':>7} {'p95_ms':>7} {'max_ms':>7} {'chunks':>6}")
+    for n in map(int, args.sources.split(",")):
+        flat = _run(fixture, n, 0, args.seconds, args.stub_rtf, args.workers)
+        live = _run(fixture, n, 1, args.seconds, args.stub_rtf, args.workers)
+        lat = live["latency"]
+        print(f"{n:>7} {flat['realtime_x']:>9.1f} {flat['ms_per_audio_s']:>10.2f} | "
+              f"{live['cpu_per_source']:>10.1%} {lat['p50_ms']:>7.1f} {lat['p95_ms']:>7.1f} "
+              f"{lat['max_ms']:>7.1f} {live['chunks']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Shared pieces for the benchmark suite: fixtures, stub model, stats, result files."""
+import glob
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+from transcriber.buffer import SAMPLE_RATE
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+# ---------------------------------------------------------------------- #
+#  Fixtures                                                               #
+# ---------------------------------------------------------------------- #
+
+def make_fixture(path: str, seconds=60, rate=48000, channels=2, seed=0):
+    """Writes a synthetic speech-like WAV: voiced bursts with pauses over background noise.
+
+    Good enough to exercise capture, DSP and buffering; use a real recording
+    (--fixture) when the model output matters.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    audio = 0.01 * rng.standard_normal(n)
+    pos = 0
+    while pos < n:
+        burst = int(rng.uniform(0.3, 2.5) * rate)
+        f0 = rng.uniform(90, 250)
+        seg = t[pos:pos + burst]
+        env = np.sin(np.pi * np.linspace(0, 1, len(seg))) ** 0.5
+        voiced = sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 8))
+        audio[pos:pos + burst] += 0.3 * env * voiced * (1 + 0.3 * np.sin(2 * np.pi * 4 * seg))
+        pos += burst + int(rng.uniform(0.2, 1.5) * rate)
+    audio /= max(1.0, np.abs(audio).max() / 0.9)
+    pcm = (np.repeat(audio[:, None], channels, axis=1) * 32767).astype("<i2")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+    return path
+
+
+def default_fixture() -> str:
+    path = os.path.join(FIXTURES_DIR, "synthetic_48k_stereo_60s.wav")
+    if not os.path.exists(path):
+        make_fixture(path)
+    return path
+
+
+# ---------------------------------------------------------------------- #
+#  Modelo de prueba                                                       #
+# ---------------------------------------------------------------------- #
+
+class StubModel:
+    """Stands in for WhisperModel: sleeps rtf * audio duration and returns fixed text."""
+
+    def __init__(self, rtf=0.1, text="hola"):
+        self.rtf = rtf
+        self.text = text
+
+    def transcribe(self, audio, **kwargs):
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(self.rtf * duration)
+        word = SimpleNamespace(start=0.0, end=min(duration, 0.5), word=" " + self.text)
+        segment = SimpleNamespace(text=" " + self.text, words=[word])
+        return iter([segment]), SimpleNamespace(duration=duration)
+
+
+# ---------------------------------------------------------------------- #
+#  Estadisticas y resultados                                              #
+# ---------------------------------------------------------------------- #
+
+def latency_stats(seconds: list) -> dict:
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+class PeakMemory:
+    """Context manager: peak Python/numpy allocation (MB) inside the block."""
+
+    def __enter__(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        self.peak_mb = (tracemalloc.get_traced_memory()[1] - self._base) / 1e6
+        if self._started:
+            tracemalloc.stop()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "nogit"
+
+
+def save_results(results: dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d_%H%M%S')}_{results['commit']}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def latest_results(exclude: str | None = None) -> str | None:
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(current: dict, previous: dict):
+    """Prints every numeric metric next to the previous run and the relative change."""
+    print(f"\nComparado con {previous['commit']} ({previous['time']}):")
+    for stage, values in current["stages"].items():
+        old_stage = previous["stages"].get(stage, {})
+        for key, value in _flatten(values):
+            old = dict(_flatten(old_stage)).get(key)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {stage:>10} {key:<28} {old:>12.3f} -> {value:>12.3f}  {change}")
+
+
+def _flatten(d: dict, prefix=""):
+    for key, value in d.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
@@ -0,0 +1,198 @@
+"""Reproducible benchmark suite for the capture -> transcribe -> UI pipeline.
+
+    python -m benchmarks.run [--fixture llamada.wav] [--speed 0] \
+        [--stages capture,buffer,worker,waveform] [--real-model small]
+
+Feeds a WAV fixture through a FileSource (the same block size as the capture
+callbacks, no sound card needed) and reports throughput, latency percentiles
+and peak memory per stage. Results are saved to benchmarks/results/ and
+compared with the previous run.
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from transcriber.buffer import AudioBuffer, CHUNK_SAMPLES, SAMPLE_RATE
+from transcriber.dsp import DSPStage
+from transcriber.file_source import FileSource
+from transcriber.transcription import TranscriptionWorker
+
+from .harness import (
+    PeakMemory, StubModel, compare, default_fixture, git_commit, latency_stats,
+    latest_results, save_results,
+)
+
+STAGES = ("capture", "buffer", "worker", "waveform")
+
+
+def bench_capture(fixture, speed):
+    """FileSource -> DSPStage -> AudioBuffer, as in AudioCapture."""
+    latencies = []
+    chunks = []
+    dsp = DSPStage(SAMPLE_RATE)
+    buf = AudioBuffer("BENCH", lambda c, s, t: chunks.append(c))
+
+    def sink(audio, captured_at):
+        buf.push(audio, captured_at)
+        latencies.append(time.monotonic() - captured_at)
+
+    with PeakMemory() as mem:
+        source = FileSource(fixture, lambda f: dsp.submit("BENCH", f), speed=speed)
+        dsp.add_chain("BENCH", source.channels, source.rate, sink)
+        t0 = time.perf_counter()
+        dsp.start()
+        source.start()
+        source.wait()
+        dsp.stop()
+        wall = time.perf_counter() - t0
+    return {
+        "audio_seconds": source.duration,
+        "wall_seconds": wall,
+        "realtime_x": source.duration / wall,
+        "chunks": len(chunks),
+        "block_latency": latency_stats(latencies),
+        "peak_mb": mem.peak_mb,
+    }
+
+
+def _resampled(fixture):
+    from transcriber.audio_io import load_audio
+    return load_audio(fixture)
+
+
+def bench_buffer(audio):
+    block = 4096 * SAMPLE_RATE // 48000
+    buf = AudioBuffer("BENCH", lambda c, s, t: None)
+    times = []
+    with PeakMemory() as mem:
+        for start in range(0, len(audio), block):
+            t0 = time.perf_counter()
+            buf.push(audio[start:start + block])
+            times.append(time.perf_counter() - t0)
+    return {"push_latency": latency_stats(times), "peak_mb": mem.peak_mb}
+
+
+def bench_worker(audio, model, speed, name):
+    """Chunks enqueued at capture pace (speed) into a running TranscriptionWorker."""
+    chunks = [audio[i:i + CHUNK_SAMPLES] for i in range(0, len(audio), CHUNK_SAMPLES)]
+    latencies = []
+    done = threading.Semaphore(0)
+
+    def on_result(text, source, info):
+        latencies.append(time.monotonic() - info["captured_at"])
+
+    worker = TranscriptionWorker(on_result=on_result, max_queued_seconds=10 ** 6)
+    worker.use_model(model)
+    # el worker solo avisa cuando hay texto: contar chunks procesados aparte
+    process = worker._process_batch
+    worker._process_batch = lambda items: (process(items), [done.release() for _ in items])
+
+    with PeakMemory() as mem:
+        worker.start()
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            worker.enqueue(chunk, "SISTEMA")
+            if speed > 0:
+                time.sleep(len(chunk) / SAMPLE_RATE / speed)
+        for _ in chunks:
+            done.acquire()
+        wall = time.perf_counter() - t0
+        worker.stop()
+    audio_seconds = len(audio) / SAMPLE_RATE
+    return {
+        "model": name,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "rtf": wall / audio_seconds,
+        "chunks": len(chunks),
+        "result_latency": latency_stats(latencies),
+        "peak_mb": mem.peak_mb,
+    }
+
+
+def bench_waveform(fixture, frames=200):
+    """Capture-side envelope decimation plus the widget's per-frame geometry."""
+    try:
+        from ui.waveform import WaveformWidget, bar_coords
+    except ImportError as e:
+        return {"skipped": f"ui no disponible: {e}"}
+    from transcriber.audio_io import read_audio
+    from transcriber.dsp import EnvelopeDecimator
+
+    audio, rate = read_audio(fixture)
+    audio = audio.mean(axis=1)
+    decimator = EnvelopeDecimator(rate)
+    ring = np.zeros((WaveformWidget._BAR_COUNT, 2), dtype=np.float32)
+    block = 4096
+    push, draw = [], []
+    with PeakMemory() as mem:
+        for i in range(frames):
+            start = (i * block) % max(1, len(audio) - block)
+            t0 = time.perf_counter()
+            peaks = decimator.process(audio[start:start + block])
+            push.append(time.perf_counter() - t0)
+            if peaks is not None:
+                ring = np.concatenate([ring, peaks])[-WaveformWidget._BAR_COUNT:]
+            t0 = time.perf_counter()
+            bar_coords(ring, 400, 52).tolist()
+            draw.append(time.perf_counter() - t0)
+    return {"push_latency": latency_stats(push), "frame_latency": latency_stats(draw),
+            "peak_mb": mem.peak_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline.")
+    parser.add_argument("--fixture", help="WAV a usar (por defecto uno sintetico de 60 s)")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="1 = tiempo real, 0 = lo mas rapido posible")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--stub-rtf", type=float, default=0.1)
+    parser.add_argument("--real-model", default="small",
+                        help="modelo faster-whisper en CPU si esta instalado ('none' para omitir)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    fixture = args.fixture or default_fixture()
+    stages = args.stages.split(",")
+    results = {"commit": git_commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "fixture": fixture, "speed": args.speed, "stages": {}}
+    audio = _resampled(fixture)
+
+    if "capture" in stages:
+        results["stages"]["capture"] = bench_capture(fixture, args.speed)
+    if "buffer" in stages:
+        results["stages"]["buffer"] = bench_buffer(audio)
+    if "worker" in stages:
+        results["stages"]["worker_stub"] = bench_worker(
+            audio, StubModel(args.stub_rtf), args.speed, f"stub rtf={args.stub_rtf}"
+        )
+        if args.real_model != "none":
+            try:
+                from faster_whisper import WhisperModel
+                model = WhisperModel(args.real_model, device="cpu", compute_type="int8")
+            except Exception as e:
+                print(f"[WARN] Modelo real omitido: {e}")
+            else:
+                results["stages"]["worker_real"] = bench_worker(
+                    audio, model, args.speed, args.real_model
+                )
+    if "waveform" in stages:
+        results["stages"]["waveform"] = bench_waveform(fixture)
+
+    print(json.dumps(results, indent=2))
+    if not args.no_save:
+        path = save_results(results)
+        print(f"[OK] Resultados en {path}")
+        previous = latest_results(exclude=path)
+    else:
+        previous = latest_results()
+    if previous:
+        with open(previous, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,253 @@
+import time
+
+_LAUNCH = time.perf_counter()
+
+import os
+import sqlite3
 import threading
+from datetime import datetime
 
+from transcriber.archive import AudioArchive
 from transcriber.audio_capture import AudioCapture
-from transcriber.transcription import TranscriptionWorker
-from ui.app import App
+from transcriber.autotune import ensure_profile, load_profile, profile_tiers
+from transcriber.buffer import CHUNK_SAMPLES, SAMPLE_RATE
+from transcriber.fingerprint import FingerprintCache
+from transcriber.idle import IDLE_SECONDS, STATE_LOADED, IdleEvictor
+from transcriber.inference import InferenceProcess
+from transcriber.journal import JOURNAL_DIR, SessionJournal, recover_sessions
+from transcriber.metrics import COUNTER_FP_CHECKED, COUNTER_FP_HIT, metrics, startup
+from transcriber.pool import TranscriptionPool
+from transcriber.quality import QualityController
+from transcriber.refine import Refiner
+from transcriber.search import SEARCH_DB, SearchIndex, session_name
+from transcriber.sources import DEFAULT_SOURCES, KIND_LOOPBACK, parse_sources
+from transcriber.streaming import STEP_SAMPLES
+from transcriber.transcript import entry_time
+
+# Re-decodifica una ventana creciente cada STEP_SECONDS y muestra texto parcial,
+# en lugar de esperar chunks fijos de CHUNK_SECONDS.
+STREAMING = True
+STATS_INTERVAL_MS = 1000
+LOADER_POLL_MS = 100
+# Workers con el modelo compartido y los nucleos repartidos entre ellos; cada
+# fuente queda fija en uno (por turnos si hay mas fuentes); 1 = un solo worker
+WORKERS = int(os.environ.get("TRANSCRIPTOR_WORKERS", "2"))
+# Modelo y denoise en un proceso hijo supervisado (el audio pasa por memoria
+# compartida); asi la decodificacion no compite por el GIL con Tk y la captura
+INFERENCE_PROCESS = os.environ.get("TRANSCRIPTOR_PROCESS", "1") != "0"
+# Bajar beam/modelo si no se alcanza el tiempo real (precarga el modelo de respaldo)
+ADAPTIVE_QUALITY = True
+# Calibrar modelo/hilos/beam/chunk para este equipo en el primer arranque (y si
+# cambia el hardware); `python -m transcriber.autotune --force` recalibra
+AUTOTUNE = os.environ.get("TRANSCRIPTOR_AUTOTUNE", "1") != "0"
+# Descargar el modelo tras este tiempo sin captura (0 = nunca); se recarga al Iniciar
+IDLE_UNLOAD_SECONDS = float(os.environ.get("TRANSCRIPTOR_IDLE_MIN", IDLE_SECONDS / 60)) * 60
+# Reconocer audio repetido del SISTEMA (musica de espera, menus IVR) y no decodificarlo de nuevo
+FINGERPRINT_CACHE = os.environ.get("TRANSCRIPTOR_FP_CACHE", "1") != "0"
+# Fuentes al arrancar, separadas por ";" (ver transcriber.sources.parse_source); se
+# pueden agregar y quitar mas durante la captura desde el panel "Fuentes"
+SOURCES = os.environ.get("TRANSCRIPTOR_SOURCES", DEFAULT_SOURCES)
+# Ruta .json/.csv para volcar las metricas del pipeline periodicamente
+METRICS_PATH = os.environ.get("TRANSCRIPTOR_METRICS")
+# Carpeta del journal de sesiones (resultados en disco, recuperables tras un crash)
+JOURNAL_PATH = os.environ.get("TRANSCRIPTOR_JOURNAL", JOURNAL_DIR)
+# Carpeta para guardar el audio de cada sesion y refinar la transcripcion con un
+# modelo mas grande cuando hay margen (o al detener). En vivo se usa LIVE_MODEL.
+ARCHIVE_PATH = os.environ.get("TRANSCRIPTOR_ARCHIVE")
+LIVE_MODEL = "small"
+REFINE_IDLE_RTF = 0.5
+# Indice SQLite FTS5 de los resultados de todas las sesiones ("" = sin busqueda)
+SEARCH_PATH = os.environ.get("TRANSCRIPTOR_SEARCH", SEARCH_DB)
 
 
 def main():
-    worker = TranscriptionWorker(on_result=None)
-    capture = AudioCapture(on_chunk_ready=None)
+    startup.begin(_LAUNCH)
+    startup.mark("imports")
+    profile = load_profile(streaming=STREAMING) if AUTOTUNE else None
+    quality = QualityController() if ADAPTIVE_QUALITY else None
+    if quality and profile:
+        quality.tiers = profile_tiers(profile)
+    cache = FingerprintCache() if FINGERPRINT_CACHE else None
+    if INFERENCE_PROCESS:
+        worker = InferenceProcess(on_result=None, streaming=STREAMING, num_workers=WORKERS,
+                                  quality=quality, cache=cache)
+    else:
+        worker = TranscriptionPool(on_result=None, streaming=STREAMING, num_workers=WORKERS,
+                                   quality=quality, cache=cache)
+    evictor = IdleEvictor(worker, IDLE_UNLOAD_SECONDS) if IDLE_UNLOAD_SECONDS > 0 else None
+
+    # El modelo carga en paralelo con la UI: el hilo no toca Tk, deja el
+    # estado en `loader` y la app lo consulta cada LOADER_POLL_MS
+    loader = {"status": None, "ready": False}
+    shown = threading.Event()
+
+    def load_model():
+        def progress(msg):
+            loader["status"] = msg
+
+        try:
+            tuned = profile
+            if AUTOTUNE and tuned is None:
+                progress("Calibrando este equipo (solo la primera vez)...")
+                tuned = ensure_profile(progress_callback=progress, streaming=STREAMING)
+                if quality:
+                    quality.tiers = profile_tiers(tuned)
+            kwargs = {}
+            if tuned:
+                kwargs = dict(device=tuned["device"], compute_type=tuned["compute_type"],
+                              model_size=tuned["model"], cpu_threads=tuned["cpu_threads"])
+            if ARCHIVE_PATH:
+                kwargs["model_size"] = LIVE_MODEL
+            worker.load_model(progress_callback=progress, **kwargs)
+        except Exception as e:
+            loader["status"] = f"Error cargando modelo: {e}"
+            print(f"[ERROR] Modelo: {e}")
+            return
+        worker.start(warm_up=True)
+        if evictor:
+            evictor.capture_stopped()     # aun sin captura: cuenta como inactivo
+        loader["ready"] = True
+        worker.ready.wait()
+        shown.wait()
+        print(f"[OK] Arranque: {startup.report()}")
+
+    threading.Thread(target=load_model, daemon=True).start()
+
+    capture = AudioCapture(
+        on_chunk_ready=None,
+        # el chunk calibrado rige desde el arranque siguiente a la calibracion
+        chunk_samples=STEP_SAMPLES if STREAMING else (
+            profile["chunk_seconds"] * SAMPLE_RATE if profile else CHUNK_SAMPLES),
+        # los pasos del streaming deben ser contiguos: descartar silencio, no recortar,
+        # y confirmar la ventana cuando termina la voz (si no, nadie la vuelve a decodificar)
+        trim_silence=not STREAMING,
+        on_silence=worker.finish if STREAMING else None,
+        # con proceso de inferencia el denoise de las entradas corre alla
+        denoise=not INFERENCE_PROCESS,
+    )
+
+    def add_source(source):
+        capture.add_source(source)      # ValueError si el nombre ya esta en uso
+        if INFERENCE_PROCESS and source.denoise:
+            worker.denoise_sources.add(source.name)
+        if cache and source.kind == KIND_LOOPBACK:
+            cache.add_source(source.name)   # otra salida: tambien puede repetir musica de espera
+
+    for source in parse_sources(SOURCES):
+        add_source(source)
 
-    def on_result(text, source):
-        app.after(0, lambda: app.append_text(text, source))
+    archive = refiner = None
+    if ARCHIVE_PATH:
+        archive = AudioArchive(os.path.join(ARCHIVE_PATH, datetime.now().strftime("%Y%m%d_%H%M%S")))
+        capture.archive = archive
 
     def on_start():
+        if refiner:
+            refiner.resume()
+        if evictor:
+            evictor.capture_started()     # recarga en segundo plano; el audio espera en cola
         capture.start()
 
     def on_stop():
         capture.stop()
+        worker.finish()
+        if evictor:
+            evictor.capture_stopped()
+        if refiner:
+            refiner.finish()
 
-    worker.on_result = on_result
     capture.on_chunk_ready = worker.enqueue
 
-    app = App(on_start=on_start, on_stop=on_stop)
+    # fuente quitada: confirmar su texto pendiente una vez que salio su ultimo chunk
+    def on_source_removed(name):
+        worker.finish(name)
+        if INFERENCE_PROCESS:
+            worker.remove_source(name)      # ring y denoise nuevos si la fuente vuelve
 
-    capture.on_waveform = lambda audio, source: app.after(
-        0, lambda a=audio, s=source: app.push_waveform(a, s)
-    )
+    capture.on_source_removed = on_source_removed
 
-    def load_model():
-        worker.load_model(
-            progress_callback=lambda msg: app.after(
-                0, lambda m=msg: app.set_status(f"● {m}", "#F0A500")
-            )
-        )
-        worker.start()
-        app.after(0, app.set_ready)
+    journal = SessionJournal(JOURNAL_PATH, resume=recover_sessions(JOURNAL_PATH))
+    search = None
+    if SEARCH_PATH:
+        try:
+            search = SearchIndex(SEARCH_PATH)
+            search.index_journals(JOURNAL_PATH)     # sesiones pasadas, en segundo plano
+        except sqlite3.Error as e:
+            print(f"[WARN] Busqueda desactivada (SQLite sin FTS5?): {e}")
+    with startup.phase("ui"):
+        from ui.app import App   # diferido: customtkinter se importa mientras carga el modelo
+        app = App(on_start=on_start, on_stop=on_stop, store=journal, search=search,
+                  sources=capture.sources, on_add_source=add_source,
+                  on_remove_source=capture.remove_source)
 
-    threading.Thread(target=load_model, daemon=True).start()
+    # Resultados y parciales se encolan sin tocar Tk; la app los dibuja por lotes
+    # Indexado incremental: cada resultado entra al indice al llegar
+    def on_result(text, source, info=None):
+        app.post_result(text, source, info)
+        if search:
+            search.add(session_name(journal.path), source, text, entry_time(info or {}))
+
+    def post_refined(source, start, end, entries):
+        app.post_refined(source, start, end, entries)
+        if search:
+            search.replace(session_name(journal.path), source, start, end, entries)
+
+    worker.on_result = on_result
+    worker.on_partial = app.set_partial
+
+    if archive:
+        def is_idle():
+            queued = sum(s["queued_seconds"] for s in worker.queue_stats().values())
+            return queued == 0 and metrics.rtf() < REFINE_IDLE_RTF
+
+        # con el proceso hijo, el modelo grande se carga alla y no en el de la UI
+        refiner = Refiner(archive, post_refined, is_idle=is_idle,
+                          decoder=worker.refine if INFERENCE_PROCESS else None)
+        refiner.start()
+
+    # push_waveform no toca Tk: el widget redibuja en su propio ciclo de 50 ms
+    capture.on_waveform = app.push_waveform
+
+    def poll_loader():
+        if loader["ready"]:
+            app.set_ready()
+            startup.mark("listo")
+            shown.set()
+            return
+        if loader["status"]:
+            app.set_status(f"● {loader['status']}", "#F0A500")
+        app.after(LOADER_POLL_MS, poll_loader)
+
+    def refresh_stats():
+        depth = sum(s["queued_chunks"] for s in worker.queue_stats().values())
+        line = metrics.status_line(depth)
+        if quality:
+            line += f" · calidad {quality.tier.name}"
+        checked = metrics.counter(COUNTER_FP_CHECKED)
+        if checked:
+            line += f" · cache {metrics.counter(COUNTER_FP_HIT) / checked:.0%}"
+        if evictor and evictor.state != STATE_LOADED:
+            line += f" · modelo {evictor.state}"
+        app.set_stats(line)
+        app.after(STATS_INTERVAL_MS, refresh_stats)
+
+    poll_loader()
+    app.after(STATS_INTERVAL_MS, refresh_stats)
+    if METRICS_PATH:
+        metrics.start_dump(METRICS_PATH)
 
     app.mainloop()
+    if evictor:
+        evictor.stop()
     worker.stop()
+    if refiner:
+        refiner.stop()
+        archive.close()
+        archive.compress()
+    journal.close()
+    if search:
+        search.close()
+    metrics.stop_dump()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+import wave
+
+import numpy as np
+
+from transcriber.audio_io import load_audio
+
+
+def test_segments_join_like_the_whole_file(tmp_path):
+    rate = 44100
+    frames = np.random.default_rng(0).integers(-3000, 3000, (rate * 5 + 123, 2), dtype="<i2")
+    path = str(tmp_path / "estereo.wav")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(frames.tobytes())
+
+    whole = load_audio(path)
+    segments = [load_audio(path, start, 2 * rate) for start in range(0, len(frames), 2 * rate)]
+    np.testing.assert_array_equal(np.concatenate(segments), whole)
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from transcriber.buffer import SAMPLE_RATE
+from transcriber.transcription import TranscriptionWorker
+
+# Primer intento (temperatura 0) por chunk: (textos de segmentos, avg_logprob,
+# compression_ratio, no_speech_prob), o None si el VAD no encuentra voz
+ATTEMPTS = {
+    1: ([" hola", " que tal"], -0.3, 1.2, 0.1),
+    2: ([" mm"], -1.5, 1.0, 0.9),                    # silencio: se descarta
+    3: ([" si si si si si si"], -0.2, 3.1, 0.1),     # repetitivo: reintento con temperatura
+    4: ([" algo"], -1.4, 1.1, 0.2),                  # poco probable: reintento con temperatura
+    5: None,
+}
+FALLBACK = {3: [" si"], 4: [" algo mas"]}
+
+
+class FallbackModel:
+    """transcribe() with faster-whisper's rules over the scripted attempts."""
+
+    def transcribe(self, audio, **kw):
+        key = int(audio[0])
+        attempt = ATTEMPTS[key]
+        if attempt is None:
+            return iter([]), None
+        texts, avg_logprob, ratio, no_speech = attempt
+        if no_speech > kw["no_speech_threshold"] and avg_logprob < kw["log_prob_threshold"]:
+            texts = []
+        elif ratio > kw["compression_ratio_threshold"] or avg_logprob < kw["log_prob_threshold"]:
+            texts = FALLBACK[key]
+        return iter([SimpleNamespace(text=t) for t in texts]), None
+
+
+def _worker(batch_size):
+    worker = TranscriptionWorker(on_result=None, batch_size=batch_size)
+    worker.use_model(FallbackModel())
+    worker._decode_batch = lambda model, audios, beam_size: [
+        ATTEMPTS[int(a[0])] for a in audios
+    ]
+    return worker
+
+
+def test_batched_text_matches_single_chunks():
+    items = [(np.full(SAMPLE_RATE, key, dtype=np.float32), "MIC", 0.0) for key in ATTEMPTS]
+    single = _worker(1)
+    expected = [single.transcribe_chunks([item])[0] for item in items]
+    assert expected == ["hola que tal", "", "si", "algo mas", ""]
+    assert _worker(len(items)).transcribe_chunks(items) == expected
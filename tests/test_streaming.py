@@ -0,0 +1,72 @@
+import numpy as np
+
+from transcriber.buffer import SAMPLE_RATE
+from transcriber.streaming import MAX_WINDOW_SECONDS, StreamWindow
+from transcriber.transcription import TranscriptionWorker
+
+
+class _Word:
+    def __init__(self, start, end, word):
+        self.start, self.end, self.word = start, end, word
+
+
+class _Segment:
+    def __init__(self, words):
+        self.words = [_Word(*w) for w in words]
+        self.text = "".join(w.word for w in self.words)
+
+
+class ScriptedModel:
+    """Returns the next scripted list of (start, end, word) on every transcribe()."""
+
+    def __init__(self, script):
+        self.script = list(script)
+
+    def transcribe(self, audio, **kwargs):
+        words = self.script.pop(0)
+        return iter([_Segment(words)] if words else []), None
+
+
+def _worker(script):
+    results = []
+    worker = TranscriptionWorker(on_result=lambda text, source, info: results.append(text),
+                                 streaming=True)
+    worker.use_model(ScriptedModel(script))
+    return worker, results
+
+
+def _seconds(s):
+    return np.zeros(int(s * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_forced_commit_resets_agreement():
+    worker, results = _worker([
+        [(0.0, 0.5, " hola"), (0.5, 1.0, " que")],
+        [(0.0, 0.5, " hola"), (0.5, 1.0, " que"), (14.0, 14.5, " tal")],
+        [(0.1, 0.4, " hola")],
+    ])
+    window = StreamWindow("MIC")
+    window.append(_seconds(2), 0.0)
+    worker._decode_window(window)
+    window.append(_seconds(MAX_WINDOW_SECONDS), 0.0)
+    worker._decode_window(window)       # ventana llena: se confirma todo
+    assert results == ["hola que tal"]
+    assert 0 < window.seconds < MAX_WINDOW_SECONDS
+    # "hola" de nuevo no debe coincidir con la hipotesis ya confirmada
+    worker._decode_window(window)
+    assert results == ["hola que tal"]
+
+
+def test_drop_silence_resets_agreement():
+    worker, results = _worker([
+        [(0.2, 0.6, " hola")],
+        [],
+        [(0.2, 0.6, " hola")],
+    ])
+    window = StreamWindow("MIC")
+    window.append(_seconds(3), 0.0)
+    worker._decode_window(window)
+    worker._decode_window(window)       # sin palabras: se descarta la ventana
+    assert window.seconds <= 1.0
+    worker._decode_window(window)
+    assert results == []
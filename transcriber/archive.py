@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+
+INDEX_NAME = "index.jsonl"
+INDEX_SECONDS = 1.0          # un registro de indice por segundo de audio (por fuente)
+GAP_SECONDS = 0.25           # hueco entre bloques que corta una "corrida" continua
+# Nombres de dispositivo que Windows no deja usar como archivo
+_RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL",
+                   *(f"{p}{i}" for p in ("COM", "LPT") for i in range(1, 10))}
+
+
+def _file_stem(source: str) -> str:
+    """File name (without extension) for a source's audio.
+
+    The source name itself when it is safe on every system; otherwise the
+    name with unsafe characters replaced plus a hash of the real name, so
+    two sources never share a file. index.jsonl keeps the real name.
+    """
+    stem = re.sub(r"[^\w\- ]", "_", source).strip()
+    if stem == source and stem and stem.upper() not in _RESERVED_NAMES:
+        return stem
+    return f"{stem}-{hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _wall(captured_at: float) -> float:
+    """time.monotonic() capture stamp -> wall-clock seconds (time.time())."""
+    return time.time() - (time.monotonic() - captured_at)
+
+
+class AudioArchive:
+    """On-disk store of the resampled 16 kHz audio, per source, indexed by capture time.
+
+    Each source is one raw int16 file (<source>.pcm, see _file_stem) that is
+    only appended to, so it can be memory-mapped while it grows. index.jsonl
+    holds one record per ~INDEX_SECONDS: {"source", "offset", "samples",
+    "end"}, where "end" is the wall-clock capture time of the record's last
+    sample. Writes go through
+    a writer thread, so append() is cheap enough for the DSP thread.
+    compress() turns finished .pcm files into FLAC (needs soundfile).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._index: dict[str, list] = {}          # source -> [(offset, samples, end)]
+        self._lock = threading.Lock()
+        self._load_index()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _pcm_path(self, source: str) -> str:
+        return os.path.join(self.directory, f"{_file_stem(source)}.pcm")
+
+    def _flac_path(self, source: str) -> str:
+        return os.path.join(self.directory, f"{_file_stem(source)}.flac")
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_NAME)
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    break       # linea cortada al final
+                self._index.setdefault(r["source"], []).append((r["offset"], r["samples"], r["end"]))
+
+    # ------------------------------------------------------------------ #
+    #  Escritura                                                          #
+    # ------------------------------------------------------------------ #
+
+    def append(self, source: str, audio: np.ndarray, captured_at: float):
+        """16 kHz float audio whose last sample was captured at captured_at (monotonic)."""
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+        self._queue.put((source, pcm, _wall(captured_at)))
+
+    def _writer(self):
+        files = {}
+        pending = {}    # source -> [offset, samples, end] aun sin registro de indice
+        index = open(os.path.join(self.directory, INDEX_NAME), "a", encoding="utf-8")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                for src in list(pending):
+                    self._write_index(index, src, pending.pop(src))
+                for f in files.values():
+                    f.flush()
+                index.flush()
+                item.set()
+                continue
+
+            source, pcm, end = item
+            f = files.get(source)
+            if f is None:
+                f = files[source] = open(self._pcm_path(source), "ab")
+            offset = f.tell() // 2
+            f.write(pcm.tobytes())
+
+            rec = pending.get(source)
+            contiguous = rec is not None and abs(end - len(pcm) / SAMPLE_RATE - rec[2]) < GAP_SECONDS
+            if rec is not None and not contiguous:
+                self._write_index(index, source, pending.pop(source))
+                rec = None
+            if rec is None:
+                pending[source] = [offset, len(pcm), end]
+            else:
+                rec[1] += len(pcm)
+                rec[2] = end
+                if rec[1] >= INDEX_SECONDS * SAMPLE_RATE:
+                    self._write_index(index, source, pending.pop(source))
+
+        for src in list(pending):
+            self._write_index(index, src, pending.pop(src))
+        for f in files.values():
+            f.close()
+        index.close()
+
+    def _write_index(self, index, source, rec):
+        offset, samples, end = rec
+        index.write(json.dumps({"source": source, "offset": offset, "samples": samples,
+                                "end": round(end, 4)}) + "\n")
+        with self._lock:
+            self._index.setdefault(source, []).append((offset, samples, end))
+
+    def sync(self):
+        """Blocks until everything appended so far is written and indexed."""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # ------------------------------------------------------------------ #
+    #  Lectura                                                            #
+    # ------------------------------------------------------------------ #
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            return list(self._index)
+
+    def runs(self, source: str) -> list[tuple[float, float, int]]:
+        """Contiguous capture runs: (start_time, end_time, first_offset), in order.
+
+        Stopping and restarting capture leaves a gap in time but not in the
+        file, so anything that maps time to samples must stay inside a run.
+        """
+        with self._lock:
+            records = list(self._index.get(source, ()))
+        runs = []
+        for offset, samples, end in records:
+            start = end - samples / SAMPLE_RATE
+            if runs and abs(start - runs[-1][1]) < GAP_SECONDS and offset == runs[-1][3]:
+                runs[-1][1] = end
+                runs[-1][3] = offset + samples
+            else:
+                runs.append([start, end, offset, offset + samples])
+        return [(s, e, o) for s, e, o, _ in runs]
+
+    def read(self, source: str, start: float, end: float) -> np.ndarray:
+        """Float32 audio captured in [start, end] (wall-clock), which must lie in one run."""
+        for run_start, run_end, offset in self.runs(source):
+            if run_start - GAP_SECONDS <= start <= run_end:
+                i0 = offset + int(round((max(start, run_start) - run_start) * SAMPLE_RATE))
+                i1 = offset + int(round((min(end, run_end) - run_start) * SAMPLE_RATE))
+                return self._samples(source, i0, max(i0, i1))
+        return np.zeros(0, dtype=np.float32)
+
+    def _samples(self, source: str, i0: int, i1: int) -> np.ndarray:
+        flac = self._flac_path(source)
+        if os.path.exists(flac):
+            from .audio_io import read_audio
+            audio, _ = read_audio(flac, i0, i1 - i0)
+            return audio[:, 0]
+        path = self._pcm_path(source)
+        if not os.path.exists(path) or os.path.getsize(path) < 2 * i1:
+            self.sync()
+        mm = np.memmap(path, dtype="<i2", mode="r")
+        return mm[i0:i1].astype(np.float32) / 32767
+
+    def compress(self):
+        """Rewrites every source as FLAC (about half the size) once capture has ended."""
+        self.sync()
+        try:
+            import soundfile as sf
+        except ImportError:
+            print("[WARN] soundfile no instalado: el archivo de audio queda sin comprimir")
+            return
+        for source in self.sources():
+            path = self._pcm_path(source)
+            if not os.path.exists(path):
+                continue
+            mm = np.memmap(path, dtype="<i2", mode="r")
+            sf.write(self._flac_path(source), np.asarray(mm), SAMPLE_RATE, subtype="PCM_16")
+            del mm
+            os.remove(path)
+            print(f"[OK] Audio {source} comprimido: {self._flac_path(source)}")
@@ -1,137 +1,206 @@
 import threading
-from math import gcd
+import time
 
-import numpy as np
-import sounddevice as sd
-
-from .buffer import AudioBuffer, SAMPLE_RATE
+from .buffer import AudioBuffer, CHUNK_SAMPLES, SAMPLE_RATE
+from .denoise import StreamingDenoiser
+from .dsp import DSPStage
+from .echo import EchoDetector, MODE_SUPPRESS
+from .gate import SpeechGate
+from .metrics import STAGE_CALLBACK, metrics
+from .sources import KIND_INPUT, KIND_LOOPBACK, CaptureSource, SourceUnavailable
 
 
 class AudioCapture:
-    """Manages two capture threads: microphone and WASAPI loopback."""
-
-    def __init__(self, on_chunk_ready, on_waveform=None):
+    """Registry of capture sources: microphones, loopback outputs, files and pipes.
+
+    add_source() attaches a CaptureSource (transcriber.sources) under its
+    name, before or during capture, and remove_source() detaches it. Every
+    source gets its own DSP chain and AudioBuffer, and its chunks reach
+    on_chunk_ready tagged with its name. The stream callbacks only copy raw
+    frames into the DSPStage, which downmixes, resamples and denoises
+    (sources with denoise=True, unless denoise=False here) on its own thread
+    before AudioBuffer.
+
+    With echo_mode set, the first loopback source is the reference of one
+    EchoDetector per input source, and input chunks that are speaker echo
+    are suppressed (or have the echo subtracted) before they reach
+    on_chunk_ready.
+
+    With speech_gate, each AudioBuffer drops chunks without speech (and,
+    with trim_silence, trims their leading/trailing silence) before they
+    are emitted. If on_silence is set, silent chunks after speech still go
+    out, and on_silence(name) follows once the pause reaches
+    SILENCE_COMMIT_SECONDS (streaming: commit the window instead of leaving
+    its last words partial).
+    """
+
+    def __init__(self, on_chunk_ready, on_waveform=None, chunk_samples=CHUNK_SAMPLES,
+                 denoise=True, echo_mode=MODE_SUPPRESS, speech_gate=True, trim_silence=True,
+                 on_silence=None):
         self.on_chunk_ready = on_chunk_ready
-        self.on_waveform = on_waveform   # callback(audio: np.ndarray, source: str)
+        self.chunk_samples = chunk_samples
+        self.denoise = denoise          # False: el denoise corre en otro lado (InferenceProcess)
+        self.echo_mode = echo_mode      # None = sin deteccion de eco
+        self.speech_gate = speech_gate
+        self.trim_silence = trim_silence
+        self.archive = None             # AudioArchive opcional: guarda el audio a 16 kHz
+        self.on_waveform = on_waveform   # callback(peaks: np.ndarray (n, 2), source: str)
+        self.on_source_removed = None    # callback(name) cuando ya salio todo el audio de la fuente
+        self.on_silence = on_silence     # callback(name) tras una pausa larga despues de la voz
         self._running = False
-        # Usar lambda para que siempre llame a self.on_chunk_ready actual,
-        # no la referencia que se pase al constructor (puede ser None al inicio)
-        self._mic_buffer = AudioBuffer("MIC", lambda c, s: self.on_chunk_ready(c, s))
-        self._sys_buffer = AudioBuffer("SISTEMA", lambda c, s: self.on_chunk_ready(c, s))
-        self._mic_stream = None
-        self._pyaudio = None
-        self._loopback_stream = None
+        self._lock = threading.Lock()
+        self._sources: dict[str, CaptureSource] = {}
+        self._buffers: dict[str, AudioBuffer] = {}
+        self._active: set[str] = set()      # fuentes con el stream abierto
+        self._removing: set[str] = set()    # quitadas, con audio aun en el DSP
+        self._echoes: dict[str, EchoDetector] = {}
+        self._echo_reference = None
+        self._dsp = DSPStage(SAMPLE_RATE)
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self._sources)
+
+    def source(self, name: str) -> CaptureSource | None:
+        return self._sources.get(name)
+
+    def add_source(self, source: CaptureSource) -> bool:
+        """Registers a source; while capturing it starts right away.
+
+        Returns False if it could not be opened (it stays registered and is
+        tried again on the next start()). Raises ValueError on a name that
+        is already in use.
+        """
+        with self._lock:
+            if source.name in self._sources or source.name in self._removing:
+                raise ValueError(f"Ya hay una fuente llamada {source.name!r}")
+            self._sources[source.name] = source
+            self._buffers[source.name] = AudioBuffer(
+                source.name, self._on_chunk, chunk_samples=self.chunk_samples,
+                gate=SpeechGate(self.trim_silence) if self.speech_gate else None,
+                on_silence=self.on_silence,
+            )
+            if self._running:
+                self._pick_echo_reference()
+                return self._open(source)
+        return True
+
+    def remove_source(self, name: str):
+        """Stops a source and flushes what it had pending; on_source_removed(name) follows."""
+        with self._lock:
+            source = self._sources.pop(name, None)
+            if source is None:
+                return
+            self._removing.add(name)
+            active = name in self._active
+            self._active.discard(name)
+            if self._echo_reference == name:
+                self._pick_echo_reference()
+        # fuera del lock: stop() espera al hilo de la fuente, que puede estar en submit()
+        if active:
+            source.stop()
+        # el DSP termina con lo ya recibido de la fuente antes de soltar su buffer
+        self._dsp.remove_chain(name, lambda: self._release(name))
 
     def start(self):
-        self._running = True
-        self._start_mic()
-        self._start_loopback()
+        with self._lock:
+            self._running = True
+            self._dsp.start()
+            self._pick_echo_reference()
+            for source in self._sources.values():
+                self._open(source)
 
     def stop(self):
-        self._running = False
-        if self._mic_stream:
-            self._mic_stream.stop()
-            self._mic_stream.close()
-            self._mic_stream = None
-        if self._loopback_stream:
-            self._loopback_stream.stop_stream()
-            self._loopback_stream.close()
-            self._loopback_stream = None
-        if self._pyaudio:
-            self._pyaudio.terminate()
-            self._pyaudio = None
-        self._mic_buffer.flush()
-        self._sys_buffer.flush()
-
-    def _start_mic(self):
-        # Capture at native device rate and resample to 16000Hz
-        device_info = sd.query_devices(kind="input")
-        native_rate = int(device_info["default_samplerate"])
-
-        def callback(indata, frames, time, status):
-            if not self._running:
-                return
-            audio = indata[:, 0].astype(np.float32)
-            if self.on_waveform:
-                self.on_waveform(audio, "MIC")
-            if native_rate != SAMPLE_RATE:
-                from scipy.signal import resample_poly
-                g = gcd(SAMPLE_RATE, native_rate)
-                audio = resample_poly(audio, SAMPLE_RATE // g, native_rate // g)
-            self._mic_buffer.push(audio.astype(np.float32))
-
-        self._mic_stream = sd.InputStream(
-            samplerate=native_rate,
-            channels=1,
-            dtype="float32",
-            callback=callback,
-            blocksize=4096,
-        )
-        self._mic_stream.start()
-        print(f"[OK] Mic activo @ {native_rate}Hz -> resampleando a {SAMPLE_RATE}Hz")
-
-    def _start_loopback(self):
+        with self._lock:
+            self._running = False
+            active = [self._sources[name] for name in self._active]
+            self._active.clear()
+        for source in active:
+            source.stop()
+        self._dsp.stop()
+        for buf in list(self._buffers.values()):
+            buf.flush()
+
+    # ------------------------------------------------------------------ #
+
+    def _open(self, source: CaptureSource) -> bool:
+        name = source.name
         try:
-            import pyaudiowpatch as pyaudio
-        except ImportError:
-            print("[WARN] pyaudiowpatch no instalado. Audio del sistema desactivado.")
-            return
+            source.open()
+        except SourceUnavailable as e:
+            print(f"[WARN] {e}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Fuente {name}: {e}")
+            return False
+        self._dsp.add_chain(
+            name, source.channels, source.rate,
+            lambda audio, captured_at: self._push(name, audio, captured_at),
+            self._on_waveform, self._filters(source),
+        )
+        if self.echo_mode and source.kind == KIND_INPUT:
+            # Detector nuevo en cada start(): el retardo depende de los dispositivos
+            self._echoes[name] = EchoDetector(self.echo_mode)
+        else:
+            self._echoes.pop(name, None)
 
-        self._pyaudio = pyaudio.PyAudio()
+        def submit(frames):
+            if not self._running:
+                return
+            t0 = time.perf_counter()
+            self._dsp.submit(name, frames)
+            metrics.record(STAGE_CALLBACK, time.perf_counter() - t0)
 
         try:
-            wasapi_info = self._pyaudio.get_host_api_info_by_type(pyaudio.paWASAPI)
-            default_speakers = self._pyaudio.get_device_info_by_index(
-                wasapi_info["defaultOutputDevice"]
-            )
-
-            # Si el dispositivo por defecto ya es loopback, usarlo directamente
-            if not default_speakers.get("isLoopbackDevice", False):
-                loopback_device = None
-                for loopback in self._pyaudio.get_loopback_device_info_generator():
-                    if default_speakers["name"] in loopback["name"]:
-                        loopback_device = loopback
-                        break
-                if loopback_device is None:
-                    print("[WARN] No se encontro dispositivo loopback WASAPI.")
-                    return
-            else:
-                loopback_device = default_speakers
-
-            device_rate = int(loopback_device["defaultSampleRate"])
-            channels = min(int(loopback_device["maxInputChannels"]), 2)
-
-            def loopback_callback(in_data, frame_count, time_info, status):
-                if not self._running:
-                    return (None, pyaudio.paComplete)
-
-                audio = np.frombuffer(in_data, dtype=np.float32).copy()
-
-                if channels == 2:
-                    audio = audio.reshape(-1, 2).mean(axis=1)
-
-                if self.on_waveform:
-                    self.on_waveform(audio, "SISTEMA")
-
-                if device_rate != SAMPLE_RATE:
-                    from scipy.signal import resample_poly
-                    g = gcd(SAMPLE_RATE, device_rate)
-                    audio = resample_poly(audio, SAMPLE_RATE // g, device_rate // g)
-
-                self._sys_buffer.push(audio.astype(np.float32))
-                return (None, pyaudio.paContinue)
-
-            self._loopback_stream = self._pyaudio.open(
-                format=pyaudio.paFloat32,
-                channels=channels,
-                rate=device_rate,
-                input=True,
-                input_device_index=int(loopback_device["index"]),
-                frames_per_buffer=4096,
-                stream_callback=loopback_callback,
-            )
-            self._loopback_stream.start_stream()
-            print(f"[OK] Loopback activo: {loopback_device['name']} @ {device_rate}Hz")
-
+            source.start(submit)
         except Exception as e:
-            print(f"[ERROR] Loopback WASAPI: {e}")
+            print(f"[ERROR] Fuente {name}: {e}")
+            return False
+        self._active.add(name)
+        print(f"[OK] Fuente activa: {source.describe()} -> {SAMPLE_RATE}Hz")
+        return True
+
+    def _pick_echo_reference(self):
+        self._echo_reference = next(
+            (n for n, s in self._sources.items() if s.kind == KIND_LOOPBACK), None
+        )
+
+    def _filters(self, source):
+        # Denoiser nuevo en cada start(): el perfil de ruido depende del dispositivo
+        return [StreamingDenoiser().process] if self.denoise and source.denoise else []
+
+    def _release(self, name):
+        # En el hilo del DSP, despues del ultimo bloque de la fuente
+        buf = self._buffers.pop(name, None)
+        if buf is not None:
+            buf.flush()
+        self._echoes.pop(name, None)
+        with self._lock:
+            self._removing.discard(name)
+        if self.on_source_removed:
+            self.on_source_removed(name)
+
+    def _on_chunk(self, chunk, source, captured_at):
+        echo = self._echoes.get(source)
+        if echo is not None:
+            chunk = echo.process(chunk, captured_at)
+            if chunk is None:
+                return      # todo el chunk es eco de la salida: no pasa al modelo
+        self.on_chunk_ready(chunk, source, captured_at)
+
+    def _push(self, name, audio, captured_at):
+        if self.archive is not None:
+            self.archive.append(name, audio, captured_at)
+        if name == self._echo_reference:
+            for echo in list(self._echoes.values()):
+                echo.push_reference(audio, captured_at)
+        echo = self._echoes.get(name)
+        if echo is not None:
+            echo.push_mic(audio, captured_at)   # senal continua, antes del gate
+        buf = self._buffers.get(name)
+        if buf is not None:
+            buf.push(audio, captured_at)
+
+    def _on_waveform(self, audio, source):
+        if self.on_waveform:
+            self.on_waveform(audio, source)
@@ -0,0 +1,91 @@
+import os
+import wave
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .dsp import StreamingResampler
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+
+
+def _is_wav(path: str) -> bool:
+    return path.lower().endswith(".wav")
+
+
+def audio_info(path: str) -> tuple[int, int]:
+    """Returns (frames, sample_rate) without reading the samples."""
+    if _is_wav(path):
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes(), wf.getframerate()
+    import soundfile as sf
+    info = sf.info(path)
+    return info.frames, info.samplerate
+
+
+def read_audio(path: str, start: int = 0, frames: int = -1) -> tuple[np.ndarray, int]:
+    """Reads frames [start, start + frames) of a WAV/FLAC file.
+
+    Returns (frames[n, channels] float32 in [-1, 1], rate). FLAC needs the
+    optional soundfile package.
+    """
+    if not _is_wav(path):
+        import soundfile as sf
+        audio, rate = sf.read(
+            path, start=start, frames=frames, dtype="float32", always_2d=True
+        )
+        return audio, rate
+
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        wf.setpos(start)
+        raw = wf.readframes(wf.getnframes() - start if frames < 0 else frames)
+    if width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"WAV de {8 * width} bits no soportado: {path}")
+    return audio.reshape(-1, channels), rate
+
+
+def load_audio(path: str, start: int = 0, frames: int = -1) -> np.ndarray:
+    """Reads an audio file (or a frame range of it) as mono float32 at SAMPLE_RATE.
+
+    A range comes out sample for sample as that stretch of the whole file run
+    through one resampler, so the segments of a file join without edge
+    transients even when different processes load them.
+    """
+    total, rate = audio_info(path)
+    end = total if frames < 0 else min(total, start + frames)
+    resampler = StreamingResampler(rate, SAMPLE_RATE)
+    up, down = resampler.up, resampler.down
+    # se lee contexto a cada lado; `begin` multiplo de down cae justo en una muestra de salida
+    begin = max(0, start - resampler.context)
+    begin -= begin % down
+    stop = min(total, end + resampler.context)
+    audio, _ = read_audio(path, begin, stop - begin)
+    out = resampler.process(audio.mean(axis=1))
+    if stop == total:
+        out = np.concatenate([out, resampler.flush()])
+    offset = begin * up // down
+    return out[-(-start * up // down) - offset:-(-end * up // down) - offset]
+
+
+def find_audio_files(paths: list[str]) -> list[str]:
+    """Expands directories (recursively) into the audio files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, n) for n in sorted(names)
+                    if n.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            files.append(path)
+    return files
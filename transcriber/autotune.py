@@ -0,0 +1,372 @@
+"""Hardware calibration: pick device, compute type, model, threads and beam size.
+
+    python -m transcriber.autotune [--force] [--sample grabacion.wav] [--chunks]
+        [--target-rtf 0.5] [--target-latency 6]
+
+Decodes a speech sample (data/muestra_voz.wav unless --sample is given)
+with the candidate configurations, from the most accurate down, and keeps
+the first one that meets the target real-time factor and latency. The
+workload is the app's: streaming re-decodes of a growing window by default,
+or fixed chunks with --chunks, which also picks the chunk size. The profile
+is saved with a fingerprint of the hardware and the mode; load_profile()
+ignores it when either no longer matches (another machine, new GPU,
+different CTranslate2), so the app re-calibrates.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .buffer import CHUNK_SECONDS, SAMPLE_RATE
+from .quality import TIERS
+from .streaming import MAX_WINDOW_SECONDS, STEP_SAMPLES, StreamWindow
+from .transcription import LANGUAGE, VAD_PARAMETERS, probe_device
+
+PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".transcriptor", "perfil.json")
+PROFILE_VERSION = 2
+TARGET_RTF = 0.5             # MIC y SISTEMA comparten el modelo: cada uno a la mitad del tiempo real
+TARGET_LATENCY = 6.0         # segundos desde la captura hasta el texto (p95)
+# Voz real (LibriVox, dominio publico; ver data/LEEME.txt): el costo del decode depende
+# de cuantos tokens salen, y con tonos sinteticos casi no sale ninguno
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "data", "muestra_voz.wav")
+SAMPLE_SECONDS = 24          # divisible por todos los CHUNK_OPTIONS
+ABORT_FACTOR = 2.0           # cortar una medicion que va peor que ABORT_FACTOR x el objetivo
+
+# Candidatos, de mayor a menor precision
+MODELS = ("large-v3", "medium", "small", "base")
+BEAMS = (5, 1)
+CHUNK_OPTIONS = (CHUNK_SECONDS, 3, 2)   # mas contexto primero
+COMPUTE_TYPES = {"cuda": ("float16", "int8_float16"), "cpu": ("int8",)}
+THREADS_PROBE_MODEL = "base"             # los hilos se ajustan una vez con un modelo chico
+
+
+def _cpu_name() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def hardware_fingerprint() -> tuple[str, dict]:
+    """(short hash, details) of what decides decoding speed on this machine."""
+    info = {
+        "cpu": _cpu_name(),
+        "cores": os.cpu_count(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cuda_devices": 0,
+        "ctranslate2": None,
+    }
+    try:
+        import ctranslate2
+        info["ctranslate2"] = ctranslate2.__version__
+        info["cuda_devices"] = ctranslate2.get_cuda_device_count()
+    except Exception:
+        pass
+    digest = hashlib.sha1(json.dumps(info, sort_keys=True).encode()).hexdigest()[:12]
+    return digest, info
+
+
+def load_profile(path: str = PROFILE_PATH, streaming: bool = True) -> dict | None:
+    """The saved profile, or None if missing, unreadable, from other hardware or another mode."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    if profile.get("fingerprint") != hardware_fingerprint()[0]:
+        print("[WARN] El hardware cambio: hay que recalibrar")
+        return None
+    if profile.get("streaming") != streaming:
+        return None
+    return profile
+
+
+def save_profile(profile: dict, path: str = PROFILE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def profile_tiers(profile: dict) -> tuple:
+    """Quality tiers that make sense below the calibrated setup (see QualityController)."""
+    rank = MODELS.index(profile["model"]) if profile["model"] in MODELS else 0
+    tiers = [
+        t for t in TIERS
+        if t.beam_size <= profile["beam_size"]
+        and (t.model is None or (t.model in MODELS and MODELS.index(t.model) > rank))
+    ]
+    return tuple(tiers) or TIERS[:1]
+
+
+def _synthetic_sample(seconds=SAMPLE_SECONDS, seed=0) -> np.ndarray:
+    """Voiced bursts with pauses over noise, at SAMPLE_RATE, when no recording is given."""
+    rng = np.random.default_rng(seed)
+    n = seconds * SAMPLE_RATE
+    t = np.arange(n) / SAMPLE_RATE
+    audio = 0.01 * rng.standard_normal(n)
+    pos = 0
+    while pos < n:
+        burst = int(rng.uniform(0.3, 2.5) * SAMPLE_RATE)
+        f0 = rng.uniform(90, 250)
+        seg = t[pos:pos + burst]
+        env = np.sin(np.pi * np.linspace(0, 1, len(seg))) ** 0.5
+        audio[pos:pos + burst] += 0.3 * env * sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 8))
+        pos += burst + int(rng.uniform(0.2, 1.5) * SAMPLE_RATE)
+    return (audio / max(1.0, np.abs(audio).max() / 0.9)).astype(np.float32)
+
+
+def load_sample(path: str | None = None) -> np.ndarray:
+    """SAMPLE_SECONDS of 16 kHz mono audio from path or SAMPLE_PATH (looped if shorter).
+
+    Falls back to a synthetic sample only if neither can be read.
+    """
+    from .audio_io import load_audio
+    try:
+        audio = load_audio(path or SAMPLE_PATH)
+    except Exception as e:
+        print(f"[WARN] No se pudo leer la muestra de voz ({e}): se calibra con audio sintetico")
+        return _synthetic_sample()
+    n = SAMPLE_SECONDS * SAMPLE_RATE
+    return np.resize(audio, n).astype(np.float32) if len(audio) else _synthetic_sample()
+
+
+def measure(model, audio: np.ndarray, beam_size: int, chunk_seconds: int,
+            target_rtf: float = TARGET_RTF) -> dict:
+    """Decodes audio in chunk_seconds chunks as the live worker would.
+
+    Returns {"rtf", "latency_p95", "aborted"}; latency is the chunk length
+    (waiting for it to fill) plus its decode time. Stops early once the
+    running RTF is ABORT_FACTOR times over target_rtf.
+    """
+    chunk = chunk_seconds * SAMPLE_RATE
+    times = []
+    for start in range(0, len(audio) - chunk + 1, chunk):
+        t0 = time.perf_counter()
+        # sin VAD: el sample se decodifica entero, como el habla continua
+        segments, _ = model.transcribe(audio[start:start + chunk], language=LANGUAGE,
+                                       beam_size=beam_size, condition_on_previous_text=False)
+        for _ in segments:
+            pass
+        times.append(time.perf_counter() - t0)
+        if sum(times) / (len(times) * chunk_seconds) > ABORT_FACTOR * target_rtf:
+            break
+    decoded = len(times) * chunk_seconds
+    return {
+        "rtf": round(sum(times) / decoded, 3),
+        "latency_p95": round(chunk_seconds + float(np.percentile(times, 95)), 2),
+        "aborted": decoded * SAMPLE_RATE < len(audio) - chunk + 1,
+    }
+
+
+def measure_streaming(model, audio: np.ndarray, beam_size: int,
+                      target_rtf: float = TARGET_RTF) -> dict:
+    """Replays audio through a StreamWindow as the streaming worker would.
+
+    Each decode covers the whole window, which then grows by whatever was
+    captured during that decode (at least one step) and is trimmed after
+    the agreed words, as live. Returns {"rtf", "latency_p95", "aborted"}:
+    rtf is compute over audio, latency the wait of the newest audio
+    (what arrived during the previous decode) plus the decode. Stops early
+    once the running RTF is ABORT_FACTOR times over target_rtf.
+    """
+    window = StreamWindow("calibracion")
+    pos = 0
+    elapsed = 0.0
+    compute = 0.0
+    lags = []
+    while pos < len(audio):
+        # lo capturado durante el decode anterior llega junto, en pasos enteros
+        n = max(1, round(elapsed * SAMPLE_RATE / STEP_SAMPLES)) * STEP_SAMPLES
+        window.append(audio[pos:pos + n], 0.0)
+        pos += n
+        t0 = time.perf_counter()
+        segments, _ = model.transcribe(
+            window.audio, language=LANGUAGE, beam_size=beam_size,
+            vad_filter=True, vad_parameters=VAD_PARAMETERS, word_timestamps=True,
+            initial_prompt=window.prompt or None, condition_on_previous_text=False,
+        )
+        words = [(w.start, w.end, w.word) for seg in segments for w in (seg.words or [])
+                 if w.end > 0.05]
+        elapsed = time.perf_counter() - t0
+        compute += elapsed
+        lags.append(n / SAMPLE_RATE + elapsed)
+        if not words:
+            window.drop_silence()
+        elif window.seconds >= MAX_WINDOW_SECONDS:
+            window.commit(words)
+            window.reset()
+        else:
+            window.commit(window.agreement.insert(words)[0])
+        if compute / (pos / SAMPLE_RATE) > ABORT_FACTOR * target_rtf:
+            break
+    return {
+        "rtf": round(compute / (min(pos, len(audio)) / SAMPLE_RATE), 3),
+        "latency_p95": round(float(np.percentile(lags, 95)), 2),
+        "aborted": pos < len(audio),
+    }
+
+
+def _thread_options() -> list[int]:
+    cores = os.cpu_count() or 1
+    return sorted({cores, max(1, cores // 2), min(cores, 4)}, reverse=True)
+
+
+def calibrate(sample: str | None = None, target_rtf: float = TARGET_RTF,
+              target_latency: float = TARGET_LATENCY, models=MODELS,
+              progress_callback=None, streaming: bool = True) -> dict:
+    """Finds the most accurate configuration that keeps up on this machine.
+
+    Order of preference: model size, then compute type, beam size and, in
+    chunk mode, chunk length (larger first). A configuration passes when
+    its RTF is at most target_rtf and its p95 latency at most
+    target_latency. If nothing passes, the fastest configuration measured
+    is kept.
+    """
+    from faster_whisper import WhisperModel
+
+    def report(msg):
+        print(f"[AUTOTUNE] {msg}")
+        if progress_callback:
+            progress_callback(msg)
+
+    fingerprint, hardware = hardware_fingerprint()
+    device, _ = probe_device()
+    audio = load_sample(sample)
+    warm = audio[:SAMPLE_RATE]
+    supported = None
+    try:
+        import ctranslate2
+        supported = set(ctranslate2.get_supported_compute_types(device))
+    except Exception:
+        pass
+    compute_types = [c for c in COMPUTE_TYPES[device] if supported is None or c in supported]
+
+    def create(size, compute_type, threads):
+        model = WhisperModel(size, device=device, compute_type=compute_type, cpu_threads=threads)
+        model.transcribe(warm, language=LANGUAGE, beam_size=1)   # kernels y memoria, fuera de la medicion
+        return model
+
+    # Hilos: en CPU se miden una vez con un modelo chico y se usan para todos
+    threads = 0
+    if device == "cpu":
+        best = None
+        for n in _thread_options():
+            report(f"Probando {n} hilos...")
+            m = measure(create(THREADS_PROBE_MODEL, compute_types[0], n), audio, 1, CHUNK_SECONDS,
+                        target_rtf=float("inf"))
+            if best is None or m["rtf"] < best[1]:
+                best = (n, m["rtf"])
+        threads = best[0]
+
+    results = []
+    chosen = None
+    for size in models:
+        for compute_type in compute_types:
+            report(f"Calibrando {size} ({device}/{compute_type})...")
+            try:
+                model = create(size, compute_type, threads)
+            except Exception as e:
+                print(f"[WARN] No se pudo cargar {size} {compute_type}: {e}")
+                continue
+            for beam in BEAMS:
+                # el streaming no usa chunks: solo se mide su propia carga
+                for chunk_seconds in (None,) if streaming else CHUNK_OPTIONS:
+                    if chunk_seconds is None:
+                        m = measure_streaming(model, audio, beam, target_rtf)
+                    else:
+                        m = measure(model, audio, beam, chunk_seconds, target_rtf)
+                    config = {"model": size, "compute_type": compute_type, "beam_size": beam,
+                              "chunk_seconds": chunk_seconds, **m}
+                    results.append(config)
+                    print(f"[AUTOTUNE]   beam {beam} "
+                          f"{f'chunk {chunk_seconds}s' if chunk_seconds else 'streaming'}: "
+                          f"RTF {m['rtf']:.2f} latencia p95 {m['latency_p95']:.1f}s")
+                    if m["rtf"] <= target_rtf and m["latency_p95"] <= target_latency:
+                        chosen = config
+                        break
+                    if m["rtf"] > target_rtf:
+                        break   # chunks mas cortos solo suben el RTF (Whisper rellena a 30 s)
+                if chosen:
+                    break
+            del model
+            if chosen:
+                break
+        if chosen:
+            break
+
+    if chosen is None:
+        if not results:
+            raise RuntimeError("No se pudo cargar ningun modelo para calibrar")
+        chosen = min(results, key=lambda r: r["rtf"])
+        print(f"[WARN] Ninguna configuracion alcanza RTF {target_rtf}: se usa la mas rapida")
+
+    profile = {
+        "version": PROFILE_VERSION,
+        "fingerprint": fingerprint,
+        "hardware": hardware,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "device": device,
+        "compute_type": chosen["compute_type"],
+        "model": chosen["model"],
+        "cpu_threads": threads,
+        "beam_size": chosen["beam_size"],
+        "streaming": streaming,
+        "chunk_seconds": chosen["chunk_seconds"],
+        "rtf": chosen["rtf"],
+        "latency_p95": chosen["latency_p95"],
+        "target_rtf": target_rtf,
+        "target_latency": target_latency,
+        "sample": sample or os.path.basename(SAMPLE_PATH),
+        "measurements": results,
+    }
+    mode = f"chunk {profile['chunk_seconds']}s" if profile["chunk_seconds"] else "streaming"
+    report(f"Perfil: {profile['model']} {device}/{profile['compute_type']} beam {profile['beam_size']} "
+           f"{mode} hilos {threads or 'auto'} (RTF {profile['rtf']:.2f})")
+    return profile
+
+
+def ensure_profile(path: str = PROFILE_PATH, force: bool = False, sample: str | None = None,
+                   progress_callback=None, streaming: bool = True, **targets) -> dict:
+    """The saved profile for this hardware and mode, calibrating (and saving) first if needed."""
+    profile = None if force else load_profile(path, streaming)
+    if profile is None:
+        profile = calibrate(sample, progress_callback=progress_callback, streaming=streaming,
+                            **targets)
+        save_profile(profile, path)
+        print(f"[OK] Perfil guardado en {path}")
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibra modelo y parametros para este equipo.")
+    parser.add_argument("--force", action="store_true", help="recalibrar aunque haya perfil")
+    parser.add_argument("--sample", help="grabacion de voz (WAV/FLAC); sin ella, data/muestra_voz.wav")
+    parser.add_argument("--chunks", action="store_true",
+                        help="calibrar el modo por chunks (y su largo) en vez del streaming")
+    parser.add_argument("--target-rtf", type=float, default=TARGET_RTF)
+    parser.add_argument("--target-latency", type=float, default=TARGET_LATENCY)
+    parser.add_argument("--profile", default=PROFILE_PATH)
+    args = parser.parse_args(argv)
+
+    profile = ensure_profile(args.profile, force=args.force, sample=args.sample,
+                             streaming=not args.chunks, target_rtf=args.target_rtf, target_latency=args.target_latency)
+    print(json.dumps({k: v for k, v in profile.items() if k != "measurements"}, indent=2,
+                     ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Headless transcription of recorded audio files.
+
+    python -m transcriber.batch grabaciones/ otra.flac -o salida/ --workers 4
+
+Long files are split into --segment-seconds segments and spread across a pool
+of worker processes, each with its own model. Every segment is chunked with
+AudioBuffer and decoded with TranscriptionWorker's settings, exactly as in the
+live app. Finished segments are saved to a checkpoint file so an interrupted
+run resumes where it stopped. Output per input file: <nombre>.jsonl
+(start/end/text per chunk) and <nombre>.txt.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .audio_io import audio_info, find_audio_files, load_audio
+from .buffer import AudioBuffer, CHUNK_SAMPLES, SAMPLE_RATE
+from .transcription import MODEL_SIZE, TranscriptionWorker
+
+SEGMENT_SECONDS = 600
+CHECKPOINT_NAME = "checkpoint.json"
+SOURCE = "ARCHIVO"   # los archivos no pasan por el denoise del MIC
+
+_worker = None   # TranscriptionWorker del proceso hijo
+
+
+def _init_process(device, model_size, cpu_threads):
+    global _worker
+    _worker = TranscriptionWorker(on_result=None)
+    _worker.load_model(device=device, model_size=model_size, cpu_threads=cpu_threads)
+
+
+def _transcribe_segment(path, index, start, frames, rate, batch_size):
+    t0 = time.perf_counter()
+    audio = load_audio(path, start, frames)
+
+    chunks = []
+    buf = AudioBuffer(SOURCE, lambda c, s, t: chunks.append(c))
+    buf.push(audio)
+    buf.flush()
+
+    offset = start / rate
+    results = []
+    t = offset
+    for i in range(0, len(chunks), batch_size):
+        batch = chunks[i:i + batch_size]
+        texts = _worker.transcribe_chunks([(c, SOURCE) for c in batch])
+        for chunk, text in zip(batch, texts):
+            end = t + len(chunk) / SAMPLE_RATE
+            if text:
+                results.append([round(t, 2), round(end, 2), text])
+            t = end
+    return path, index, results, len(audio) / SAMPLE_RATE, time.perf_counter() - t0
+
+
+class Checkpoint:
+    """Completed segments per file, saved atomically after every update."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def entry(self, audio_path: str, size: int, n_segments: int) -> dict:
+        key = os.path.abspath(audio_path)
+        entry = self.data.get(key)
+        if entry is None or entry["size"] != size or entry["n_segments"] != n_segments:
+            entry = self.data[key] = {
+                "size": size, "n_segments": n_segments, "segments": {}, "done": False,
+            }
+        return entry
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def _write_outputs(out_dir: str, audio_path: str, entry: dict, formats: list[str]):
+    name = os.path.splitext(os.path.basename(audio_path))[0]
+    rows = [
+        row
+        for i in range(entry["n_segments"])
+        for row in entry["segments"][str(i)]["results"]
+    ]
+    if "jsonl" in formats:
+        with open(os.path.join(out_dir, name + ".jsonl"), "w", encoding="utf-8") as f:
+            for start, end, text in rows:
+                f.write(json.dumps({"start": start, "end": end, "text": text},
+                                   ensure_ascii=False) + "\n")
+    if "txt" in formats:
+        with open(os.path.join(out_dir, name + ".txt"), "w", encoding="utf-8") as f:
+            for _, _, text in rows:
+                f.write(text + "\n")
+
+
+def _report_failed(failed: set):
+    if failed:
+        print(f"[ERROR] {len(failed)} archivos fallidos (volver a ejecutar para reintentarlos):")
+        for path in sorted(failed):
+            print(f"  {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe archivos de audio sin UI.")
+    parser.add_argument("inputs", nargs="+", help="archivos WAV/FLAC o directorios")
+    parser.add_argument("-o", "--out", default="transcripciones")
+    parser.add_argument("--format", default="jsonl,txt", help="jsonl, txt o ambos")
+    parser.add_argument("--workers", type=int, default=1, help="procesos, cada uno con su modelo")
+    parser.add_argument("--device", default="auto", choices=["auto", "cpu", "cuda"])
+    parser.add_argument("--model", default=MODEL_SIZE)
+    parser.add_argument("--cpu-threads", type=int, default=0,
+                        help="hilos por proceso (0 = repartir los nucleos entre procesos)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--segment-seconds", type=int, default=SEGMENT_SECONDS)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    formats = [f.strip() for f in args.format.split(",")]
+    cpu_threads = args.cpu_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    checkpoint = Checkpoint(os.path.join(args.out, CHECKPOINT_NAME))
+
+    jobs = []
+    entries = {}
+    failed = set()
+    for path in find_audio_files(args.inputs):
+        try:
+            frames, rate = audio_info(path)
+        except Exception as e:
+            failed.add(path)
+            print(f"[ERROR] {path}: {e}")
+            continue
+        # segmentos alineados a chunks para no partir uno en dos
+        chunk_frames = CHUNK_SAMPLES * rate // SAMPLE_RATE
+        seg_frames = args.segment_seconds * rate
+        seg_frames = max(chunk_frames, seg_frames - seg_frames % chunk_frames)
+        n_segments = max(1, -(-frames // seg_frames))
+        entry = checkpoint.entry(path, os.path.getsize(path), n_segments)
+        entries[path] = entry
+        if entry["done"]:
+            print(f"[SKIP] {path} (ya transcrito)")
+            continue
+        for i in range(n_segments):
+            if str(i) not in entry["segments"]:
+                jobs.append((path, i, i * seg_frames, seg_frames, rate, args.batch_size))
+
+    print(f"[OK] {len(entries)} archivos, {len(jobs)} segmentos pendientes, "
+          f"{args.workers} procesos x {cpu_threads} hilos")
+    if not jobs:
+        _report_failed(failed)
+        return
+
+    t0 = time.perf_counter()
+    total_audio = 0.0
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=ctx,
+        initializer=_init_process,
+        initargs=(args.device, args.model, cpu_threads),
+    ) as pool:
+        futures = {pool.submit(_transcribe_segment, *job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                path, index, results, audio_seconds, elapsed = future.result()
+            except Exception as e:
+                # el resto de los archivos sigue; el segmento se reintenta en la proxima corrida
+                path, index = futures[future][:2]
+                failed.add(path)
+                print(f"[ERROR] {path} segmento {index + 1}/{entries[path]['n_segments']}: {e}")
+                continue
+            total_audio += audio_seconds
+            entry = entries[path]
+            entry["segments"][str(index)] = {
+                "results": results, "audio_seconds": audio_seconds, "elapsed": elapsed,
+            }
+            print(f"[OK] {os.path.basename(path)} segmento {index + 1}/{entry['n_segments']} "
+                  f"RTF {elapsed / max(audio_seconds, 1e-6):.3f}")
+            if len(entry["segments"]) == entry["n_segments"]:
+                _write_outputs(args.out, path, entry, formats)
+                entry["done"] = True
+                seg = entry["segments"].values()
+                rtf = sum(s["elapsed"] for s in seg) / max(sum(s["audio_seconds"] for s in seg), 1e-6)
+                print(f"[OK] {path} terminado (RTF por proceso {rtf:.3f})")
+            checkpoint.save()
+
+    wall = time.perf_counter() - t0
+    print(f"[OK] {total_audio:.0f}s de audio en {wall:.0f}s — RTF global {wall / max(total_audio, 1e-6):.3f}")
+    _report_failed(failed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,96 @@
 import threading
+import time
 import numpy as np
 
 SAMPLE_RATE = 16000
 CHUNK_SECONDS = 4
 CHUNK_SAMPLES = SAMPLE_RATE * CHUNK_SECONDS
+RING_CHUNKS = 2  # capacidad del ring, en chunks
+SILENCE_COMMIT_SECONDS = 1.5   # silencio tras la voz antes de on_silence (no cortar en una pausa)
 
 
 class AudioBuffer:
-    """Accumulates raw audio samples and fires a callback every CHUNK_SECONDS."""
+    """Accumulates raw audio samples and fires a callback every CHUNK_SECONDS.
 
-    def __init__(self, source: str, on_chunk_ready):
+    Samples are written into a preallocated float32 ring with a read cursor,
+    so push() costs O(len(audio)) no matter how much audio is pending. The
+    read cursor always sits on a chunk boundary, which keeps every chunk a
+    contiguous view of the ring; the chunk handed to on_chunk_ready is copied
+    once from that view because the receiver keeps it after the ring wraps.
+
+    on_chunk_ready(chunk, source, captured_at) gets the time.monotonic()
+    capture time of the push that completed the chunk.
+
+    An optional gate (transcriber.gate.SpeechGate) sees every chunk before
+    on_chunk_ready: silent chunks are not emitted, and trimmed ones get
+    captured_at moved back to their last kept sample. With on_silence,
+    silent chunks after speech are still emitted until SILENCE_COMMIT_SECONDS
+    of them have passed, then on_silence(source) is called: streaming uses
+    it to commit the window, which must stay contiguous up to that point,
+    while shorter pauses are left to the agreement.
+    """
+
+    def __init__(self, source: str, on_chunk_ready,
+                 chunk_samples: int = CHUNK_SAMPLES, ring_chunks: int = RING_CHUNKS,
+                 gate=None, on_silence=None):
         self.source = source
         self.on_chunk_ready = on_chunk_ready
-        self._buffer = np.array([], dtype=np.float32)
+        self.chunk_samples = chunk_samples
+        self.gate = gate
+        self.on_silence = on_silence
+        self._silence = None      # muestras sin voz desde la ultima voz (None: nada pendiente)
+        self._ring = np.zeros(chunk_samples * max(1, ring_chunks), dtype=np.float32)
+        self._read = 0      # inicio del chunk en curso (siempre alineado a chunk_samples)
+        self._pending = 0   # muestras escritas desde _read
+        self._captured_at = 0.0   # captura del ultimo push
         self._lock = threading.Lock()
 
-    def push(self, audio: np.ndarray):
+    def push(self, audio: np.ndarray, captured_at: float | None = None):
+        if captured_at is None:
+            captured_at = time.monotonic()
+        audio = np.asarray(audio, dtype=np.float32).ravel()
         with self._lock:
-            self._buffer = np.concatenate([self._buffer, audio])
-            while len(self._buffer) >= CHUNK_SAMPLES:
-                chunk = self._buffer[:CHUNK_SAMPLES].copy()
-                self._buffer = self._buffer[CHUNK_SAMPLES:]
-                self.on_chunk_ready(chunk, self.source)
+            self._captured_at = captured_at
+            pos = 0
+            n = len(audio)
+            while pos < n:
+                take = min(n - pos, self.chunk_samples - self._pending)
+                start = self._read + self._pending
+                self._ring[start:start + take] = audio[pos:pos + take]
+                self._pending += take
+                pos += take
+                if self._pending == self.chunk_samples:
+                    chunk = self._view(self.chunk_samples).copy()
+                    self._read = (self._read + self.chunk_samples) % len(self._ring)
+                    self._pending = 0
+                    self._emit(chunk, captured_at)
 
     def flush(self):
         """Send whatever remains (at least 1 second) on stop."""
         with self._lock:
-            if len(self._buffer) >= SAMPLE_RATE:
-                chunk = self._buffer.copy()
-                self._buffer = np.array([], dtype=np.float32)
-                self.on_chunk_ready(chunk, self.source)
+            if self._pending >= SAMPLE_RATE:
+                chunk = self._view(self._pending).copy()
+                self._read = 0
+                self._pending = 0
+                self._emit(chunk, self._captured_at)
+
+    def _emit(self, chunk: np.ndarray, captured_at: float):
+        if self.gate is not None:
+            kept, tail = self.gate.process(chunk)
+            if kept is None:
+                if self._silence is not None and self.on_silence is not None:
+                    # pausa tras la voz: el paso se entrega igual, y si se alarga se confirma
+                    self.on_chunk_ready(chunk, self.source, captured_at)
+                    self._silence += len(chunk)
+                    if self._silence >= SILENCE_COMMIT_SECONDS * SAMPLE_RATE:
+                        self._silence = None
+                        self.on_silence(self.source)
+                return
+            self._silence = 0
+            chunk = kept
+            captured_at -= tail / SAMPLE_RATE
+        self.on_chunk_ready(chunk, self.source, captured_at)
+
+    def _view(self, n: int) -> np.ndarray:
+        """Zero-copy view of the first n pending samples."""
+        return self._ring[self._read:self._read + n]
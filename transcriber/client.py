@@ -0,0 +1,113 @@
+"""Client simulator for transcriber.server.
+
+    python -m transcriber.client llamada.wav --clients 4 --speed 1 [--port 8765]
+
+Each simulated client streams the file (WAV/FLAC at its native rate and
+channels, float32) in 4096-frame blocks paced at --speed x real time (0 = as
+fast as the server accepts). It prints results as they arrive, then reports
+per-client latency: the time from sending the end of a chunk to receiving its
+text.
+"""
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+import numpy as np
+
+from .audio_io import read_audio
+from .server import DEFAULT_PORT
+
+BLOCK_FRAMES = 4096
+_FRAME_HEADER = struct.Struct(">I")
+
+
+async def simulate_client(path: str, name: str, host="127.0.0.1", port=DEFAULT_PORT,
+                          speed=1.0, verbose=True) -> dict:
+    """Streams one file to the server; returns the results and latency per result."""
+    frames, rate = read_audio(path)
+    frames = np.ascontiguousarray(frames, dtype=np.float32)
+    reader, writer = await asyncio.open_connection(host, port)
+    hello = {"name": name, "rate": rate, "channels": frames.shape[1], "format": "f32"}
+    writer.write((json.dumps(hello) + "\n").encode())
+    reply = json.loads(await reader.readline())
+    if reply.get("type") != "hello":
+        raise RuntimeError(f"Servidor rechazo la conexion: {reply}")
+    source = reply["source"]
+
+    sent_at = []      # (posicion en s, momento de envio)
+    results = []
+    latencies = []
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            if msg["type"] == "end":
+                return
+            if msg["type"] != "result":
+                continue
+            now = time.monotonic()
+            # momento en que se envio el audio hasta la posicion "end" del resultado
+            sent = next((t for pos, t in sent_at if pos >= msg["end"] - 1e-3), now)
+            latencies.append(now - sent)
+            results.append(msg)
+            if verbose:
+                print(f"[{source}] {msg['end']:7.2f}s  {msg['text']}")
+
+    receiver = asyncio.create_task(receive())
+    t0 = time.monotonic()
+    for start in range(0, len(frames), BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        payload = block.tobytes()
+        writer.write(_FRAME_HEADER.pack(len(payload)) + payload)
+        await writer.drain()      # bloquea mientras el servidor aplica contrapresion
+        position = (start + len(block)) / rate
+        sent_at.append((position, time.monotonic()))
+        if speed > 0:
+            await asyncio.sleep(max(0.0, t0 + position / speed - time.monotonic()))
+    writer.write(_FRAME_HEADER.pack(0))
+    await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+    return {
+        "source": source,
+        "audio_seconds": len(frames) / rate,
+        "wall_seconds": time.monotonic() - t0,
+        "results": results,
+        "latencies": latencies,
+    }
+
+
+async def simulate(path: str, clients: int, host="127.0.0.1", port=DEFAULT_PORT,
+                   speed=1.0, verbose=True) -> list[dict]:
+    return await asyncio.gather(*[
+        simulate_client(path, f"sim{i}", host, port, speed, verbose) for i in range(clients)
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simula clientes de transcriber.server.")
+    parser.add_argument("audio", help="WAV/FLAC a enviar")
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = tiempo real, 0 = sin pausa")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    reports = asyncio.run(simulate(args.audio, args.clients, args.host, args.port,
+                                   args.speed, not args.quiet))
+    for r in reports:
+        lat = np.asarray(r["latencies"]) if r["latencies"] else np.zeros(1)
+        print(f"[OK] {r['source']}: {len(r['results'])} resultados, "
+              f"{r['audio_seconds']:.1f}s de audio en {r['wall_seconds']:.1f}s, "
+              f"latencia p50 {np.percentile(lat, 50):.2f}s p95 {np.percentile(lat, 95):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import time
+
+import numpy as np
+
+from .metrics import STAGE_DENOISE, metrics
+
+FRAME = 512                 # 32 ms @ 16 kHz
+HOP = FRAME // 2
+PROP_DECREASE = 0.75        # agresividad: 0=nada, 1=maximo (igual que con noisereduce)
+GATE_FACTOR = 4.0           # potencia > GATE_FACTOR * ruido (~6 dB) se considera voz
+NOISE_FALL = 0.5            # peso del nuevo minimo cuando el piso de ruido baja
+NOISE_RISE = 0.02           # subida relativa por bloque si el piso de ruido aumenta
+NOISE_FRAME_FACTOR = 2.0    # frames con energia <= factor * piso actualizan el espectro de ruido
+NOISE_SMOOTHING = 0.8       # promedio exponencial del espectro de ruido entre bloques
+CLEAN_DB = -65.0            # piso de ruido por debajo del cual no se procesa
+SMOOTH_BINS = 5             # suavizado de la mascara en frecuencia
+
+
+def _smooth_bins(mask: np.ndarray) -> np.ndarray:
+    """Moving average of SMOOTH_BINS along the frequency axis (all frames at once)."""
+    half = SMOOTH_BINS // 2
+    c = np.cumsum(np.pad(mask, ((0, 0), (half + 1, half)), mode="edge"), axis=1)
+    return (c[:, SMOOTH_BINS:] - c[:, :-SMOOTH_BINS]) / SMOOTH_BINS
+
+
+class StreamingDenoiser:
+    """Spectral-gating denoiser that runs block by block on a live stream.
+
+    Keeps a noise estimate across calls instead of re-estimating it for every
+    chunk. A minimum-tracked frame-energy floor picks out the noise-only
+    frames of each block, and their mean power spectrum is averaged into the
+    per-bin noise profile. STFT frames use a sqrt-Hann window at 50% overlap, so analysis and
+    synthesis reconstruct the input exactly when the gain is 1. That lets
+    clean blocks skip the FFTs entirely without a seam. Output lags input by
+    HOP samples.
+    """
+
+    def __init__(self, prop_decrease=PROP_DECREASE):
+        self.prop_decrease = prop_decrease
+        self._window = np.sqrt(np.hanning(FRAME + 1)[:-1]).astype(np.float32)
+        self._window2 = self._window ** 2
+        self.reset()
+
+    def reset(self):
+        self._input = np.zeros(HOP, dtype=np.float32)   # HOP ceros: reconstruccion exacta desde t=0
+        self._tail = np.zeros(HOP, dtype=np.float32)
+        self._noise = None        # potencia media de ruido por bin
+        self._floor = None        # energia de ruido por frame (dominio temporal)
+        self.processed_frames = 0
+        self.clean_frames = 0
+
+    @property
+    def noise_floor_db(self) -> float:
+        if self._floor is None:
+            return -np.inf
+        return 10 * np.log10(self._floor + 1e-12)
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        buf = np.concatenate([self._input, audio.astype(np.float32, copy=False)])
+        n_frames = (len(buf) - FRAME) // HOP + 1
+        if n_frames <= 0:
+            self._input = buf
+            return np.zeros(0, dtype=np.float32)
+
+        idx = np.arange(FRAME)[None, :] + HOP * np.arange(n_frames)[:, None]
+        frames = buf[idx]
+        self._input = buf[n_frames * HOP:]
+
+        energy = np.mean(frames ** 2, axis=1)
+        self._floor = self._track(self._floor, energy.min())
+
+        noise_frames = energy <= NOISE_FRAME_FACTOR * self._floor
+        if self.noise_floor_db < CLEAN_DB or (self._noise is None and not noise_frames.any()):
+            # Senal limpia (o sin perfil de ruido aun): ganancia 1, la sintesis
+            # se reduce a ventana^2 sin FFT
+            out_frames = frames * self._window2
+            self.clean_frames += n_frames
+        else:
+            spec = np.fft.rfft(frames * self._window, axis=1)
+            power = spec.real ** 2 + spec.imag ** 2
+            if noise_frames.any():
+                block_noise = power[noise_frames].mean(axis=0)
+                if self._noise is None:
+                    self._noise = block_noise
+                else:
+                    self._noise = NOISE_SMOOTHING * self._noise + (1 - NOISE_SMOOTHING) * block_noise
+            mask = (power > GATE_FACTOR * self._noise).astype(np.float32)
+            # suavizar en frecuencia para evitar "ruido musical", sin atenuar
+            # los bins que ya pasaron la compuerta
+            mask = np.maximum(mask, _smooth_bins(mask))
+            gain = 1.0 - self.prop_decrease * (1.0 - mask)
+            out_frames = np.fft.irfft(spec * gain, n=FRAME, axis=1).astype(np.float32)
+            out_frames *= self._window
+        self.processed_frames += n_frames
+
+        # overlap-add al 50%: cada muestra de salida suma media trama de dos frames
+        out = np.zeros((n_frames + 1) * HOP, dtype=np.float32)
+        out[:n_frames * HOP] += out_frames[:, :HOP].ravel()
+        out[HOP:] += out_frames[:, HOP:].ravel()
+        out[:HOP] += self._tail
+        self._tail = out[n_frames * HOP:].copy()
+        metrics.record(STAGE_DENOISE, time.perf_counter() - t0)
+        return out[:n_frames * HOP]
+
+    @staticmethod
+    def _track(estimate, block_min):
+        """Minimum tracking of the noise floor: follow new minima quickly, rise slowly."""
+        if estimate is None:
+            return block_min
+        return np.where(
+            block_min < estimate,
+            (1 - NOISE_FALL) * estimate + NOISE_FALL * block_min,
+            np.minimum(block_min, estimate * (1 + NOISE_RISE)),
+        )
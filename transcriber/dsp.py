@@ -0,0 +1,222 @@
+import queue
+import threading
+import time
+from math import gcd
+
+import numpy as np
+
+from .metrics import STAGE_DSP, metrics
+
+ENVELOPE_PEAKS_PER_SECOND = 160   # resolucion de la forma de onda (80 barras = 0.5 s)
+ENVELOPE_INTERVAL = 0.05          # cada cuanto se envian picos a la UI (s)
+
+_REMOVE = object()                # marca en la cola: quitar la cadena de una fuente
+
+
+class StreamingResampler:
+    """Polyphase resampler that keeps its filter state across blocks.
+
+    Uses the same FIR as scipy.signal.resample_poly, so resampling a stream
+    block by block gives the same samples as resampling it in one go, without
+    the edge transients of filtering each block on its own.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int):
+        g = gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self._passthrough = self.up == self.down
+        # muestras de entrada a cada lado de las que depende una salida
+        self.context = 0
+        if self._passthrough:
+            return
+
+        from scipy.signal import firwin
+
+        max_rate = max(self.up, self.down)
+        self._half_len = 10 * max_rate
+        h = firwin(2 * self._half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        self._taps = -(-len(h) // self.up)
+        self.context = self._taps
+        h = np.concatenate([h, np.zeros(self._taps * self.up - len(h))])
+        # fila p = coeficientes de la fase p, en orden de muestra mas reciente a mas antigua
+        self._phases = h.reshape(self._taps, self.up).T.copy()
+        self._offsets = np.arange(self._taps)
+        self.reset()
+
+    def reset(self):
+        if self._passthrough:
+            return
+        self._history = np.zeros(self._taps, dtype=np.float32)
+        self._base = -self._taps   # indice global de _history[0]
+        self._next = 0             # indice global de la proxima muestra de salida
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self._passthrough:
+            return block.astype(np.float32, copy=False)
+
+        x = np.concatenate([self._history, block.astype(np.float32, copy=False)])
+        end = self._base + len(x)
+        # ultima salida cuyo filtro solo necesita muestras ya recibidas
+        last = (end * self.up - 1 - self._half_len) // self.down
+        n = np.arange(self._next, last + 1)
+        k = n * self.down + self._half_len
+        idx = (k // self.up - self._base)[:, None] - self._offsets
+        out = np.einsum("nt,nt->n", self._phases[k % self.up], x[idx])
+        self._next = last + 1
+
+        keep = (self._next * self.down + self._half_len) // self.up - (self._taps - 1) - self._base
+        keep = min(max(keep, 0), len(x))
+        self._history = x[keep:]
+        self._base += keep
+        return out.astype(np.float32)
+
+    def flush(self) -> np.ndarray:
+        """Output still held back at the end of the stream, as if silence followed.
+
+        After it the total output length is the one resample_poly gives for
+        the whole input; the resampler starts over for a new stream.
+        """
+        if self._passthrough:
+            return np.zeros(0, dtype=np.float32)
+        received = self._base + len(self._history)
+        missing = -(-received * self.up // self.down) - self._next
+        out = self.process(np.zeros(self._taps, dtype=np.float32))[:max(missing, 0)]
+        self.reset()
+        return out
+
+
+class EnvelopeDecimator:
+    """Reduces audio to (min, max) peaks and releases them at a throttled rate.
+
+    process() returns an array of shape (n, 2) once ENVELOPE_INTERVAL worth
+    of peaks has accumulated, and None otherwise. The UI gets a handful of
+    numbers every 50 ms instead of every raw block.
+    """
+
+    def __init__(self, rate: int):
+        self._spp = max(1, rate // ENVELOPE_PEAKS_PER_SECOND)
+        self._batch = max(1, int(ENVELOPE_PEAKS_PER_SECOND * ENVELOPE_INTERVAL))
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._pending = []
+        self._n_pending = 0
+
+    def process(self, audio: np.ndarray):
+        audio = np.concatenate([self._rest, audio])
+        n = len(audio) // self._spp
+        self._rest = audio[n * self._spp:]
+        if n:
+            blocks = audio[:n * self._spp].reshape(n, self._spp)
+            self._pending.append(np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1))
+            self._n_pending += n
+        if self._n_pending < self._batch:
+            return None
+        peaks = np.concatenate(self._pending)
+        self._pending = []
+        self._n_pending = 0
+        return peaks
+
+
+class _Chain:
+    def __init__(self, channels, resampler, sink, on_waveform, filters, envelope):
+        self.channels = channels
+        self.resampler = resampler
+        self.sink = sink
+        self.on_waveform = on_waveform
+        self.filters = filters
+        self.envelope = envelope
+
+
+class DSPStage:
+    """Downmix, resampling and filtering thread between the capture callbacks and AudioBuffer.
+
+    Callbacks only hand raw frames to submit(), which appends to a
+    queue.SimpleQueue (non-blocking, C-implemented); all numpy/scipy work runs
+    on this thread.
+    """
+
+    def __init__(self, out_rate: int):
+        self.out_rate = out_rate
+        self._queue = queue.SimpleQueue()
+        self._chains: dict[str, _Chain] = {}
+        self._thread = None
+
+    def add_chain(self, source: str, channels: int, rate: int, sink,
+                  on_waveform=None, filters=()):
+        """sink(audio, captured_at) recibe audio mono a out_rate.
+
+        on_waveform(peaks, source) recibe picos (min, max) de la senal nativa
+        cada ENVELOPE_INTERVAL (ver EnvelopeDecimator).
+
+        filters: funciones audio -> audio aplicadas en orden despues del
+        resampleo (p. ej. StreamingDenoiser.process).
+        """
+        self._chains[source] = _Chain(
+            channels, StreamingResampler(rate, self.out_rate), sink, on_waveform,
+            list(filters), EnvelopeDecimator(rate),
+        )
+
+    def remove_chain(self, source: str, on_removed=None):
+        """Drops a source's chain once the frames already submitted for it are processed.
+
+        on_removed() runs right after, on the DSP thread (or here if the
+        stage is not running).
+        """
+        if self._thread is None:
+            self._chains.pop(source, None)
+            if on_removed:
+                on_removed()
+            return
+        self._queue.put((source, _REMOVE, on_removed))
+
+    def submit(self, source: str, frames):
+        """Called from audio callbacks: frames is an owned ndarray or bytes."""
+        self._queue.put((source, frames, time.monotonic()))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Processes everything already submitted, then stops the thread."""
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._chains.clear()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            source, frames, captured_at = item
+            if frames is _REMOVE:
+                self._chains.pop(source, None)
+                if captured_at:
+                    captured_at()   # on_removed de remove_chain
+                continue
+            chain = self._chains.get(source)
+            if chain is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                self._process(source, chain, frames, captured_at)
+            except Exception as e:
+                print(f"[ERROR] DSP {source}: {e}")
+            metrics.record(STAGE_DSP, time.perf_counter() - t0)
+
+    @staticmethod
+    def _process(source, chain, frames, captured_at):
+        if isinstance(frames, (bytes, bytearray, memoryview)):
+            frames = np.frombuffer(frames, dtype=np.float32)
+        audio = frames.reshape(-1, chain.channels)
+        audio = audio[:, 0] if chain.channels == 1 else audio.mean(axis=1)
+        if chain.on_waveform:
+            peaks = chain.envelope.process(audio)
+            if peaks is not None:
+                chain.on_waveform(peaks, source)
+        audio = chain.resampler.process(audio)
+        for f in chain.filters:
+            audio = f(audio)
+        chain.sink(audio, captured_at)
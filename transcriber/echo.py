@@ -0,0 +1,164 @@
+import time
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .metrics import (
+    COUNTER_ECHO_CHECKED, COUNTER_ECHO_DROPPED, COUNTER_ECHO_SAVED, STAGE_ECHO, metrics,
+)
+
+MODE_SUPPRESS = "suppress"     # silenciar los tramos del MIC que son eco
+MODE_SUBTRACT = "subtract"     # restar la referencia alineada (conserva el doble habla)
+MODES = (MODE_SUPPRESS, MODE_SUBTRACT)
+
+REFERENCE_SECONDS = 8          # historial del SISTEMA
+ANALYSIS_SECONDS = 2.0         # MIC usado para estimar el retardo (incluye el chunk)
+MAX_LAG_SECONDS = 0.5          # retardo acustico + diferencia de latencia entre dispositivos
+SEGMENT_SECONDS = 0.25         # resolucion de la decision eco / no eco dentro del chunk
+ECHO_CORRELATION = 0.3         # correlacion normalizada minima del chunk para buscar eco
+SEGMENT_CORRELATION = 0.5      # correlacion minima de un tramo para considerarlo eco
+MIN_REFERENCE_RMS = 1e-3       # SISTEMA en silencio: no puede haber eco
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(0, int(n - 1).bit_length())
+
+
+class EchoDetector:
+    """Finds SISTEMA audio that the mic picked up from the speakers.
+
+    The loopback stream is the echo reference: push_reference() keeps its
+    last REFERENCE_SECONDS at 16 kHz, timestamped with the capture clock.
+    push_mic() keeps the last ANALYSIS_SECONDS of the continuous mic signal,
+    before the speech gate drops or trims anything. For every MIC chunk,
+    process() cross-correlates that mic audio against the time-aligned
+    reference (FFT, normalized, lags within +/- MAX_LAG_SECONDS) and applies
+    the best lag to the chunk at its own capture time. If it correlates, each
+    SEGMENT_SECONDS slice is checked at that lag. Echo slices are then either
+    silenced (suppress) or have the gain-matched reference subtracted
+    (subtract). A chunk that is all echo returns None and never reaches the
+    model.
+
+    All methods must run on the same thread (the DSPStage thread, where
+    both AudioBuffers are fed).
+    """
+
+    def __init__(self, mode=MODE_SUPPRESS, correlation=ECHO_CORRELATION,
+                 segment_correlation=SEGMENT_CORRELATION, max_lag=MAX_LAG_SECONDS):
+        if mode not in MODES:
+            raise ValueError(f"Modo de eco desconocido: {mode}")
+        self.mode = mode
+        self.correlation = correlation
+        self.segment_correlation = segment_correlation
+        self.max_lag = int(max_lag * SAMPLE_RATE)
+        self._ref = np.zeros(REFERENCE_SECONDS * SAMPLE_RATE, dtype=np.float32)
+        self._ref_end = None        # captured_at del ultimo sample del SISTEMA
+        self._mic = np.zeros(int(ANALYSIS_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        self._mic_end = None        # captured_at del ultimo sample del MIC
+        self.last_lag = None        # retardo (s) del ultimo eco detectado; >0 = el MIC va atrasado
+        self.last_correlation = 0.0
+
+    def push_reference(self, audio: np.ndarray, captured_at: float):
+        """SISTEMA audio (16 kHz) as it leaves the DSP, before its AudioBuffer."""
+        self._ref = self._shift_in(self._ref, audio)
+        self._ref_end = captured_at
+
+    def push_mic(self, audio: np.ndarray, captured_at: float):
+        """MIC audio (16 kHz) as it leaves the DSP, before its AudioBuffer and gate."""
+        self._mic = self._shift_in(self._mic, audio)
+        self._mic_end = captured_at
+
+    def process(self, chunk: np.ndarray, captured_at: float) -> np.ndarray | None:
+        """Returns the MIC chunk with echo removed, or None if it is all echo."""
+        t0 = time.perf_counter()
+        seconds = len(chunk) / SAMPLE_RATE
+        metrics.count(COUNTER_ECHO_CHECKED, seconds)
+        try:
+            aligned = self._aligned_reference(len(chunk), captured_at)
+            if aligned is None:
+                return chunk
+            return self._remove(chunk, aligned, seconds)
+        finally:
+            metrics.record(STAGE_ECHO, time.perf_counter() - t0)
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _shift_in(ring: np.ndarray, audio: np.ndarray) -> np.ndarray:
+        n = len(audio)
+        if n >= len(ring):
+            ring[:] = audio[-len(ring):]
+        else:
+            ring[:-n] = ring[n:]
+            ring[-n:] = audio
+        return ring
+
+    def _reference_window(self, end_time: float, n: int) -> np.ndarray | None:
+        """Reference samples for [end_time - n/sr - max_lag, end_time + max_lag] (zeros where missing)."""
+        if self._ref_end is None:
+            return None
+        # muestras entre el final de la ventana pedida y el ultimo sample del SISTEMA
+        ahead = int(round((self._ref_end - end_time) * SAMPLE_RATE)) - self.max_lag
+        length = n + 2 * self.max_lag
+        stop = len(self._ref) - ahead
+        start = stop - length
+        out = np.zeros(length, dtype=np.float32)
+        lo, hi = max(start, 0), min(stop, len(self._ref))
+        if hi <= lo:
+            return None
+        out[lo - start:hi - start] = self._ref[lo:hi]
+        return out
+
+    def _aligned_reference(self, n: int, captured_at: float) -> np.ndarray | None:
+        """Reference aligned sample-by-sample with the chunk, or None if there is no echo."""
+        if self._mic_end is None:
+            return None
+        # el retardo se estima sobre el MIC continuo, que termina en _mic_end
+        mic = self._mic
+        ref = self._reference_window(self._mic_end, len(mic))
+        if ref is None or np.sqrt(np.mean(ref ** 2)) < MIN_REFERENCE_RMS:
+            return None
+
+        m = len(mic)
+        size = _next_pow2(len(ref) + m)
+        corr = np.fft.irfft(np.fft.rfft(ref, size) * np.conj(np.fft.rfft(mic, size)), size)
+        corr = corr[:len(ref) - m + 1]          # corr[L] = sum mic[i] * ref[i + L]
+        c = np.concatenate([[0.0], np.cumsum(ref.astype(np.float64) ** 2)])
+        ref_energy = c[m:] - c[:-m]
+        norm = np.sqrt(ref_energy * float(np.dot(mic, mic))) + 1e-12
+        ncc = corr / norm
+        best = int(np.argmax(ncc))
+        self.last_correlation = float(ncc[best])
+        if ncc[best] < self.correlation:
+            return None
+        # L = max_lag es retardo cero; L < max_lag: el MIC va atrasado respecto al SISTEMA
+        self.last_lag = (self.max_lag - best) / SAMPLE_RATE
+        # el chunk (recortado o no por el gate) termina en captured_at: mismo retardo
+        window = self._reference_window(captured_at, n)
+        return None if window is None else window[best:best + n]
+
+    def _remove(self, chunk: np.ndarray, aligned: np.ndarray, seconds: float):
+        seg = int(SEGMENT_SECONDS * SAMPLE_RATE)
+        out = chunk.copy()
+        echo_samples = 0
+        for start in range(0, len(chunk), seg):
+            x = chunk[start:start + seg]
+            r = aligned[start:start + seg]
+            rr = float(np.dot(r, r))
+            xx = float(np.dot(x, x))
+            if rr < 1e-9 or xx < 1e-9:
+                continue
+            xr = float(np.dot(x, r))
+            if xr / np.sqrt(rr * xx) < self.segment_correlation:
+                continue
+            echo_samples += len(x)
+            if self.mode == MODE_SUPPRESS:
+                out[start:start + seg] = 0
+            else:
+                out[start:start + seg] = x - (xr / rr) * r
+
+        if echo_samples >= len(chunk) - seg // 2:
+            metrics.count(COUNTER_ECHO_DROPPED, seconds)
+            metrics.count(COUNTER_ECHO_SAVED, seconds * metrics.rtf())
+            return None
+        return out
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from .audio_io import read_audio
+
+BLOCK_FRAMES = 4096   # mismo tamano de bloque que los streams de captura
+
+
+class FileSource:
+    """Plays an audio file as if it were a capture stream, without a sound card.
+
+    A thread calls on_frames(frames[n, channels] float32) once per block,
+    like the PortAudio callbacks do. speed=1 paces blocks in real time,
+    speed=4 four times faster, and speed=0 sends them as fast as possible.
+    """
+
+    def __init__(self, path: str, on_frames, blocksize=BLOCK_FRAMES, speed=1.0, loop=False):
+        self.path = path
+        self.on_frames = on_frames
+        self.blocksize = blocksize
+        self.speed = speed
+        self.loop = loop
+        self.frames, self.rate = read_audio(path)
+        self.channels = self.frames.shape[1]
+        self._thread = None
+        self._running = False
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) / self.rate
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def wait(self, timeout=None):
+        """Blocks until the file has been played completely (loop=False)."""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        t0 = time.monotonic()
+        sent = 0   # frames enviados, para mantener el ritmo sin acumular deriva
+        while self._running:
+            for start in range(0, len(self.frames), self.blocksize):
+                if not self._running:
+                    return
+                block = self.frames[start:start + self.blocksize]
+                if self.speed > 0:
+                    due = t0 + sent / (self.rate * self.speed)
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                # copia: el receptor puede quedarse con el bloque como con indata
+                self.on_frames(block.copy())
+                sent += len(block)
+            if not self.loop:
+                break
+        self._running = False
@@ -0,0 +1,194 @@
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .metrics import COUNTER_FP_CHECKED, COUNTER_FP_HIT, COUNTER_FP_NON_SPEECH, metrics
+
+FRAME = 2048                 # 128 ms
+HOP = 256                    # 16 ms: un sub-fingerprint de 32 bits cada HOP
+N_BANDS = 33                 # 33 bandas -> 32 bits (diferencias entre bandas vecinas)
+BAND_LOW = 300.0
+BAND_HIGH = 3000.0
+MIN_FRAMES = 48              # ~0.9 s: audio mas corto no se compara
+BER_THRESHOLD = 0.3          # bits distintos por debajo de esto = mismo audio
+COVERAGE = 0.9               # fraccion del chunk que debe quedar cubierta por el cache
+MAX_CANDIDATES = 8           # alineaciones que se verifican por consulta
+WEAK_BITS = 2                # bits menos fiables por frame que se prueban invertidos al buscar
+MAX_BYTES = 16 * 1024 * 1024
+_BYTES_PER_FRAME = 4 + 120   # sub-fingerprint + entrada del indice invertido (aprox.)
+
+NON_SPEECH = ""              # texto cacheado de un chunk que no produjo palabras
+
+
+def _band_matrix() -> np.ndarray:
+    freqs = np.fft.rfftfreq(FRAME, 1 / SAMPLE_RATE)
+    edges = np.geomspace(BAND_LOW, BAND_HIGH, N_BANDS + 1)
+    m = np.zeros((len(freqs), N_BANDS), dtype=np.float32)
+    for b in range(N_BANDS):
+        m[(freqs >= edges[b]) & (freqs < edges[b + 1]), b] = 1.0
+    return m
+
+
+_WINDOW = np.hanning(FRAME).astype(np.float32)
+_BANDS = _band_matrix()
+_WEIGHTS = (1 << np.arange(31, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+def _sub_fingerprints(audio: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(sub-fingerprints, per-bit margin): a small margin is a bit noise flips easily."""
+    n = (len(audio) - FRAME) // HOP + 1
+    if n < 2:
+        return np.zeros(0, dtype=np.uint32), np.zeros((0, 32), dtype=np.float32)
+    idx = np.arange(FRAME)[None, :] + HOP * np.arange(n)[:, None]
+    spec = np.abs(np.fft.rfft(audio[idx] * _WINDOW, axis=1)) ** 2
+    energy = spec.astype(np.float32) @ _BANDS                  # (n, 33)
+    diff = energy[:, :-1] - energy[:, 1:]                      # (n, 32)
+    delta = diff[1:] - diff[:-1]
+    fp = ((delta > 0).astype(np.uint64) @ _WEIGHTS).astype(np.uint32)
+    return fp, np.abs(delta)
+
+
+def fingerprint(audio: np.ndarray) -> np.ndarray:
+    """32-bit sub-fingerprints (uint32, one per HOP) of 16 kHz audio.
+
+    Bit m of frame n is the sign of the energy difference between bands m
+    and m+1, minus the same difference in frame n-1 (Haitsma-Kalker), so
+    it survives level changes and mild filtering.
+    """
+    return _sub_fingerprints(audio)[0]
+
+
+def _probes(fp: np.ndarray, margin: np.ndarray) -> np.ndarray:
+    """Every frame's value with its WEAK_BITS least reliable bits flipped every way, (n, 2**WEAK_BITS)."""
+    weak = np.argsort(margin, axis=1)[:, :WEAK_BITS]                 # (n, WEAK_BITS), 0 = MSB
+    masks = (np.uint32(1) << (31 - weak).astype(np.uint32))
+    combos = (np.arange(1 << WEAK_BITS)[:, None] >> np.arange(WEAK_BITS)) & 1  # (2**k, k)
+    flips = np.bitwise_or.reduce(masks[:, None, :] * combos[None].astype(np.uint32), axis=2)
+    return fp[:, None] ^ flips
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    x = np.bitwise_xor(a, b).view(np.uint8)
+    return float(np.unpackbits(x).sum()) / (32 * len(a))
+
+
+class FingerprintCache:
+    """LRU of chunk fingerprints -> decoded text, to skip repeated audio.
+
+    Hold music, IVR menus and recorded announcements come back over and
+    over on SISTEMA. lookup() finds cached chunks whose fingerprint matches
+    some alignment of the query: exact 32-bit sub-fingerprint hits in an
+    inverted index (also with each frame's least reliable bits flipped)
+    propose offsets, and the bit error rate confirms them. A single entry
+    covering COVERAGE of the query returns its text, and non-speech entries
+    that together cover it return NON_SPEECH. Memory is bounded
+    by max_bytes; the least recently matched entries go first.
+    """
+
+    def __init__(self, sources=("SISTEMA",), max_bytes=MAX_BYTES, ber_threshold=BER_THRESHOLD):
+        self.sources = tuple(sources)
+        self.max_bytes = max_bytes
+        self.ber_threshold = ber_threshold
+        self._entries: OrderedDict[int, tuple] = OrderedDict()   # id -> (fp, text)
+        self._index: dict[int, dict[int, int]] = {}              # sub-fp -> {id: posicion}
+        self._next_id = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def applies(self, source: str) -> bool:
+        return source in self.sources
+
+    def add_source(self, source: str):
+        """Also fingerprints this source (e.g. another loopback output added at runtime)."""
+        if source not in self.sources:
+            self.sources += (source,)
+
+    def lookup(self, audio: np.ndarray) -> tuple[np.ndarray, str | None]:
+        """(fingerprint, cached text or None). NON_SPEECH ("") means skip as silence."""
+        fp, margin = _sub_fingerprints(audio)
+        seconds = len(audio) / SAMPLE_RATE
+        metrics.count(COUNTER_FP_CHECKED, seconds)
+        if len(fp) < MIN_FRAMES:
+            return fp, None
+        with self._lock:
+            self.lookups += 1
+            text = self._match(fp, _probes(fp, margin))
+            if text is not None:
+                self.hits += 1
+        if text is not None:
+            metrics.count(COUNTER_FP_HIT, seconds)
+            if text == NON_SPEECH:
+                metrics.count(COUNTER_FP_NON_SPEECH, seconds)
+        return fp, text
+
+    def store(self, fp: np.ndarray, text: str):
+        """Remembers what a chunk decoded to ("" = no speech)."""
+        if len(fp) < MIN_FRAMES:
+            return
+        size = len(fp) * _BYTES_PER_FRAME
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (fp, text)
+            for pos, value in enumerate(fp.tolist()):
+                if value:   # 0 = energia plana (silencio digital): demasiado comun para indexar
+                    self._index.setdefault(value, {}).setdefault(entry_id, pos)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            }
+
+    # ------------------------------------------------------------------ #
+
+    def _evict(self):
+        entry_id, (fp, _) = self._entries.popitem(last=False)
+        for value in set(fp.tolist()):
+            postings = self._index.get(value)
+            if postings is not None:
+                postings.pop(entry_id, None)
+                if not postings:
+                    del self._index[value]
+        self._bytes -= len(fp) * _BYTES_PER_FRAME
+
+    def _match(self, fp: np.ndarray, probes: np.ndarray) -> str | None:
+        votes = Counter()
+        for i, values in enumerate(probes.tolist()):
+            for value in values:
+                postings = self._index.get(value) if value else None
+                if postings:
+                    for entry_id, pos in postings.items():
+                        votes[entry_id, pos - i] += 1
+        n = len(fp)
+        covered = np.zeros(n, dtype=bool)
+        seen = set()
+        for (entry_id, offset), _ in votes.most_common(MAX_CANDIDATES):
+            if entry_id in seen:
+                continue
+            entry_fp, text = self._entries[entry_id]
+            a, b = max(0, -offset), min(n, len(entry_fp) - offset)
+            if b - a < MIN_FRAMES // 2:
+                continue
+            if bit_error_rate(fp[a:b], entry_fp[a + offset:b + offset]) >= self.ber_threshold:
+                continue
+            seen.add(entry_id)
+            self._entries.move_to_end(entry_id)
+            if (b - a) / n >= COVERAGE:
+                return text
+            if text == NON_SPEECH:
+                covered[a:b] = True
+                if covered.mean() >= COVERAGE:
+                    return NON_SPEECH
+        return None
@@ -0,0 +1,94 @@
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .metrics import COUNTER_GATE_CHECKED, COUNTER_GATE_DROPPED, COUNTER_GATE_TRIMMED, metrics
+
+FRAME = 320                  # 20 ms @ 16 kHz
+MIN_DB = -55.0               # por debajo de esto nunca es voz (dBFS)
+ENERGY_MARGIN_DB = 9.0       # voz: energia sobre el piso de ruido...
+FLATNESS_MAX = 0.35          # ...y espectro no plano (ruido blanco ~ 1, voz sonora < 0.3)
+LOUD_MARGIN_DB = 20.0        # muy por encima del piso cuenta como voz aunque sea plana (fricativas)
+MIN_SPEECH_SECONDS = 0.15    # menos voz que esto en el chunk: se descarta entero
+PAD_SECONDS = 0.3            # margen que se conserva antes y despues de la voz
+FLOOR_RISE_DB = 0.5          # subida maxima del piso de ruido por chunk
+
+
+class SpeechGate:
+    """Cheap pre-model speech check for AudioBuffer chunks.
+
+    Frames of 20 ms count as speech when their energy clears an adaptive
+    noise floor and their spectrum is not flat (spectral flatness). Very loud
+    frames count as speech either way. Chunks with less than
+    min_speech_seconds of speech are dropped. With trim=True the remaining
+    chunks lose their leading and trailing silence, keeping pad_seconds
+    around the speech. Streaming steps must stay contiguous, so use
+    trim=False there.
+
+    The noise floor follows new minima immediately and rises by at most
+    FLOOR_RISE_DB per chunk.
+    """
+
+    def __init__(self, trim=True, min_db=MIN_DB, energy_margin_db=ENERGY_MARGIN_DB,
+                 flatness_max=FLATNESS_MAX, loud_margin_db=LOUD_MARGIN_DB,
+                 min_speech_seconds=MIN_SPEECH_SECONDS, pad_seconds=PAD_SECONDS):
+        self.trim = trim
+        self.min_db = min_db
+        self.energy_margin_db = energy_margin_db
+        self.flatness_max = flatness_max
+        self.loud_margin_db = loud_margin_db
+        self.min_speech_frames = max(1, int(min_speech_seconds * SAMPLE_RATE / FRAME))
+        self.pad_frames = int(pad_seconds * SAMPLE_RATE / FRAME)
+        self._window = np.hanning(FRAME).astype(np.float32)
+        self._floor_db = None
+
+    @property
+    def noise_floor_db(self) -> float:
+        return self._floor_db if self._floor_db is not None else -np.inf
+
+    def speech_frames(self, audio: np.ndarray) -> np.ndarray:
+        """Boolean speech decision per FRAME (a trailing partial frame is ignored)."""
+        n = len(audio) // FRAME
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        frames = audio[:n * FRAME].reshape(n, FRAME)
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+
+        block_min = float(energy_db.min())
+        if self._floor_db is None or block_min < self._floor_db:
+            self._floor_db = block_min
+        else:
+            self._floor_db = min(block_min, self._floor_db + FLOOR_RISE_DB)
+        floor = max(self._floor_db, self.min_db - self.energy_margin_db)
+
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        audible = energy_db > max(self.min_db, floor + self.energy_margin_db)
+        loud = energy_db > max(self.min_db, floor + self.loud_margin_db)
+        return (audible & (flatness < self.flatness_max)) | loud
+
+    def process(self, chunk: np.ndarray) -> tuple[np.ndarray | None, int]:
+        """Returns (chunk or None, samples trimmed from the end).
+
+        The second value lets the caller move the chunk's capture timestamp
+        back to its last kept sample.
+        """
+        seconds = len(chunk) / SAMPLE_RATE
+        metrics.count(COUNTER_GATE_CHECKED, seconds)
+        speech = self.speech_frames(chunk)
+        if speech.sum() < self.min_speech_frames:
+            metrics.count(COUNTER_GATE_DROPPED, seconds)
+            return None, len(chunk)
+        if not self.trim:
+            return chunk, 0
+
+        idx = np.flatnonzero(speech)
+        start = max(0, idx[0] - self.pad_frames) * FRAME
+        end = min(len(speech), idx[-1] + 1 + self.pad_frames) * FRAME
+        if end >= len(speech) * FRAME:
+            end = len(chunk)     # incluir el frame parcial final
+        start, end = int(start), int(end)
+        trimmed = len(chunk) - (end - start)
+        if trimmed:
+            metrics.count(COUNTER_GATE_TRIMMED, trimmed / SAMPLE_RATE)
+        return chunk[start:end], len(chunk) - end
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from .metrics import rss_mb
+
+IDLE_SECONDS = 600           # sin captura durante este tiempo: descargar el modelo
+EVICT_UNLOAD = "unload"      # liberar los pesos (RAM o VRAM); recarga desde disco
+EVICT_TO_CPU = "cpu"         # solo CUDA: pasar los pesos a RAM, libera VRAM y recarga rapido
+EVICT_MODES = (EVICT_UNLOAD, EVICT_TO_CPU)
+
+STATE_LOADED = "cargado"
+STATE_UNLOADED = "descargado"
+STATE_RELOADING = "recargando"
+
+
+def _mb(value: float | None) -> str:
+    return f"{value:.0f} MB" if value is not None else "?"
+
+
+class IdleEvictor:
+    """Frees the model's memory between calls.
+
+    capture_stopped() arms a timer; if capture doesn't restart within
+    idle_seconds (and nothing is left in the queues) the worker's weights
+    are unloaded. capture_started() holds the worker's queues right away,
+    so every chunk captured meanwhile is kept, and reloads the weights in
+    the background; the backlog is released once the model is back.
+    Resident memory (RSS) is printed before and after each unload/reload.
+    """
+
+    def __init__(self, worker, idle_seconds: float = IDLE_SECONDS, mode: str = EVICT_UNLOAD):
+        if mode not in EVICT_MODES:
+            raise ValueError(f"Modo de descarga desconocido: {mode}")
+        self.worker = worker        # TranscriptionWorker o TranscriptionPool
+        self.idle_seconds = idle_seconds
+        self.mode = mode
+        self.state = STATE_LOADED
+        self._lock = threading.Lock()
+        self._timer = None
+        self._capturing = False
+        # InferenceProcess suma la memoria del proceso hijo
+        self._rss = getattr(worker, "rss_mb", rss_mb)
+
+    def capture_stopped(self):
+        with self._lock:
+            self._capturing = False
+            self._arm()
+
+    def capture_started(self):
+        with self._lock:
+            self._capturing = True
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if self.state != STATE_UNLOADED:
+                return
+            self.state = STATE_RELOADING
+            self.worker.hold(True)      # los chunks esperan en cola hasta que vuelva el modelo
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    # ------------------------------------------------------------------ #
+
+    def _arm(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.idle_seconds, self._evict)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _evict(self):
+        with self._lock:
+            self._timer = None
+            if self._capturing or self.state != STATE_LOADED:
+                return
+            if any(s["queued_chunks"] for s in self.worker.queue_stats().values()):
+                self._arm()     # aun hay audio por transcribir
+                return
+            before = self._rss()
+            t0 = time.perf_counter()
+            self.worker.unload_model(to_cpu=self.mode == EVICT_TO_CPU)
+            self.state = STATE_UNLOADED
+        print(f"[OK] Modelo descargado tras {self.idle_seconds / 60:.0f} min sin captura "
+              f"({time.perf_counter() - t0:.1f}s): RSS {_mb(before)} -> {_mb(self._rss())}")
+
+    def _reload(self):
+        before = self._rss()
+        t0 = time.perf_counter()
+        state = STATE_LOADED
+        try:
+            self.worker.reload_model()
+            print(f"[OK] Modelo recargado en {time.perf_counter() - t0:.1f}s: "
+                  f"RSS {_mb(before)} -> {_mb(self._rss())}")
+        except Exception as e:
+            # los chunks siguen esperando el modelo; el proximo Iniciar reintenta
+            print(f"[ERROR] No se pudo recargar el modelo: {e}")
+            state = STATE_UNLOADED
+        with self._lock:
+            self.state = state
+            self.worker.hold(False)
+            if not self._capturing and state == STATE_LOADED:
+                self._arm()
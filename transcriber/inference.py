@@ -0,0 +1,585 @@
+"""Inference in a child process, behind the TranscriptionPool interface.
+
+The UI process keeps capture, DSP and Tk; the child loads the model and runs
+the TranscriptionPool plus the denoiser, so decoding and its Python-side
+post-processing never hold the UI process's GIL.
+
+Audio crosses through one shared-memory ring per source (SharedRing): the
+parent copies each chunk into the ring once and sends a small descriptor
+(source, position, length, capture time) over a multiprocessing queue; the
+child decodes a numpy view of the ring. Results, partials, per-chunk
+completions, queue stats and pipeline metrics come back over a second
+queue. Capture times are time.monotonic(), which is system-wide, so they
+mean the same in both processes.
+"""
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .metrics import COUNTER_RING_STALE, metrics, rss_mb
+from .scheduler import MAX_QUEUED_SECONDS, POLICY_DROP_OLDEST
+
+# Audio por fuente en el ring compartido. El hijo copia cada chunk al recibir su
+# mensaje, asi que basta con que el padre no de la vuelta al ring antes de eso;
+# si lo hace (mensajes atrasados mas de RING_SECONDS), el hijo descarta el chunk.
+RING_SECONDS = 120
+STATS_INTERVAL = 0.2         # cada cuanto el hijo envia cola, nivel de calidad y metricas
+POLL_SECONDS = 0.5           # cada cuanto el supervisor comprueba que el hijo siga vivo
+MAX_RESTARTS = 3             # reinicios permitidos dentro de RESTART_WINDOW antes de rendirse
+RESTART_WINDOW = 60.0
+ACK_TIMEOUT = 120.0
+REFINE_TIMEOUT = 600.0       # una ventana de refinamiento, incluida la carga del modelo grande
+
+
+class SharedRing:
+    """Float32 ring buffer in shared memory, written by one process, read by another.
+
+    Positions are absolute sample counts; read() returns a zero-copy view
+    unless the range wraps around the end of the ring. The write position
+    lives in the shared block too, and is advanced before the samples are
+    written, so a reader that copies a range and then checks valid() knows
+    the copy was not overwritten halfway.
+    """
+
+    def __init__(self, capacity: int, name: str | None = None):
+        from multiprocessing import shared_memory
+        self.capacity = capacity
+        self._owner = name is None
+        offset = -(-capacity * 4 // 8) * 8     # contador int64 alineado tras las muestras
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=offset + 8)
+        self.name = self._shm.name
+        self.array = np.ndarray((capacity,), dtype=np.float32, buffer=self._shm.buf)
+        self._written = np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf, offset=offset)
+        if self._owner:
+            self._written[0] = 0
+        self._lock = threading.Lock()
+
+    @property
+    def written(self) -> int:
+        return int(self._written[0])
+
+    def write(self, audio: np.ndarray) -> int:
+        """Appends audio; returns its start position."""
+        n = len(audio)
+        if n > self.capacity:
+            raise ValueError(f"chunk de {n} muestras no cabe en el ring ({self.capacity})")
+        with self._lock:
+            start = self.written
+            self._written[0] = start + n    # primero la posicion: el lector ve el tramo como pisado
+            i = start % self.capacity
+            first = min(n, self.capacity - i)
+            self.array[i:i + first] = audio[:first]
+            self.array[:n - first] = audio[first:]
+        return start
+
+    def valid(self, start: int) -> bool:
+        """False once the writer has lapped (or is overwriting) the data at start."""
+        return self.written - start <= self.capacity
+
+    def copy(self, start: int, n: int) -> np.ndarray | None:
+        """An owned copy of the range, or None if the writer lapped it."""
+        if not self.valid(start):
+            return None
+        audio = np.array(self.read(start, n))
+        return audio if self.valid(start) else None
+
+    def read(self, start: int, n: int) -> np.ndarray:
+        i = start % self.capacity
+        if i + n <= self.capacity:
+            return self.array[i:i + n]
+        return np.concatenate([self.array[i:], self.array[:i + n - self.capacity]])
+
+    def close(self):
+        self.array = self._written = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# ---------------------------------------------------------------------- #
+#  Proceso hijo                                                           #
+# ---------------------------------------------------------------------- #
+
+def _child_main(config: dict, inbox, outbox):
+    from .denoise import StreamingDenoiser
+    from .fingerprint import FingerprintCache
+    from .pool import TranscriptionPool
+    from .quality import QualityController
+
+    forwarded = []
+    metrics.forward = forwarded.append
+    quality = QualityController(config["tiers"]) if config["tiers"] else None
+    pool = TranscriptionPool(
+        on_result=lambda text, source, info: outbox.put(("result", text, source, info)),
+        on_partial=lambda text, source: outbox.put(("partial", text, source)),
+        streaming=config["streaming"], num_workers=config["num_workers"],
+        pin_sources=config["pin_sources"], share_model=config["share_model"],
+        batch_size=config["batch_size"], max_queued_seconds=config["max_queued_seconds"],
+        overload_policy=config["overload_policy"], quality=quality,
+        cache=FingerprintCache(*config["cache"]) if config["cache"] else None,
+    )
+    pool.on_done = lambda source: outbox.put(("done", source))
+    pool.on_window = lambda source, samples: outbox.put(("window", source, samples))
+    try:
+        pool.load_model(progress_callback=lambda msg: outbox.put(("progress", msg)), **config["load"])
+    except Exception as e:
+        outbox.put(("error", str(e)))
+        return
+    outbox.put(("loaded",))
+
+    stop = threading.Event()
+
+    def send_stats():
+        records = forwarded[:]
+        del forwarded[:len(records)]
+        outbox.put(("stats", pool.queue_stats(), quality.tier.name if quality else None,
+                    rss_mb(), records))
+
+    def report():
+        while not stop.wait(STATS_INTERVAL):
+            send_stats()
+
+    def announce_ready():
+        pool.ready.wait()
+        outbox.put(("ready",))
+
+    def reload():
+        try:
+            pool.reload_model()
+            outbox.put(("reloaded", rss_mb(), None))
+        except Exception as e:
+            outbox.put(("reloaded", rss_mb(), str(e)))
+
+    refines = queue.SimpleQueue()
+
+    def refine_loop():
+        # Segunda pasada (Refiner) en su propio hilo: el modelo grande se carga al primer uso
+        from .refine import decode_segments
+        from .transcription import TranscriptionWorker
+        refiner = None
+        while True:
+            req_id, audio, model_size, beam_size, device, cpu_threads = refines.get()
+            try:
+                if refiner is None:
+                    refiner = TranscriptionWorker(on_result=None)
+                    refiner.load_model(device=device, model_size=model_size,
+                                       cpu_threads=cpu_threads)
+                outbox.put(("refined", req_id, decode_segments(refiner._model, audio, beam_size),
+                            None))
+            except Exception as e:
+                outbox.put(("refined", req_id, None, str(e)))
+
+    threading.Thread(target=report, daemon=True).start()
+    threading.Thread(target=refine_loop, daemon=True).start()
+    rings: dict[str, SharedRing] = {}
+    denoisers = {}
+    while True:
+        msg = inbox.get()
+        kind = msg[0]
+        if kind == "chunk":
+            _, source, start, n, captured_at = msg
+            # copia propia: el chunk puede esperar en la cola mas de lo que dura el ring
+            audio = rings[source].copy(start, n)
+            if audio is None:
+                metrics.count(COUNTER_RING_STALE, n / SAMPLE_RATE)
+                outbox.put(("stale", source, start))
+                continue
+            if source in denoisers:
+                audio = denoisers[source].process(audio)
+            pool.enqueue(audio, source, captured_at)
+        elif kind == "ring":
+            _, source, name, capacity, denoise, cached = msg
+            rings[source] = SharedRing(capacity, name)
+            if denoise and source not in denoisers:
+                denoisers[source] = StreamingDenoiser()
+            if cached and pool.cache is not None:
+                pool.cache.add_source(source)
+        elif kind == "drop":
+            # fuente quitada: sus chunks ya se copiaron (llegaron antes por la misma cola)
+            ring = rings.pop(msg[1], None)
+            if ring is not None:
+                ring.close()
+            denoisers.pop(msg[1], None)
+        elif kind == "start":
+            pool.start(warm_up=msg[1])
+            threading.Thread(target=announce_ready, daemon=True).start()
+        elif kind == "finish":
+            pool.finish(msg[1])
+        elif kind == "hold":
+            pool.hold(msg[1])
+        elif kind == "unload":
+            pool.unload_model(to_cpu=msg[1])
+            outbox.put(("unloaded", rss_mb()))
+        elif kind == "reload":
+            # en otro hilo: los chunks siguen llegando a la cola (retenida) mientras recarga
+            threading.Thread(target=reload, daemon=True).start()
+        elif kind == "refine":
+            refines.put(msg[1:])
+        elif kind == "stop":
+            break
+    stop.set()
+    pool.stop()
+    send_stats()
+
+
+# ---------------------------------------------------------------------- #
+#  Proceso de la UI                                                       #
+# ---------------------------------------------------------------------- #
+
+class InferenceProcess:
+    """TranscriptionPool look-alike whose model lives in a supervised child process.
+
+    Same constructor arguments, callbacks (on_result, on_partial, on_done),
+    ready event and methods as TranscriptionPool, plus the IdleEvictor
+    hooks. A supervisor thread per child relays its messages; if the child
+    dies it is started again (at most MAX_RESTARTS per RESTART_WINDOW),
+    and the audio it had not finished is sent again from the rings: the
+    chunks not yet done and, in streaming mode, the tail of each window
+    that was not committed yet (never audio whose text already came out).
+    refine() runs the Refiner's decodes in the child too, so the larger
+    model never loads in the UI process.
+    """
+
+    def __init__(self, on_result, on_partial=None, streaming=False, num_workers=2,
+                 pin_sources=True, share_model=True, batch_size=1,
+                 max_queued_seconds=MAX_QUEUED_SECONDS, overload_policy=POLICY_DROP_OLDEST,
+                 denoise_sources=(), quality=None, cache=None, ring_seconds=RING_SECONDS):
+        self.on_result = on_result
+        self.on_partial = on_partial
+        self.on_done = None
+        self.streaming = streaming
+        self.quality = quality      # reflejo del controlador que corre en el hijo
+        self.ring_seconds = ring_seconds
+        # por fuente, al crear su ring: denoise en el hijo y FingerprintCache
+        self.denoise_sources = set(denoise_sources)
+        self.cache = cache
+        self.ready = threading.Event()
+        self._config = dict(
+            streaming=streaming, num_workers=num_workers, pin_sources=pin_sources,
+            share_model=share_model, batch_size=batch_size,
+            max_queued_seconds=max_queued_seconds, overload_policy=overload_policy,
+            tiers=None, load={},
+            # el FingerprintCache se recrea en el hijo con la misma configuracion
+            cache=(cache.sources, cache.max_bytes, cache.ber_threshold) if cache else None,
+        )
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._rings: dict[str, SharedRing] = {}
+        self._sent: dict[str, deque] = {}       # (start, n, captured_at) enviados y sin terminar
+        self._window: dict[str, deque] = {}     # streaming: pasos ya en la ventana, sin confirmar
+        self._settled_policy: dict[str, int] = {}   # descartados/unidos ya descontados de _sent
+        self._stats: dict = {}
+        self._child_rss = None
+        self._proc = None
+        self._inbox = None
+        self._progress = None
+        self._loaded = threading.Event()
+        self._ack = threading.Event()
+        self._ack_error = None
+        self._error = None
+        self._started = None        # warm_up del start(), para repetirlo tras un reinicio
+        self._held = False
+        self._stopping = False
+        self._restarting = False
+        self._restarts = deque()
+        self._refines: dict[int, list] = {}     # id -> [Event, segmentos, error]
+        self._refine_ids = itertools.count()
+        self.failed = False
+
+    # ------------------------------------------------------------------ #
+    #  Ciclo de vida del hijo                                             #
+    # ------------------------------------------------------------------ #
+
+    def load_model(self, progress_callback=None, **kwargs):
+        """Starts the child and blocks until its model is loaded (kwargs as TranscriptionPool)."""
+        self._progress = progress_callback
+        self._config["load"] = kwargs
+        self._config["tiers"] = tuple(self.quality.tiers) if self.quality else None
+        self._spawn()
+        self._loaded.wait()
+        if self._error:
+            raise RuntimeError(self._error)
+
+    def start(self, warm_up=False):
+        self._started = warm_up
+        self._inbox.put(("start", warm_up))
+
+    def stop(self):
+        self._stopping = True
+        if self._proc is not None:
+            self._inbox.put(("stop",))
+            self._proc.join(5)
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._inbox.cancel_join_thread()
+        self._fail_refines("el proceso de inferencia se detuvo")
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
+
+    def _ring_message(self, source, ring):
+        cached = self.cache is not None and self.cache.applies(source)
+        return ("ring", source, ring.name, ring.capacity, source in self.denoise_sources, cached)
+
+    def _spawn(self):
+        self._loaded.clear()
+        self._error = None
+        inbox, outbox = self._ctx.Queue(), self._ctx.Queue()
+        proc = self._ctx.Process(target=_child_main, args=(self._config, inbox, outbox),
+                                 name="transcriptor-inferencia", daemon=True)
+        proc.start()
+        with self._lock:
+            self._proc, self._inbox = proc, inbox
+            for source, ring in self._rings.items():
+                inbox.put(self._ring_message(source, ring))
+        threading.Thread(target=self._supervise, args=(proc, outbox), daemon=True).start()
+
+    def _supervise(self, proc, outbox):
+        while True:
+            try:
+                msg = outbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if proc.is_alive():
+                    continue
+                if not self._stopping:
+                    self._restart(proc.exitcode)
+                return
+            self._dispatch(msg)
+
+    def _restart(self, exitcode):
+        now = time.monotonic()
+        while self._restarts and now - self._restarts[0] > RESTART_WINDOW:
+            self._restarts.popleft()
+        if len(self._restarts) >= MAX_RESTARTS:
+            print(f"[ERROR] El proceso de inferencia fallo {MAX_RESTARTS} veces en "
+                  f"{RESTART_WINDOW:.0f}s (codigo {exitcode}); no se reinicia")
+            self.failed = True
+            self._fail_refines("el proceso de inferencia no se reinicia")
+            self._loaded.set()
+            return
+        self._restarts.append(now)
+        print(f"[WARN] Proceso de inferencia terminado (codigo {exitcode}): reiniciando")
+        with self._lock:
+            self._restarting = True     # lo que llegue mientras tanto se envia con el reenvio
+        self._fail_refines(f"el proceso de inferencia termino (codigo {exitcode})")
+        self._spawn()
+        self._loaded.wait()
+        if self._error:
+            print(f"[ERROR] No se pudo reiniciar la inferencia: {self._error}")
+            return
+        if self._started is not None:
+            self._inbox.put(("start", self._started))
+        # Reenviar lo que el hijo anterior recibio pero no llego a terminar, retenido
+        # para que la politica de sobrecarga no descarte ese atraso (ChunkScheduler.hold)
+        with self._lock:
+            self._settled_policy.clear()
+            self._inbox.put(("hold", True))
+            resent = 0
+            for source in list(self._sent):
+                # la ventana del hijo anterior se pierde: su tramo sin confirmar va primero,
+                # y el orden se mantiene (el streaming necesita los pasos contiguos)
+                ring = self._rings[source]
+                sent = self._sent[source] = deque(
+                    step for step in (*self._window.pop(source, ()), *self._sent[source])
+                    if ring.valid(step[0])
+                )
+                for start, n, captured_at in sent:
+                    self._inbox.put(("chunk", source, start, n, captured_at))
+                resent += len(sent)
+            if not self._held:
+                self._inbox.put(("hold", False))
+            self._restarting = False
+        print(f"[OK] Inferencia reiniciada ({resent} chunks reenviados)")
+
+    def _dispatch(self, msg):
+        kind = msg[0]
+        if kind == "result":
+            if self.on_result:
+                self.on_result(msg[1], msg[2], msg[3])
+        elif kind == "partial":
+            if self.on_partial:
+                self.on_partial(msg[1], msg[2])
+        elif kind == "done":
+            with self._lock:
+                sent = self._sent.get(msg[1])
+                if sent:
+                    step = sent.popleft()
+                    if self.streaming:
+                        self._window.setdefault(msg[1], deque()).append(step)
+            if self.on_done:
+                self.on_done(msg[1])
+        elif kind == "stale":
+            # el padre piso el chunk antes de que el hijo lo leyera: no vuelve como done
+            with self._lock:
+                sent = self._sent.get(msg[1], ())
+                for step in sent:
+                    if step[0] == msg[2]:
+                        sent.remove(step)
+                        break
+            if self.on_done:
+                self.on_done(msg[1])
+        elif kind == "window":
+            self._trim_window(msg[1], msg[2])
+        elif kind == "stats":
+            _, stats, tier, rss, records = msg
+            self._stats = stats
+            self._child_rss = rss
+            if tier and self.quality:
+                self.quality.follow(tier)
+            metrics.apply(records)
+            self._settle(stats)
+        elif kind == "progress":
+            if self._progress:
+                self._progress(msg[1])
+        elif kind == "loaded":
+            self._loaded.set()
+        elif kind == "error":
+            self._error = msg[1]
+            self._loaded.set()
+        elif kind == "ready":
+            self.ready.set()
+        elif kind == "unloaded":
+            self._child_rss = msg[1]
+            self._ack.set()
+        elif kind == "reloaded":
+            self._child_rss = msg[1]
+            self._ack_error = msg[2]
+            self._ack.set()
+        elif kind == "refined":
+            with self._lock:
+                pending = self._refines.get(msg[1])
+            if pending:
+                pending[1:] = msg[2:]
+                pending[0].set()
+
+    def _fail_refines(self, error: str):
+        with self._lock:
+            pending = list(self._refines.values())
+        for req in pending:
+            req[2] = error
+            req[0].set()
+
+    def _trim_window(self, source: str, pending: int):
+        """Forgets the window's steps whose text came out; pending = samples left uncommitted."""
+        with self._lock:
+            steps = self._window.get(source)
+            if not steps:
+                return
+            total = sum(n for _, n, _ in steps)
+            while steps and total - steps[0][1] >= pending:
+                total -= steps.popleft()[1]
+            if steps and total > pending:
+                # el primer paso quedo confirmado en parte: reenviar solo su final
+                start, n, captured_at = steps[0]
+                skip = total - pending
+                steps[0] = (start + skip, n - skip, captured_at)
+
+    def _settle(self, stats: dict):
+        """Chunks dropped or merged by the overload policy never come back as done."""
+        with self._lock:
+            for source, st in stats.items():
+                lost = st.get("dropped_chunks", 0) + st.get("merged_chunks", 0)
+                sent = self._sent.get(source)
+                for _ in range(lost - self._settled_policy.get(source, 0)):
+                    if sent:
+                        sent.popleft()
+                self._settled_policy[source] = lost
+
+    # ------------------------------------------------------------------ #
+    #  Interfaz de TranscriptionPool                                      #
+    # ------------------------------------------------------------------ #
+
+    def enqueue(self, audio: np.ndarray, source: str, captured_at: float | None = None):
+        if captured_at is None:
+            captured_at = time.monotonic()
+        with self._lock:
+            ring = self._rings.get(source)
+            if ring is None:
+                ring = self._rings[source] = SharedRing(int(self.ring_seconds * SAMPLE_RATE))
+                self._sent[source] = deque()
+                self._inbox.put(self._ring_message(source, ring))
+            start = ring.write(audio)
+            self._sent[source].append((start, len(audio), captured_at))
+            if not self._restarting:
+                self._inbox.put(("chunk", source, start, len(audio), captured_at))
+
+    def remove_source(self, source: str):
+        """Releases a removed source's ring and denoiser, once its last chunk was enqueued.
+
+        If the source is added again it gets a new ring and the denoise flag
+        it has then.
+        """
+        self.denoise_sources.discard(source)
+        with self._lock:
+            ring = self._rings.pop(source, None)
+            if ring is None:
+                return
+            self._sent.pop(source, None)
+            self._window.pop(source, None)
+            self._settled_policy.pop(source, None)
+            self._inbox.put(("drop", source))
+        # el hijo tiene su propio mapeo: los chunks aun en su cola se siguen copiando
+        ring.close()
+
+    def queue_stats(self) -> dict:
+        return dict(self._stats)
+
+    def finish(self, source=None):
+        self._inbox.put(("finish", source))
+
+    def hold(self, held: bool):
+        self._held = held
+        self._inbox.put(("hold", held))
+
+    def unload_model(self, to_cpu=False):
+        self._ack.clear()
+        self._inbox.put(("unload", to_cpu))
+        self._ack.wait(ACK_TIMEOUT)
+
+    def reload_model(self):
+        self._ack.clear()
+        self._inbox.put(("reload",))
+        if not self._ack.wait(ACK_TIMEOUT):
+            raise RuntimeError("el proceso de inferencia no respondio")
+        if self._ack_error:
+            raise RuntimeError(self._ack_error)
+
+    def refine(self, audio: np.ndarray, model_size, beam_size, device="auto", cpu_threads=0):
+        """Decodes audio with the Refiner's model inside the child (Refiner decoder).
+
+        Blocks until the child answers; raises RuntimeError if the decode
+        fails or the child dies first.
+        """
+        if self.failed:
+            raise RuntimeError("el proceso de inferencia no esta disponible")
+        req = [threading.Event(), None, None]
+        with self._lock:
+            if self._restarting:
+                raise RuntimeError("el proceso de inferencia se esta reiniciando")
+            req_id = next(self._refine_ids)
+            self._refines[req_id] = req
+            self._inbox.put(("refine", req_id, np.ascontiguousarray(audio, dtype=np.float32),
+                             model_size, beam_size, device, cpu_threads))
+        try:
+            if not req[0].wait(REFINE_TIMEOUT):
+                raise RuntimeError("el proceso de inferencia no respondio")
+        finally:
+            with self._lock:
+                self._refines.pop(req_id, None)
+        if req[2]:
+            raise RuntimeError(req[2])
+        return req[1]
+
+    def rss_mb(self) -> float | None:
+        """Resident memory of both processes (the child's as of its last report)."""
+        own = rss_mb()
+        if own is None or self._child_rss is None:
+            return own
+        return own + self._child_rss
@@ -0,0 +1,299 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from .transcript import TranscriptStore, entry_time
+
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".transcriptor", "sesiones")
+FSYNC_INTERVAL = 1.0        # segundos maximos de resultados sin fsync
+JOURNAL_VERSION = 1
+
+_TYPE_HEADER = "header"
+_TYPE_RESUME = "resume"
+_TYPE_RESULT = "r"
+_TYPE_REPLACE = "replace"
+_TYPE_END = "end"
+
+
+def _is_closed(path: str) -> bool:
+    """True if the last complete record of the journal is an end record."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            return json.loads(line).get("type") == _TYPE_END
+        except ValueError:
+            continue        # ultima linea cortada por el crash
+    return False
+
+
+def _truncate_torn_tail(path: str):
+    """Drops a partial last line left by a crash mid-write."""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if not size:
+            return
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        cut = tail.rfind(b"\n")
+        f.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+
+
+def _append_record(path: str, record: dict):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _scan_replaces(path: str) -> list[list]:
+    """[source, start, end, offset] of every replace record in the journal."""
+    replaces = []
+    with open(path, "rb") as f:
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            if b'"replace"' in line:
+                r = json.loads(line)
+                if r.get("type") == _TYPE_REPLACE:
+                    replaces.append([r["source"], r["start"], r["end"], offset])
+    return replaces
+
+
+def _covering(replaces: list[list], record: dict) -> int | None:
+    at = entry_time(record)
+    if at is None:
+        return None
+    for i, (source, start, end, _) in enumerate(replaces):
+        if record["source"] == source and start < at <= end:
+            return i
+    return None
+
+
+def _iter_journal(path: str, replaces: list[list]):
+    emitted = set()
+    with open(path, "rb") as f, open(path, "rb") as side:
+        end = os.fstat(f.fileno()).st_size
+        while f.tell() < end:
+            offset = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == _TYPE_RESULT:
+                k = _covering(replaces, record) if replaces else None
+                if k is None:
+                    yield record
+                    continue
+                # primer resultado reemplazado: en su lugar van las entradas refinadas
+                if k not in emitted:
+                    emitted.add(k)
+                    side.seek(replaces[k][3])
+                    yield from json.loads(side.readline())["entries"]
+            elif kind == _TYPE_REPLACE:
+                k = next((i for i, r in enumerate(replaces) if r[3] == offset), None)
+                if k is None or k not in emitted:
+                    emitted.add(k)
+                    yield from record["entries"]
+
+
+def read_journal(path: str):
+    """Entries of a journal on disk (closed or not), with replaced results substituted."""
+    yield from _iter_journal(path, _scan_replaces(path))
+
+
+def list_sessions(directory: str = JOURNAL_DIR) -> list[str]:
+    """Every journal in the directory, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, "sesion_*.jsonl")))
+
+
+def find_interrupted(directory: str = JOURNAL_DIR) -> list[str]:
+    """Journals without an end record (the process died), oldest first."""
+    return [p for p in list_sessions(directory) if not _is_closed(p)]
+
+
+def find_closed(directory: str = JOURNAL_DIR) -> list[str]:
+    """Journals that ended with an end record (complete), oldest first."""
+    return [p for p in list_sessions(directory) if _is_closed(p)]
+
+
+def recover_sessions(directory: str = JOURNAL_DIR) -> str | None:
+    """Repairs interrupted sessions on startup.
+
+    Every interrupted journal gets its torn tail removed. All but the most
+    recent one are closed with an end record marked as recovered; the path of
+    the most recent one is returned so the new session can resume it.
+    """
+    interrupted = find_interrupted(directory)
+    for path in interrupted:
+        _truncate_torn_tail(path)
+    for path in interrupted[:-1]:
+        _append_record(path, {"type": _TYPE_END, "recovered": True,
+                              "time": datetime.now().isoformat(timespec="seconds")})
+        print(f"[WARN] Sesion interrumpida cerrada: {path}")
+    return interrupted[-1] if interrupted else None
+
+
+class SessionJournal(TranscriptStore):
+    """Append-only JSONL journal of the session's confirmed results.
+
+    A TranscriptStore whose history lives on disk instead of in memory:
+    append() only hands the record to a writer thread, which writes it
+    right away and fsyncs at most every FSYNC_INTERVAL seconds. Readers
+    stream the file back, so memory stays flat however long the session
+    runs. clear() closes the journal and starts a new one.
+
+    replace() appends a record that supersedes earlier results of a source
+    in a capture-time range (refinement pass). Only the ranges and file
+    offsets are kept in memory; readers skip the superseded results and
+    read the replacement entries back from the file in their place.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, resume: str | None = None,
+                 fsync_interval: float = FSYNC_INTERVAL):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.path = None
+        self._count = 0
+        self._replaces = []     # [source, start, end, offset del registro en el archivo]
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._open(resume)
+
+    def __len__(self):
+        return self._count
+
+    # ------------------------------------------------------------------ #
+
+    def _open(self, resume: str | None):
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.now()
+        self._replaces = []
+        if resume:
+            self.path = resume
+            self._scan_replaces()
+            self._count = sum(1 for _ in self.iter_entries())
+            header = {"type": _TYPE_RESUME, "time": now.isoformat(timespec="seconds")}
+            print(f"[OK] Sesion recuperada ({self._count} resultados): {resume}")
+        else:
+            self.path = os.path.join(self.directory, f"sesion_{now.strftime('%Y%m%d_%H%M%S_%f')}.jsonl")
+            self._count = 0
+            header = {"type": _TYPE_HEADER, "version": JOURNAL_VERSION,
+                      "time": now.isoformat(timespec="seconds")}
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(header) + "\n")
+        self._file.flush()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _writer(self):
+        f = self._file
+        last_sync = time.monotonic()
+        pending = False
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = ()
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item:
+                    if item.get("type") == _TYPE_REPLACE:
+                        f.flush()
+                        self._replaces.append(
+                            [item["source"], item["start"], item["end"], f.buffer.tell()]
+                        )
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    pending = True
+
+            if pending or waiters:
+                f.flush()
+            if pending and (stop or time.monotonic() - last_sync >= self.fsync_interval):
+                os.fsync(f.fileno())
+                last_sync = time.monotonic()
+                pending = False
+            for event in waiters:
+                event.set()
+            if stop:
+                return
+
+    def sync(self):
+        """Blocks until every appended record is written (not necessarily fsync'd)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Writes the end record and stops the writer. The journal counts as complete."""
+        if self._thread is None:
+            return
+        self._queue.put({"type": _TYPE_END, "time": datetime.now().isoformat(timespec="seconds")})
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    # ------------------------------------------------------------------ #
+    #  TranscriptStore                                                     #
+    # ------------------------------------------------------------------ #
+
+    def append(self, entry: dict):
+        record = {"type": _TYPE_RESULT, "source": entry["source"], "text": entry["text"],
+                  "ts": entry.get("ts")}
+        for key in ("captured_at", "start", "end"):
+            if entry.get(key) is not None:
+                record[key] = round(entry[key], 3)
+        self._count += 1
+        self._queue.put(record)
+
+    def clear(self):
+        self.close()
+        self._open(None)
+
+    def replace(self, source: str, start: float, end: float, entries: list[dict]):
+        records = []
+        for entry in entries:
+            record = {"source": entry["source"], "text": entry["text"], "ts": entry.get("ts"),
+                      "captured_at": round(entry["captured_at"], 3)}
+            for key in ("start", "end"):
+                if entry.get(key) is not None:
+                    record[key] = round(entry[key], 3)
+            if entry.get("refined"):
+                record["refined"] = True
+            records.append(record)
+        self._queue.put({"type": _TYPE_REPLACE, "source": source, "start": round(start, 3),
+                         "end": round(end, 3), "entries": records})
+
+    def _scan_replaces(self):
+        self._replaces = _scan_replaces(self.path)
+
+    def iter_entries(self):
+        self.sync()
+        yield from _iter_journal(self.path, list(self._replaces))
@@ -0,0 +1,283 @@
+import csv
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Etapas del pipeline (segundos)
+STAGE_CALLBACK = "callback"      # duracion del callback de PortAudio
+STAGE_DSP = "dsp"                # downmix + resampleo de un bloque
+STAGE_QUEUE = "queue_wait"       # espera del chunk en la cola del worker
+STAGE_DENOISE = "denoise"
+STAGE_ECHO = "echo"              # deteccion de eco MIC <- SISTEMA por chunk
+STAGE_TRANSCRIBE = "transcribe"
+STAGE_UI = "ui"                  # on_result -> texto dibujado por App._render
+STAGE_END_TO_END = "end_to_end"  # captura del ultimo sample del chunk -> texto en pantalla
+
+# Contadores acumulados (segundos)
+COUNTER_ECHO_CHECKED = "echo_checked_s"      # audio del MIC analizado
+COUNTER_ECHO_DROPPED = "echo_dropped_s"      # audio del MIC descartado por ser eco
+COUNTER_ECHO_SAVED = "echo_saved_compute_s"  # computo estimado ahorrado (descartado x RTF)
+COUNTER_GATE_CHECKED = "gate_checked_s"      # audio que paso por el SpeechGate
+COUNTER_GATE_DROPPED = "gate_dropped_s"      # chunks sin voz descartados enteros
+COUNTER_GATE_TRIMMED = "gate_trimmed_s"      # silencio recortado al inicio/fin de chunks con voz
+COUNTER_FP_CHECKED = "fp_checked_s"          # audio buscado en el FingerprintCache
+COUNTER_FP_HIT = "fp_hit_s"                  # audio resuelto por el cache, sin pasar por el modelo
+COUNTER_FP_NON_SPEECH = "fp_non_speech_s"    # parte de los aciertos que era musica/silencio conocido
+COUNTER_RING_STALE = "ring_stale_s"          # chunks pisados en el ring antes de que el hijo los leyera
+
+_MIN_VALUE = 1e-6
+_BUCKETS_PER_OCTAVE = 4
+_N_BUCKETS = 128                 # ~1 us .. ~4 h
+
+
+class Histogram:
+    """Log-bucketed histogram: O(1) record, percentiles within ~19%.
+
+    record() takes no lock; under the GIL a concurrent update can at worst
+    lose a single count, which is fine for monitoring.
+    """
+
+    def __init__(self):
+        self.counts = [0] * _N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        if value > _MIN_VALUE:
+            i = min(_N_BUCKETS - 1, int(math.log2(value / _MIN_VALUE) * _BUCKETS_PER_OCTAVE))
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        target = p / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                # punto medio geometrico del bucket
+                return min(self.max, _MIN_VALUE * 2 ** ((i + 0.5) / _BUCKETS_PER_OCTAVE))
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class PipelineMetrics:
+    """Per-stage timing histograms, cumulative counters and a rolling real-time factor."""
+
+    def __init__(self, rtf_window=50):
+        self._stages: dict[str, Histogram] = {}
+        self._counters: dict[str, float] = {}
+        self._counter_lock = threading.Lock()
+        self._work = deque(maxlen=rtf_window)   # (audio_s, compute_s) de las ultimas decodificaciones
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+        # callback((metodo, *args)) con cada medicion: el proceso de inferencia
+        # reenvia asi sus metricas al proceso de la UI
+        self.forward = None
+
+    def record(self, stage: str, seconds: float):
+        if self.forward:
+            self.forward(("record", stage, seconds))
+        hist = self._stages.get(stage)
+        if hist is None:
+            hist = self._stages.setdefault(stage, Histogram())
+        hist.record(seconds)
+
+    def count(self, name: str, amount: float = 1):
+        if self.forward:
+            self.forward(("count", name, amount))
+        with self._counter_lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def add_work(self, audio_seconds: float, compute_seconds: float):
+        if self.forward:
+            self.forward(("add_work", audio_seconds, compute_seconds))
+        self._work.append((audio_seconds, compute_seconds))
+
+    def apply(self, records: list):
+        """Replays measurements captured by another process's forward callback."""
+        for method, *args in records:
+            getattr(self, method)(*args)
+
+    def rtf(self) -> float:
+        """Compute time / audio time over the last decodes (< 1 keeps up with real time)."""
+        work = list(self._work)
+        audio = sum(a for a, _ in work)
+        return sum(c for _, c in work) / audio if audio else 0.0
+
+    def stage(self, name: str) -> Histogram:
+        return self._stages.get(name) or Histogram()
+
+    def snapshot(self) -> dict:
+        return {
+            "time": time.time(),
+            "rtf": self.rtf(),
+            "stages": {name: h.summary() for name, h in list(self._stages.items())},
+            "counters": dict(self._counters),
+        }
+
+    def status_line(self, queue_depth: int) -> str:
+        """Compact live readout for the status bar."""
+        e2e = self.stage(STAGE_END_TO_END)
+        return (
+            f"RTF {self.rtf():.2f} · cola {queue_depth} · "
+            f"latencia p50 {e2e.percentile(50):.1f}s p95 {e2e.percentile(95):.1f}s"
+        )
+
+    def reset(self):
+        self._stages.clear()
+        self._counters.clear()
+        self._work.clear()
+
+    # ------------------------------------------------------------------ #
+    #  Volcado periodico                                                  #
+    # ------------------------------------------------------------------ #
+
+    def start_dump(self, path: str, interval: float = 10.0):
+        """Appends a snapshot to path every interval seconds (.csv -> CSV rows, else JSON lines)."""
+        self.stop_dump()
+        self._dump_stop.clear()
+        self._dump_thread = threading.Thread(
+            target=self._dump_loop, args=(path, interval), daemon=True
+        )
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_thread:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def _dump_loop(self, path, interval):
+        while not self._dump_stop.wait(interval):
+            try:
+                self.dump(path)
+            except OSError as e:
+                print(f"[WARN] No se pudieron guardar las metricas: {e}")
+
+    def dump(self, path: str):
+        snap = self.snapshot()
+        if not path.lower().endswith(".csv"):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snap) + "\n")
+            return
+        new = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(["time", "stage", "count", "mean", "p50", "p95", "p99", "max", "rtf"])
+            for name, s in snap["stages"].items():
+                writer.writerow([
+                    f"{snap['time']:.3f}", name, s["count"], f"{s['mean']:.6f}",
+                    f"{s['p50']:.6f}", f"{s['p95']:.6f}", f"{s['p99']:.6f}",
+                    f"{s['max']:.6f}", f"{snap['rtf']:.4f}",
+                ])
+            for name, value in snap["counters"].items():
+                writer.writerow([f"{snap['time']:.3f}", name, f"{value:.3f}", "", "", "", "", "", ""])
+
+
+def rss_mb() -> float | None:
+    """Resident memory of this process in MB (psutil if installed), or None if unknown."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+            ]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize / 1e6
+        return None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    return None
+
+
+class StartupTimer:
+    """Wall-clock breakdown of the cold start, measured from process launch.
+
+    Phases may overlap (the model loads while the UI is built), so each one
+    keeps its own start/end offsets; marks are single points such as
+    "listo".
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._phases: dict[str, tuple[float, float]] = {}
+        self._marks: dict[str, float] = {}
+
+    def begin(self, t0: float):
+        """Moves the origin back to an earlier perf_counter() (e.g. top of main.py)."""
+        self.t0 = t0
+
+    def phase(self, name: str):
+        timer = self
+
+        class _Phase:
+            def __enter__(self):
+                self.start = time.perf_counter() - timer.t0
+                return self
+
+            def __exit__(self, *exc):
+                timer._phases[name] = (self.start, time.perf_counter() - timer.t0)
+
+        return _Phase()
+
+    def mark(self, name: str):
+        self._marks[name] = time.perf_counter() - self.t0
+
+    def summary(self) -> dict:
+        return {
+            "phases": {n: {"start": a, "end": b, "seconds": b - a} for n, (a, b) in self._phases.items()},
+            "marks": dict(self._marks),
+        }
+
+    def report(self) -> str:
+        parts = [f"{n} {b - a:.2f}s" for n, (a, b) in self._phases.items()]
+        parts += [f"{n} @ {t:.2f}s" for n, t in self._marks.items()]
+        return " | ".join(parts)
+
+
+# Registro compartido por captura, worker y UI
+metrics = PipelineMetrics()
+startup = StartupTimer()
@@ -0,0 +1,244 @@
+import contextlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from .scheduler import ChunkScheduler, MAX_QUEUED_SECONDS, POLICY_DROP_OLDEST
+from .transcription import MODEL_SIZE, TranscriptionWorker, _chunk_info, _set_loaded
+
+
+class TranscriptionPool:
+    """Several TranscriptionWorkers behind the TranscriptionWorker interface.
+
+    pin_sources=True gives every source its own worker (first come, first
+    served, round robin once there are more sources than workers), so a
+    chunk from one source never waits for the other's decode and per-source
+    order comes for free. Streaming mode keeps per-source windows and
+    therefore requires pinning.
+
+    Without pinning all workers pull from one shared ChunkScheduler. Chunks
+    are numbered per source when they are taken from the queue, and a
+    reorder buffer releases results in that order even when a later chunk
+    finishes first.
+
+    share_model=True loads a single model with num_workers concurrent
+    decoders; otherwise every worker loads its own copy. Either way the
+    cpu_threads budget (0 = all cores) is split across workers so they do not
+    oversubscribe the CPU.
+    """
+
+    def __init__(self, on_result, on_partial=None, streaming=False, num_workers=2,
+                 pin_sources=True, share_model=True, batch_size=1,
+                 max_queued_seconds=MAX_QUEUED_SECONDS, overload_policy=POLICY_DROP_OLDEST,
+                 denoise_sources=(), quality=None, cache=None):
+        if streaming and not pin_sources:
+            raise ValueError("El modo streaming requiere pin_sources=True")
+        self.on_result = on_result
+        self.on_partial = on_partial
+        self.on_done = None      # callback(source) por chunk terminado (ver TranscriptionWorker)
+        self.on_window = None    # streaming: callback(source, samples) (ver TranscriptionWorker)
+        self.streaming = streaming
+        self.num_workers = max(1, num_workers)
+        self.pin_sources = pin_sources
+        self.share_model = share_model
+        self.quality = quality      # compartido: el RTF medido es el del pool completo
+        self.cache = cache          # FingerprintCache compartido: lo visto por un worker sirve a todos
+        self.workers = [
+            TranscriptionWorker(
+                on_result=self._emit, on_partial=self._emit_partial, streaming=streaming,
+                batch_size=batch_size, max_queued_seconds=max_queued_seconds,
+                overload_policy=overload_policy, denoise_sources=denoise_sources,
+                quality=quality, cache=cache,
+            )
+            for _ in range(self.num_workers)
+        ]
+        for w in self.workers:
+            w.on_done = self._emit_done
+            w.on_window = self._emit_window
+        self._routes: dict[str, TranscriptionWorker] = {}
+        self._threads = []
+        self.ready = threading.Event()
+
+        if not pin_sources:
+            self._queue = ChunkScheduler(max_queued_seconds, overload_policy)
+            for w in self.workers:
+                w._queue = self._queue
+            self._take_lock = threading.Lock()
+            self._order_lock = threading.Lock()
+            self._next_seq: dict[str, int] = {}     # siguiente numero a asignar por fuente
+            self._emit_seq: dict[str, int] = {}     # siguiente numero a entregar por fuente
+            self._pending: dict[str, dict] = {}     # seq -> (text, info) terminados fuera de orden
+
+    def _emit(self, text, source, info):
+        self.on_result(text, source, info)
+
+    def _emit_done(self, source):
+        if self.on_done:
+            self.on_done(source)
+
+    def _emit_window(self, source, samples):
+        if self.on_window:
+            self.on_window(source, samples)
+
+    def _emit_partial(self, text, source):
+        if self.on_partial:
+            self.on_partial(text, source)
+
+    # ------------------------------------------------------------------ #
+    #  Modelo                                                             #
+    # ------------------------------------------------------------------ #
+
+    def load_model(self, progress_callback=None, device="auto",
+                   model_size=MODEL_SIZE, cpu_threads=0, compute_type=None):
+        """Loads one shared model (num_workers decoders) or one model per worker."""
+        total = cpu_threads or os.cpu_count() or 1
+        per_worker = max(1, total // self.num_workers)
+        first = self.workers[0]
+        if self.share_model:
+            first.load_model(progress_callback, device, model_size, cpu_threads=per_worker,
+                             num_workers=self.num_workers, compute_type=compute_type)
+            for w in self.workers[1:]:
+                w.use_model(first._model, first._fallbacks)
+        else:
+            for w in self.workers:
+                w.load_model(progress_callback, device, model_size, cpu_threads=per_worker,
+                             num_workers=1, compute_type=compute_type)
+        print(f"[OK] {self.num_workers} workers x {per_worker} hilos "
+              f"({'modelo compartido' if self.share_model else 'un modelo por worker'})")
+
+    def unload_model(self, to_cpu=False):
+        """Frees the weights of every worker's model (see TranscriptionWorker.unload_model)."""
+        with contextlib.ExitStack() as stack:
+            for w in self.workers:
+                stack.enter_context(w._decode_lock)
+            for w in self.workers:
+                w.loaded.clear()
+            _set_loaded([m for w in self.workers for m in w._models()], False, to_cpu)
+
+    def reload_model(self):
+        _set_loaded([m for w in self.workers for m in w._models()], True)
+        for w in self.workers:
+            w.loaded.set()
+
+    def hold(self, held: bool):
+        if not self.pin_sources:
+            self._queue.hold(held)
+            return
+        for w in self.workers:
+            w.hold(held)
+
+    # ------------------------------------------------------------------ #
+    #  Interfaz de TranscriptionWorker                                    #
+    # ------------------------------------------------------------------ #
+
+    def start(self, warm_up=False):
+        if self.pin_sources:
+            # Con modelo compartido basta un warm-up; cada copia necesita el suyo
+            for i, w in enumerate(self.workers):
+                w.start(warm_up=warm_up and (i == 0 or not self.share_model))
+        else:
+            for i, w in enumerate(self.workers):
+                w._running = True
+                t = threading.Thread(
+                    target=self._pool_worker,
+                    args=(w, warm_up and (i == 0 or not self.share_model)),
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+        threading.Thread(target=self._wait_ready, daemon=True).start()
+
+    def _wait_ready(self):
+        for w in self.workers:
+            w.ready.wait()
+        self.ready.set()
+
+    def stop(self):
+        if self.pin_sources:
+            for w in self.workers:
+                w.stop()
+            return
+        for w in self.workers:
+            w._running = False
+        for _ in self.workers:
+            self._queue.put(None)
+
+    def enqueue(self, audio: np.ndarray, source: str, captured_at: float | None = None):
+        if captured_at is None:
+            captured_at = time.monotonic()
+        if self.pin_sources:
+            self._route(source).enqueue(audio, source, captured_at)
+        else:
+            self._queue.put((audio, source, captured_at))
+
+    def queue_stats(self) -> dict:
+        if not self.pin_sources:
+            return self._queue.stats()
+        stats = {}
+        for w in self.workers:
+            stats.update(w.queue_stats())
+        return stats
+
+    def finish(self, source=None):
+        if not self.streaming:
+            return
+        if source is not None:
+            if source in self._routes:
+                self._routes[source].finish(source)
+            return
+        for w in self.workers:
+            w.finish()
+
+    def _route(self, source: str) -> TranscriptionWorker:
+        w = self._routes.get(source)
+        if w is None:
+            w = self._routes[source] = self.workers[len(self._routes) % self.num_workers]
+        return w
+
+    # ------------------------------------------------------------------ #
+    #  Cola compartida + reordenamiento                                   #
+    # ------------------------------------------------------------------ #
+
+    def _pool_worker(self, worker: TranscriptionWorker, warm_up: bool):
+        if warm_up:
+            worker.warm_up()
+        worker.ready.set()
+        while worker._running:
+            # Tomar el lote y numerarlo de forma atomica: el orden de los
+            # numeros es el orden en que los chunks salieron de la cola
+            with self._take_lock:
+                items = worker._next_batch()
+                if items is None:
+                    return
+                seqs = []
+                for it in items:
+                    n = self._next_seq.get(it[1], 0)
+                    self._next_seq[it[1]] = n + 1
+                    seqs.append(n)
+            tier = worker.current_tier()
+            try:
+                texts = worker.transcribe_chunks(items, tier)
+            except Exception as e:
+                print(f"[ERROR] Transcripcion: {e}")
+                texts = [""] * len(items)
+            for it, seq, text in zip(items, seqs, texts):
+                self._complete(it[1], seq, text, _chunk_info(it, tier))
+
+    def _complete(self, source, seq, text, info):
+        """Stores a finished chunk and releases every in-order result that is now ready."""
+        with self._order_lock:
+            pending = self._pending.setdefault(source, {})
+            pending[seq] = (text, info)
+            n = self._emit_seq.get(source, 0)
+            ready = []
+            while n in pending:
+                ready.append(pending.pop(n))
+                n += 1
+            self._emit_seq[source] = n
+            # Entregar dentro del lock: otro hilo no puede adelantar resultados de la misma fuente
+            for text, info in ready:
+                if text:
+                    self.on_result(text, source, info)
+                self._emit_done(source)
@@ -0,0 +1,126 @@
+import threading
+import time
+
+FALLBACK_MODEL = "small"
+
+RTF_DOWN = 0.9           # RTF por encima de esto: bajar un nivel
+RTF_UP = 0.5             # RTF por debajo de esto (y cola casi vacia): subir un nivel
+QUEUE_DOWN_SECONDS = 6   # audio en cola (peor fuente) que obliga a bajar
+QUEUE_UP_SECONDS = 1
+LAG_DOWN_SECONDS = 3.0   # streaming: texto mas atrasado que esto respecto a la captura: bajar
+LAG_UP_SECONDS = 1.0
+HOLD_SECONDS = 5         # tiempo minimo en un nivel antes de volver a cambiar
+RTF_SMOOTHING = 0.3      # peso de cada decode en el promedio exponencial del RTF
+
+
+class Tier:
+    """One decoding setting. model=None means the primary model."""
+
+    def __init__(self, name: str, beam_size: int, model: str | None = None):
+        self.name = name
+        self.beam_size = beam_size
+        self.model = model
+
+    def __repr__(self):
+        return f"Tier({self.name!r}, beam_size={self.beam_size}, model={self.model!r})"
+
+
+# De mayor a menor calidad
+TIERS = (
+    Tier("alta", beam_size=5),
+    Tier("rapida", beam_size=1),
+    Tier("ligera", beam_size=1, model=FALLBACK_MODEL),
+)
+
+
+class QualityController:
+    """Steps decoding quality down when the pipeline falls behind real time
+    and back up when there is headroom.
+
+    Fed after every decode with the audio/compute seconds and the queued
+    audio (observe), or in streaming mode with the lag behind capture alone
+    (observe_lag): a streaming decode slower than one step just absorbs the
+    steps that arrived meanwhile, so its RTF sits near 1 whether or not the
+    stream keeps up. Both signals are exponential averages over recent
+    decodes, so they follow the active tier quickly. Hysteresis comes from
+    the gap between the down and up thresholds plus a minimum dwell time
+    per tier; after a step the averages restart so the old tier's speed
+    doesn't trigger a second step.
+    """
+
+    def __init__(self, tiers=TIERS, rtf_down=RTF_DOWN, rtf_up=RTF_UP,
+                 queue_down=QUEUE_DOWN_SECONDS, queue_up=QUEUE_UP_SECONDS,
+                 lag_down=LAG_DOWN_SECONDS, lag_up=LAG_UP_SECONDS, hold_seconds=HOLD_SECONDS):
+        self.tiers = tuple(tiers)
+        self.rtf_down = rtf_down
+        self.rtf_up = rtf_up
+        self.queue_down = queue_down
+        self.queue_up = queue_up
+        self.lag_down = lag_down
+        self.lag_up = lag_up
+        self.hold_seconds = hold_seconds
+        self._index = 0
+        self._rtf = None
+        self._lag = None
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def tier(self) -> Tier:
+        return self.tiers[self._index]
+
+    @property
+    def models(self) -> set:
+        """Extra model sizes the tiers need preloaded."""
+        return {t.model for t in self.tiers if t.model}
+
+    def follow(self, name: str):
+        """Mirrors the tier of a controller running in another process (by name)."""
+        for i, t in enumerate(self.tiers):
+            if t.name == name:
+                self._index = i
+                return
+
+    def observe(self, audio_seconds: float, compute_seconds: float, queued_seconds: float) -> Tier:
+        with self._lock:
+            if audio_seconds > 0:
+                rtf = compute_seconds / audio_seconds
+                self._rtf = rtf if self._rtf is None else (
+                    (1 - RTF_SMOOTHING) * self._rtf + RTF_SMOOTHING * rtf
+                )
+            now = time.monotonic()
+            if self._rtf is None or now - self._changed_at < self.hold_seconds:
+                return self.tier
+
+            behind = self._rtf > self.rtf_down or queued_seconds > self.queue_down
+            headroom = self._rtf < self.rtf_up and queued_seconds < self.queue_up
+            reason = f"RTF {self._rtf:.2f}, cola {queued_seconds:.1f}s"
+            if behind and self._index < len(self.tiers) - 1:
+                self._step(+1, now, reason)
+            elif headroom and self._index > 0:
+                self._step(-1, now, reason)
+            return self.tier
+
+    def observe_lag(self, lag_seconds: float) -> Tier:
+        """Streaming: how far the decoded audio lags behind capture after a decode."""
+        with self._lock:
+            self._lag = lag_seconds if self._lag is None else (
+                (1 - RTF_SMOOTHING) * self._lag + RTF_SMOOTHING * lag_seconds
+            )
+            now = time.monotonic()
+            if now - self._changed_at < self.hold_seconds:
+                return self.tier
+            reason = f"retraso {self._lag:.1f}s"
+            if self._lag > self.lag_down and self._index < len(self.tiers) - 1:
+                self._step(+1, now, reason)
+            elif self._lag < self.lag_up and self._index > 0:
+                self._step(-1, now, reason)
+            return self.tier
+
+    def _step(self, delta, now, reason):
+        old = self.tier
+        self._index += delta
+        print(f"[WARN] Calidad {old.name} -> {self.tier.name} ({reason})")
+        self._rtf = None
+        self._lag = None
+        self._changed_at = now
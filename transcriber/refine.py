@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .archive import AudioArchive
+from .buffer import SAMPLE_RATE
+from .transcription import LANGUAGE, VAD_PARAMETERS, TranscriptionWorker
+
+REFINE_MODEL = "large-v3"
+REFINE_BEAM = 5
+WINDOW_SECONDS = 25          # audio por pasada (cabe en la ventana de 30 s de Whisper)
+CUT_SEARCH_SECONDS = 3       # el corte se busca en el tramo mas silencioso del final de la ventana
+CUT_FRAME = 1600             # 100 ms
+POLL_SECONDS = 1.0
+
+
+def _quiet_cut(audio: np.ndarray) -> int:
+    """Sample index of the quietest CUT_FRAME in the last CUT_SEARCH_SECONDS (cut there)."""
+    search = min(len(audio), CUT_SEARCH_SECONDS * SAMPLE_RATE) // CUT_FRAME * CUT_FRAME
+    if search < CUT_FRAME:
+        return len(audio)
+    tail = audio[len(audio) - search:].reshape(-1, CUT_FRAME)
+    quietest = int(np.argmin(np.mean(tail ** 2, axis=1)))
+    return len(audio) - search + quietest * CUT_FRAME + CUT_FRAME // 2
+
+
+def decode_segments(model, audio: np.ndarray, beam_size: int) -> list[tuple[float, float, str]]:
+    """(start, end, text) of each non-empty segment, in seconds from the start of audio."""
+    segments, _ = model.transcribe(
+        audio, language=LANGUAGE, beam_size=beam_size,
+        vad_filter=True, vad_parameters=VAD_PARAMETERS,
+    )
+    return [(seg.start, seg.end, seg.text.strip()) for seg in segments if seg.text.strip()]
+
+
+class Refiner:
+    """Low-priority second pass over the archived audio with a larger model.
+
+    Walks each source's archive in WINDOW_SECONDS windows (cut at the
+    quietest point near the end) and decodes them with model_size/beam_size.
+    Decoding only runs while is_idle() says the live pipeline has headroom,
+    or after finish(). Each window yields on_refined(source, start, end,
+    entries), with wall-clock times. The receiver replaces the live results
+    whose speech falls in (start, end] (see transcript.entry_time) with the
+    refined entries. The larger model is
+    loaded on first use, in this process unless decoder is given: a
+    callable(audio, model_size, beam_size, device, cpu_threads) returning
+    decode_segments() output, such as InferenceProcess.refine.
+    """
+
+    def __init__(self, archive: AudioArchive, on_refined, model_size=REFINE_MODEL,
+                 beam_size=REFINE_BEAM, is_idle=None, device="auto", cpu_threads=0,
+                 decoder=None):
+        self.archive = archive
+        self.on_refined = on_refined   # callback(source, start, end, entries: list[dict])
+        self.model_size = model_size
+        self.beam_size = beam_size
+        self.is_idle = is_idle
+        self.device = device
+        self.cpu_threads = cpu_threads
+        self.decoder = decoder or self._decode_here
+        self._worker = None
+        self._cursor: dict[str, float] = {}   # hasta donde se refino cada fuente (hora de pared)
+        self._finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refined_seconds = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def finish(self):
+        """The call ended: refine everything archived so far, idle or not."""
+        self._finished.set()
+
+    def resume(self):
+        """Capture restarted: go back to refining only while idle."""
+        self._finished.clear()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    # ------------------------------------------------------------------ #
+
+    def _run(self):
+        while not self._stop.is_set():
+            window = self._next_window()
+            if window is None:
+                self._stop.wait(POLL_SECONDS)
+                continue
+            try:
+                self._refine(*window)
+            except Exception as e:
+                print(f"[ERROR] Refinamiento: {e}")
+                self._cursor[window[0]] = window[2]    # no reintentar la misma ventana
+
+    def _next_window(self):
+        finished = self._finished.is_set()
+        if not finished and self.is_idle and not self.is_idle():
+            return None
+        for source in self.archive.sources():
+            cursor = self._cursor.get(source, 0.0)
+            for run_start, run_end, _ in self.archive.runs(source):
+                start = max(cursor, run_start)
+                if run_end - start <= 0.5:
+                    continue
+                if run_end - start >= WINDOW_SECONDS + CUT_SEARCH_SECONDS:
+                    return source, start, start + WINDOW_SECONDS
+                if finished or run_end < self._last_end(source):
+                    # final de una corrida terminada (o de la sesion): ventana parcial
+                    return source, start, run_end
+                break
+        return None
+
+    def _last_end(self, source):
+        runs = self.archive.runs(source)
+        return runs[-1][1] if runs else 0.0
+
+    def _decode_here(self, audio, model_size, beam_size, device, cpu_threads):
+        if self._worker is None:
+            self._worker = TranscriptionWorker(on_result=None)
+            self._worker.load_model(device=device, model_size=model_size, cpu_threads=cpu_threads)
+        return decode_segments(self._worker._model, audio, beam_size)
+
+    def _refine(self, source: str, start: float, end: float):
+        audio = self.archive.read(source, start, end)
+        if end - start >= WINDOW_SECONDS:
+            cut = _quiet_cut(audio)
+            audio = audio[:cut]
+            end = start + cut / SAMPLE_RATE
+
+        t0 = time.perf_counter()
+        segments = self.decoder(audio, self.model_size, self.beam_size,
+                                self.device, self.cpu_threads)
+        entries = []
+        for seg_start, seg_end, text in segments:
+            at = start + seg_end
+            entries.append({"source": source, "text": text, "captured_at": at,
+                            "start": start + seg_start, "end": at,
+                            "ts": datetime.fromtimestamp(at).strftime("%H:%M:%S"),
+                            "refined": True})
+        self._cursor[source] = end
+        self.refined_seconds += end - start
+        print(f"[OK] Refinado {source} {end - start:.1f}s en {time.perf_counter() - t0:.1f}s "
+              f"({len(entries)} segmentos)")
+        self.on_refined(source, start, end, entries)
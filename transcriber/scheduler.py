@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+from .metrics import STAGE_QUEUE, metrics
+
+POLICY_DROP_OLDEST = "drop_oldest"   # descartar el chunk mas viejo de la fuente
+POLICY_MERGE = "merge"               # unir los chunks mas viejos en uno (menos pasadas del modelo)
+POLICY_LATEST = "latest"             # vaciar la fuente y quedarse solo con lo ultimo
+POLICIES = (POLICY_DROP_OLDEST, POLICY_MERGE, POLICY_LATEST)
+
+MAX_QUEUED_SECONDS = 12      # audio pendiente por fuente antes de aplicar la politica
+MAX_MERGED_SECONDS = 28      # un chunk unido debe caber en la ventana de 30 s de Whisper
+
+
+class ChunkScheduler:
+    """Per-source bounded queues behind a queue.Queue-like put/get interface.
+
+    Items are (audio, source, ...) tuples. get() serves the source whose
+    oldest chunk has waited longest (earliest deadline, since every source
+    has the same latency budget), so a chatty source cannot starve the other.
+    When a source holds more than max_seconds of audio the overload policy
+    drops or merges its oldest chunks. Anything that is not a tuple (the
+    worker's stop/flush markers) bypasses the per-source queues and is
+    served first.
+
+    hold(True) keeps every chunk queued (only markers are served) and
+    suspends the overload policy, e.g. while the model is being reloaded,
+    so no audio is dropped. The backlog released by hold(False) does not
+    count against max_seconds, so the policy never drops it.
+    """
+
+    def __init__(self, max_seconds=MAX_QUEUED_SECONDS, policy=POLICY_DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"Politica desconocida: {policy}")
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self.policy = policy
+        self._queues: dict[str, deque] = {}
+        self._samples: dict[str, int] = {}
+        self._control = deque()
+        self._stats: dict[str, dict] = {}
+        self._held = False
+        self._grace: dict[str, int] = {}    # muestras retenidas que la politica no cuenta
+        self._cond = threading.Condition()
+
+    def hold(self, held: bool):
+        with self._cond:
+            self._held = held
+            if not held:
+                self._grace = dict(self._samples)
+            self._cond.notify_all()
+
+    def put(self, item):
+        with self._cond:
+            if not isinstance(item, tuple):
+                self._control.append(item)
+            else:
+                self._put_chunk(item)
+            self._cond.notify()
+
+    def get(self, block=True, timeout=None):
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._control and (self._held or not any(self._queues.values())):
+                if not block:
+                    raise queue.Empty
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+            if self._control:
+                return self._control.popleft()
+            source = min(
+                (s for s, q in self._queues.items() if q),
+                key=lambda s: self._queues[s][0][0],
+            )
+            queued_at, item = self._queues[source].popleft()
+            self._samples[source] -= len(item[0])
+            if self._grace.get(source):
+                self._grace[source] = max(0, self._grace[source] - len(item[0]))
+            metrics.record(STAGE_QUEUE, time.monotonic() - queued_at)
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._control) + sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        """Per-source counters: queued chunks/seconds, dropped and merged audio."""
+        with self._cond:
+            return {
+                source: dict(
+                    st,
+                    queued_chunks=len(self._queues[source]),
+                    queued_seconds=self._samples[source] / SAMPLE_RATE,
+                )
+                for source, st in self._stats.items()
+            }
+
+    def _put_chunk(self, item):
+        source = item[1]
+        q = self._queues.get(source)
+        if q is None:
+            q = self._queues[source] = deque()
+            self._samples[source] = 0
+            self._stats[source] = dict(
+                dropped_chunks=0, dropped_seconds=0.0, merged_chunks=0, merged_seconds=0.0,
+            )
+        q.append((time.monotonic(), item))
+        self._samples[source] += len(item[0])
+
+        if self._held:
+            return      # retenido: se guarda todo
+        st = self._stats[source]
+        grace = self._grace.get(source, 0)
+        limit = self.max_samples + grace
+        if self.policy == POLICY_MERGE:
+            # Whisper rellena todo a 30 s: un chunk unido cuesta casi lo mismo que uno solo
+            while self._samples[source] > limit and self._merge_pair(q, st):
+                pass
+            limit = 2 * self.max_samples + grace   # tope duro cuando ya no se puede unir mas
+        while self._samples[source] > limit and len(q) > 1:
+            if self.policy == POLICY_LATEST:
+                dropped = list(q)[:-1]
+                q.clear()
+                q.append((time.monotonic(), item))
+            else:
+                dropped = [q.popleft()]
+            for _, old in dropped:
+                self._samples[source] -= len(old[0])
+                st["dropped_chunks"] += 1
+                st["dropped_seconds"] += len(old[0]) / SAMPLE_RATE
+
+    @staticmethod
+    def _merge_pair(q, st) -> bool:
+        """Merges the oldest adjacent pair that still fits in one Whisper window."""
+        for i in range(len(q) - 1):
+            (t0, first), (_, second) = q[i], q[i + 1]
+            if len(first[0]) + len(second[0]) <= MAX_MERGED_SECONDS * SAMPLE_RATE:
+                # captured_at del segundo: marca el final del audio unido
+                q[i] = (t0, (np.concatenate([first[0], second[0]]),) + second[1:])
+                del q[i + 1]
+                st["merged_chunks"] += 1
+                st["merged_seconds"] += len(second[0]) / SAMPLE_RATE
+                return True
+        return False
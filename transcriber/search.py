@@ -0,0 +1,273 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from .journal import JOURNAL_DIR, find_closed, read_journal
+from .transcript import entry_time
+
+SEARCH_DB = os.path.join(os.path.expanduser("~"), ".transcriptor", "busqueda.sqlite3")
+SEARCH_LIMIT = 50
+CONTEXT_LINES = 2
+HIGHLIGHT_START = "\x02"    # marcas alrededor de los terminos encontrados en "text"
+HIGHLIGHT_END = "\x03"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    started TEXT,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL REFERENCES sessions(id),
+    source TEXT NOT NULL,
+    at REAL NOT NULL,
+    ts TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_session_at ON lines(session, at);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+    text, content='lines', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+    INSERT INTO lines_fts(lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def session_name(journal_path: str) -> str:
+    """Index key of a session: its journal file name without extension."""
+    return os.path.splitext(os.path.basename(journal_path))[0]
+
+
+def _started(name: str) -> str | None:
+    try:
+        return datetime.strptime(name[len("sesion_"):], "%Y%m%d_%H%M%S_%f").isoformat(timespec="seconds")
+    except ValueError:
+        return None
+
+
+def fts_query(text: str) -> str:
+    """User input -> FTS5 query: every word must appear, the last one as a prefix."""
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"        # busqueda mientras se escribe
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of the results of every session, for full-text search.
+
+    One row per result line (session, source, capture time, text). Writes go
+    through a writer thread that commits in batches, so add() can be called
+    from the workers' result callbacks. Searches use their own connection
+    and run in milliseconds even across hundreds of sessions (WAL mode, so
+    reads don't wait for the writer).
+
+    Sessions are keyed by journal name. index_journals() backfills closed
+    journals that aren't (completely) indexed yet; the journal is the source
+    of truth, so a session indexed live is re-read once its journal closes.
+    """
+
+    def __init__(self, path: str = SEARCH_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)     # sqlite3.OperationalError si falta FTS5
+        conn.close()
+        self._reader = None
+        self._read_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------ #
+    #  Escritura                                                          #
+    # ------------------------------------------------------------------ #
+
+    def add(self, session: str, source: str, text: str, captured_at: float | None = None):
+        """Indexes one result. captured_at is monotonic (entry_time of the result info), or None = now."""
+        now = time.time()
+        at = now - (time.monotonic() - captured_at) if captured_at is not None else now
+        ts = datetime.fromtimestamp(at).strftime("%H:%M:%S")
+        self._queue.put(("add", session, source, at, ts, text))
+
+    def replace(self, session: str, source: str, start: float, end: float, entries: list[dict]):
+        """Same as TranscriptStore.replace: (start, end] and entries in wall-clock time."""
+        self._queue.put(("replace", session, source, start, end, entries))
+
+    def index_journals(self, directory: str = JOURNAL_DIR):
+        """Backfills closed journals in the background (past sessions, exported nowhere)."""
+        self._queue.put(("journals", directory))
+
+    def sync(self):
+        """Blocks until everything queued so far is committed."""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _writer(self):
+        conn = self._connect()
+        sessions = {}       # nombre -> id
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            try:
+                with conn:      # una transaccion por lote
+                    for item in batch:
+                        if item is None:
+                            stop = True
+                        elif isinstance(item, threading.Event):
+                            waiters.append(item)
+                        elif item[0] == "add":
+                            _, name, source, at, ts, text = item
+                            conn.execute(
+                                "INSERT INTO lines(session, source, at, ts, text) VALUES (?, ?, ?, ?, ?)",
+                                (self._session_id(conn, sessions, name), source, at, ts, text),
+                            )
+                        elif item[0] == "replace":
+                            _, name, source, start, end, entries = item
+                            sid = self._session_id(conn, sessions, name)
+                            conn.execute("DELETE FROM lines WHERE session = ? AND source = ? "
+                                         "AND at > ? AND at <= ?", (sid, source, start, end))
+                            conn.executemany(
+                                "INSERT INTO lines(session, source, at, ts, text) VALUES (?, ?, ?, ?, ?)",
+                                [(sid, e["source"], entry_time(e), e.get("ts"), e["text"])
+                                 for e in entries],
+                            )
+            except sqlite3.Error as e:
+                print(f"[ERROR] Indice de busqueda: {e}")
+
+            for item in batch:
+                if isinstance(item, tuple) and item[0] == "journals":
+                    self._backfill(conn, sessions, item[1])
+            for event in waiters:
+                event.set()
+            if stop:
+                conn.close()
+                return
+
+    def _session_id(self, conn, sessions: dict, name: str) -> int:
+        sid = sessions.get(name)
+        if sid is None:
+            conn.execute("INSERT OR IGNORE INTO sessions(name, started) VALUES (?, ?)",
+                         (name, _started(name)))
+            sid = sessions[name] = conn.execute(
+                "SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()[0]
+        return sid
+
+    def _backfill(self, conn, sessions: dict, directory: str):
+        done = {name for (name,) in conn.execute("SELECT name FROM sessions WHERE complete = 1")}
+        pending = [p for p in find_closed(directory) if session_name(p) not in done]
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        lines = 0
+        for path in pending:
+            name = session_name(path)
+            try:
+                rows = []
+                at = 0.0
+                for e in read_journal(path):
+                    # resultados sin hora de captura conservan el orden del journal
+                    at = entry_time(e) or at
+                    rows.append((e["source"], at, e.get("ts"), e["text"]))
+                with conn:
+                    sid = self._session_id(conn, sessions, name)
+                    conn.execute("DELETE FROM lines WHERE session = ?", (sid,))
+                    conn.executemany(
+                        "INSERT INTO lines(session, source, at, ts, text) VALUES (?, ?, ?, ?, ?)",
+                        [(sid, *row) for row in rows])
+                    conn.execute("UPDATE sessions SET complete = 1 WHERE id = ?", (sid,))
+                lines += len(rows)
+            except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+                print(f"[WARN] No se pudo indexar {path}: {e}")
+        print(f"[OK] {len(pending)} sesiones indexadas ({lines} lineas) "
+              f"en {time.perf_counter() - t0:.1f}s")
+
+    # ------------------------------------------------------------------ #
+    #  Busqueda                                                           #
+    # ------------------------------------------------------------------ #
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT, context: int = CONTEXT_LINES,
+               source: str | None = None) -> list[dict]:
+        """Best matches for the words in text, across every session.
+
+        Each hit: {"session", "started", "source", "ts", "text", "before",
+        "after"}; "text" has the matched terms wrapped in HIGHLIGHT_START /
+        HIGHLIGHT_END, and "before"/"after" hold up to `context` neighbouring
+        lines of the same session as {"source", "ts", "text"}.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = ("SELECT l.id, l.session, l.at, s.name, s.started, l.source, l.ts, "
+               f"highlight(lines_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') "
+               "FROM lines_fts JOIN lines l ON l.id = lines_fts.rowid "
+               "JOIN sessions s ON s.id = l.session WHERE lines_fts MATCH ?")
+        params = [query]
+        if source:
+            sql += " AND l.source = ?"
+            params.append(source)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            conn = self._reader
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"[WARN] Busqueda invalida '{text}': {e}")
+                return []
+            hits = []
+            for line_id, sid, at, name, started, src, ts, marked in rows:
+                hit = {"session": name, "started": started, "source": src, "ts": ts, "text": marked,
+                       "before": [], "after": []}
+                if context:
+                    before = conn.execute(
+                        "SELECT source, ts, text FROM lines WHERE session = ? "
+                        "AND (at < ? OR (at = ? AND id < ?)) ORDER BY at DESC, id DESC LIMIT ?",
+                        (sid, at, at, line_id, context)).fetchall()
+                    after = conn.execute(
+                        "SELECT source, ts, text FROM lines WHERE session = ? "
+                        "AND (at > ? OR (at = ? AND id > ?)) ORDER BY at, id LIMIT ?",
+                        (sid, at, at, line_id, context)).fetchall()
+                    hit["before"] = [{"source": s, "ts": t, "text": x} for s, t, x in reversed(before)]
+                    hit["after"] = [{"source": s, "ts": t, "text": x} for s, t, x in after]
+                hits.append(hit)
+        return hits
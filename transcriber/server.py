@@ -0,0 +1,264 @@
+"""Local network transcription server: many audio clients, one model pool.
+
+    python -m transcriber.server --port 8765 --workers 2 [--device cpu]
+
+Protocol (TCP):
+  1. The client sends one JSON line:
+       {"name": "ana", "rate": 48000, "channels": 2, "format": "f32"}
+     (format "f32" = float32 little-endian, "s16" = int16 little-endian,
+     interleaved channels). The server answers {"type": "hello", "source": ...}.
+  2. Audio goes as frames: 4-byte big-endian length + PCM payload. A zero
+     length frame ends the stream.
+  3. The server sends JSON lines back at any time:
+       {"type": "result", "text": ..., "end": s, "tier": ...}
+     where "end" is the position in the client's stream (seconds) of the
+     last sample of the chunk, and finally {"type": "end"} once every chunk
+     of the stream has been transcribed.
+
+Every client gets its own AudioBuffer (with SpeechGate) and resampler; all
+chunks go to one shared TranscriptionPool whose workers pull from a single
+queue and return results in order per client. When a client has more than
+--backlog-seconds of audio waiting, the server stops reading its socket, so
+TCP flow control slows that client down without affecting the others.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+
+import numpy as np
+
+from .buffer import AudioBuffer, CHUNK_SAMPLES, SAMPLE_RATE
+from .dsp import StreamingResampler
+from .gate import SpeechGate
+from .pool import TranscriptionPool
+from .transcription import MODEL_SIZE
+
+DEFAULT_PORT = 8765
+BACKLOG_SECONDS = 8            # audio en cola por cliente antes de dejar de leer su socket
+BACKPRESSURE_POLL = 0.05
+MAX_FRAME_BYTES = 1 << 20
+FORMATS = {"f32": np.float32, "s16": np.int16}
+_FRAME_HEADER = struct.Struct(">I")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ClientSession:
+    """Per-connection state: stream decoding, buffer and outgoing messages."""
+
+    def __init__(self, source: str, rate: int, channels: int, fmt: str, on_chunk, chunk_samples):
+        self.source = source
+        self.channels = channels
+        self.dtype = FORMATS[fmt]
+        self.resampler = StreamingResampler(rate, SAMPLE_RATE)
+        self.buffer = AudioBuffer(source, on_chunk, chunk_samples=chunk_samples, gate=SpeechGate())
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.position = 0.0      # segundos de audio recibidos (reloj del stream del cliente)
+        self.enqueued = 0
+        self.done = 0
+        self.all_done = asyncio.Event()
+
+    def push(self, payload: bytes):
+        frames = np.frombuffer(payload, dtype=self.dtype)
+        if self.dtype == np.int16:
+            frames = frames.astype(np.float32) / 32768.0
+        frames = frames[:len(frames) - len(frames) % self.channels].reshape(-1, self.channels)
+        audio = self.resampler.process(frames.mean(axis=1))
+        self.position += len(audio) / SAMPLE_RATE
+        self.buffer.push(audio, self.position)
+
+    def send(self, message: dict):
+        self.outbox.put_nowait(message)
+
+
+class TranscriptionServer:
+    """asyncio TCP front end for a shared TranscriptionPool."""
+
+    def __init__(self, pool: TranscriptionPool, host="127.0.0.1", port=DEFAULT_PORT,
+                 backlog_seconds=BACKLOG_SECONDS, chunk_samples=CHUNK_SAMPLES):
+        if pool.streaming:
+            raise ValueError("El servidor usa chunks fijos: TranscriptionPool sin streaming")
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.backlog_seconds = backlog_seconds
+        self.chunk_samples = chunk_samples
+        self.sessions: dict[str, ClientSession] = {}
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._server = None
+        pool.on_result = self._on_result
+        pool.on_done = self._on_done
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[OK] Servidor escuchando en {self.host}:{self.port}")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # ------------------------------------------------------------------ #
+    #  Callbacks del pool (hilos de los workers)                          #
+    # ------------------------------------------------------------------ #
+
+    def _on_result(self, text, source, info):
+        session = self.sessions.get(source)
+        if session is None:
+            return
+        message = {"type": "result", "text": text, "end": round(info["captured_at"], 3),
+                   "tier": info.get("tier")}
+        self._loop.call_soon_threadsafe(session.send, message)
+
+    def _on_done(self, source):
+        session = self.sessions.get(source)
+        if session is not None:
+            self._loop.call_soon_threadsafe(self._chunk_done, session)
+
+    def _chunk_done(self, session: ClientSession):
+        session.done += 1
+        self._check_done(session)
+
+    def _check_done(self, session: ClientSession):
+        st = self.pool.queue_stats().get(session.source, {})
+        # chunks descartados o unidos por la politica de sobrecarga no vuelven como "done"
+        settled = session.done + st.get("dropped_chunks", 0) + st.get("merged_chunks", 0)
+        if settled >= session.enqueued:
+            session.all_done.set()
+        else:
+            session.all_done.clear()
+
+    # ------------------------------------------------------------------ #
+    #  Conexiones                                                         #
+    # ------------------------------------------------------------------ #
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        session = None
+        sender = None
+        try:
+            session = await self._handshake(reader)
+            self.sessions[session.source] = session
+            sender = asyncio.create_task(self._sender(session, writer))
+            session.send({"type": "hello", "source": session.source})
+            print(f"[OK] Cliente {session.source} conectado desde {peer}")
+
+            while True:
+                (length,) = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+                if length == 0:
+                    break
+                if length > MAX_FRAME_BYTES:
+                    raise ProtocolError(f"frame de {length} bytes")
+                session.push(await reader.readexactly(length))
+                await self._backpressure(session)
+
+            session.buffer.flush()
+            self._check_done(session)
+            await session.all_done.wait()
+            session.send({"type": "end"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            print(f"[WARN] Cliente {session.source if session else peer} desconectado")
+        except (ProtocolError, ValueError, KeyError) as e:
+            print(f"[ERROR] Cliente {peer}: {e}")
+            if session is None:
+                writer.write((json.dumps({"type": "error", "error": str(e)}) + "\n").encode())
+        finally:
+            if session is not None:
+                session.send(None)
+                if sender:
+                    await sender
+                self.sessions.pop(session.source, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handshake(self, reader) -> ClientSession:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        hello = json.loads(line)
+        fmt = hello.get("format", "f32")
+        if fmt not in FORMATS:
+            raise ProtocolError(f"formato desconocido: {fmt}")
+        rate = int(hello["rate"])
+        channels = int(hello.get("channels", 1))
+        if rate <= 0 or channels <= 0:
+            raise ProtocolError("rate/channels invalidos")
+        source = f"{hello.get('name', 'cliente')}-{next(self._ids)}"
+
+        def on_chunk(chunk, src, position):
+            session.enqueued += 1
+            self.pool.enqueue(chunk, src, position)
+
+        session = ClientSession(source, rate, channels, fmt, on_chunk, self.chunk_samples)
+        return session
+
+    async def _sender(self, session: ClientSession, writer: asyncio.StreamWriter):
+        while True:
+            message = await session.outbox.get()
+            if message is None:
+                return
+            try:
+                writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    async def _backpressure(self, session: ClientSession):
+        """Stops reading this client's socket while its queued audio is over the limit."""
+        while True:
+            st = self.pool.queue_stats().get(session.source)
+            if not st or st["queued_seconds"] <= self.backlog_seconds:
+                return
+            await asyncio.sleep(BACKPRESSURE_POLL)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de transcripcion para clientes en la red local.")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 para aceptar otras maquinas")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2, help="decodificaciones simultaneas")
+    parser.add_argument("--separate-models", action="store_true",
+                        help="un modelo por worker en lugar de uno compartido")
+    parser.add_argument("--device", default="auto", choices=["auto", "cuda", "cpu"])
+    parser.add_argument("--model", default=MODEL_SIZE)
+    parser.add_argument("--cpu-threads", type=int, default=0, help="total a repartir (0 = todos)")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--backlog-seconds", type=float, default=BACKLOG_SECONDS)
+    args = parser.parse_args(argv)
+
+    pool = TranscriptionPool(
+        on_result=None, num_workers=args.workers, pin_sources=False,
+        share_model=not args.separate_models, batch_size=args.batch_size,
+        # la politica de sobrecarga solo actua si un cliente ignora la contrapresion
+        max_queued_seconds=2 * args.backlog_seconds + CHUNK_SAMPLES / SAMPLE_RATE,
+    )
+    pool.load_model(progress_callback=print, device=args.device,
+                    model_size=args.model, cpu_threads=args.cpu_threads)
+    pool.start(warm_up=True)
+    server = TranscriptionServer(pool, args.host, args.port, args.backlog_seconds)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
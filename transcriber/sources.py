@@ -0,0 +1,401 @@
+import os
+import select
+import stat
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .file_source import BLOCK_FRAMES, FileSource
+
+KIND_INPUT = "input"          # microfono o cualquier entrada de audio (sounddevice)
+KIND_LOOPBACK = "loopback"    # lo que suena por una salida (WASAPI loopback, pyaudiowpatch)
+KIND_FILE = "file"            # WAV/FLAC reproducido como si fuera una captura
+KIND_PIPE = "pipe"            # PCM crudo desde un pipe/FIFO o stdin ("-")
+KINDS = (KIND_INPUT, KIND_LOOPBACK, KIND_FILE, KIND_PIPE)
+
+# Lo que se captura si no se indica otra cosa (TRANSCRIPTOR_SOURCES)
+DEFAULT_SOURCES = "input:MIC;loopback:SISTEMA"
+PIPE_FORMATS = {"f32": np.float32, "s16": np.int16}
+PIPE_POLL_SECONDS = 0.2       # espera maxima de cada lectura del pipe antes de mirar stop()
+
+
+class SourceUnavailable(Exception):
+    """The source cannot be opened on this machine (missing package or device)."""
+
+
+class CaptureSource:
+    """One audio input of AudioCapture.
+
+    open() resolves the device and sets channels and rate; start(submit)
+    then calls submit(frames) from the stream's own thread with every raw
+    block (an owned float32 ndarray [n, channels] or float32 bytes), until
+    stop(). Sources can be opened again after stop().
+
+    denoise marks sources whose audio goes through the StreamingDenoiser
+    (by default, the input devices).
+    """
+
+    kind = None
+
+    def __init__(self, name: str, denoise: bool | None = None):
+        self.name = name
+        self.denoise = self.kind == KIND_INPUT if denoise is None else denoise
+        self.channels = 1
+        self.rate = 0
+
+    def open(self):
+        raise NotImplementedError
+
+    def start(self, submit):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.kind}) @ {self.rate}Hz"
+
+
+class InputSource(CaptureSource):
+    """A capture device through PortAudio; device=None is the default input."""
+
+    kind = KIND_INPUT
+
+    def __init__(self, name: str, device=None, denoise: bool | None = None):
+        super().__init__(name, denoise)
+        self.device = device
+        self._stream = None
+        self._label = ""
+
+    def open(self):
+        try:
+            import sounddevice as sd   # diferido: cargar PortAudio solo al iniciar la captura
+        except (ImportError, OSError) as e:
+            raise SourceUnavailable(f"sounddevice no disponible: {e}")
+        try:
+            info = sd.query_devices(self.device, kind="input")
+        except ValueError as e:
+            raise SourceUnavailable(f"Entrada no encontrada: {self.device} ({e})")
+        # Capturar a la tasa nativa del dispositivo; el DSP resamplea a 16 kHz
+        self.rate = int(info["default_samplerate"])
+        self.channels = 1
+        self._label = info["name"]
+
+    def start(self, submit):
+        import sounddevice as sd
+
+        def callback(indata, frames, time_info, status):
+            # PortAudio reutiliza indata: copiar y seguir, el resto lo hace el DSP
+            submit(indata.copy())
+
+        self._stream = sd.InputStream(
+            samplerate=self.rate,
+            channels=self.channels,
+            dtype="float32",
+            device=self.device,
+            callback=callback,
+            blocksize=BLOCK_FRAMES,
+        )
+        self._stream.start()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def describe(self) -> str:
+        return f"{self.name}: {self._label} @ {self.rate}Hz"
+
+
+class LoopbackSource(CaptureSource):
+    """What an output device plays, through WASAPI loopback.
+
+    device=None follows the default speakers; otherwise any loopback device
+    whose name contains device (or its index).
+    """
+
+    kind = KIND_LOOPBACK
+
+    def __init__(self, name: str, device=None, denoise: bool | None = None):
+        super().__init__(name, denoise)
+        self.device = device
+        self._pyaudio = None
+        self._stream = None
+        self._info = None
+
+    def open(self):
+        try:
+            import pyaudiowpatch as pyaudio
+        except ImportError:
+            raise SourceUnavailable("pyaudiowpatch no instalado. Audio del sistema desactivado.")
+
+        self._pyaudio = pyaudio.PyAudio()
+        try:
+            self._info = self._find_device(pyaudio)
+        except Exception:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+            raise
+        self.rate = int(self._info["defaultSampleRate"])
+        self.channels = min(int(self._info["maxInputChannels"]), 2)
+
+    def _find_device(self, pyaudio) -> dict:
+        if isinstance(self.device, int):
+            return self._pyaudio.get_device_info_by_index(self.device)
+        wanted = self.device
+        if wanted is None:
+            wasapi_info = self._pyaudio.get_host_api_info_by_type(pyaudio.paWASAPI)
+            default_speakers = self._pyaudio.get_device_info_by_index(
+                wasapi_info["defaultOutputDevice"]
+            )
+            # Si el dispositivo por defecto ya es loopback, usarlo directamente
+            if default_speakers.get("isLoopbackDevice", False):
+                return default_speakers
+            wanted = default_speakers["name"]
+        for loopback in self._pyaudio.get_loopback_device_info_generator():
+            if wanted in loopback["name"]:
+                return loopback
+        raise SourceUnavailable(f"No se encontro dispositivo loopback WASAPI: {wanted}")
+
+    def start(self, submit):
+        import pyaudiowpatch as pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            # in_data es bytes (inmutable): se pasa tal cual al DSP
+            submit(in_data)
+            return (None, pyaudio.paContinue)
+
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paFloat32,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=int(self._info["index"]),
+            frames_per_buffer=BLOCK_FRAMES,
+            stream_callback=callback,
+        )
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+    def describe(self) -> str:
+        return f"{self.name}: {self._info['name'] if self._info else '?'} @ {self.rate}Hz"
+
+
+class FileCaptureSource(CaptureSource):
+    """A WAV/FLAC file played through FileSource (speed=1 real time, 0 = as fast as possible)."""
+
+    kind = KIND_FILE
+
+    def __init__(self, name: str, path: str, speed=1.0, loop=False, denoise: bool | None = None):
+        super().__init__(name, denoise)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self._player = None
+
+    @property
+    def duration(self) -> float:
+        return self._player.duration if self._player else 0.0
+
+    def open(self):
+        try:
+            self._player = FileSource(self.path, None, speed=self.speed, loop=self.loop)
+        except (OSError, ImportError, ValueError) as e:
+            raise SourceUnavailable(f"No se pudo abrir {self.path}: {e}")
+        self.rate = self._player.rate
+        self.channels = self._player.channels
+
+    def start(self, submit):
+        self._player.on_frames = submit
+        self._player.start()
+
+    def stop(self):
+        if self._player:
+            self._player.stop()
+
+    def wait(self, timeout=None):
+        """Blocks until the file has been played completely (loop=False)."""
+        if self._player:
+            self._player.wait(timeout)
+
+    def describe(self) -> str:
+        return f"{self.name}: {os.path.basename(self.path)} @ {self.rate}Hz"
+
+
+class PipeSource(CaptureSource):
+    """Raw interleaved PCM read from a pipe, FIFO or stdin ("-").
+
+    fmt is "f32" (float32 little-endian) or "s16" (int16 little-endian), as
+    in transcriber.server. The source ends by itself at end of stream.
+    A FIFO is opened non-blocking, so a missing writer does not hold the
+    thread, and reads wait at most PIPE_POLL_SECONDS (select on the raw
+    descriptor): stop() never blocks on a pipe nobody writes to. Where
+    select does not take pipes (Windows) reads block and stop() gives up on
+    the thread.
+    """
+
+    kind = KIND_PIPE
+
+    def __init__(self, name: str, path: str = "-", rate=16000, channels=1, fmt="f32",
+                 denoise: bool | None = None):
+        if fmt not in PIPE_FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt}")
+        super().__init__(name, denoise)
+        self.path = path
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.dtype = PIPE_FORMATS[fmt]
+        self._thread = None
+        self._running = False
+
+    def open(self):
+        if self.path != "-" and not os.path.exists(self.path):
+            raise SourceUnavailable(f"No existe {self.path}")
+
+    def start(self, submit):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(submit,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False      # el hilo lo ve en su siguiente lectura y cierra el pipe
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(PIPE_POLL_SECONDS * 5)
+        self._thread = None
+
+    def _run(self, submit):
+        try:
+            fd = sys.stdin.fileno() if self.path == "-" else self._open_fifo()
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[ERROR] Fuente {self.name}: {e}")
+            self._running = False
+            return
+        # Un FIFO sin escritor lee EOF: hasta el primer dato se sigue esperando a que aparezca
+        waiting = self.path != "-" and stat.S_ISFIFO(os.fstat(fd).st_mode)
+        try:
+            self._read_loop(fd, submit, waiting)
+        finally:
+            if self.path != "-":
+                os.close(fd)
+            self._running = False
+
+    def _open_fifo(self) -> int:
+        # Sin O_NONBLOCK, abrir un FIFO bloquea hasta que aparece quien escribe
+        nonblock = getattr(os, "O_NONBLOCK", 0)
+        fd = os.open(self.path, os.O_RDONLY | nonblock)
+        if nonblock:
+            os.set_blocking(fd, True)     # las lecturas ya esperan en select
+        return fd
+
+    def _read_loop(self, fd, submit, waiting=False):
+        frame_bytes = self.channels * np.dtype(self.dtype).itemsize
+        rest = b""
+        poll = True
+        while self._running:
+            if poll:
+                try:
+                    ready, _, _ = select.select([fd], [], [], PIPE_POLL_SECONDS)
+                except (OSError, ValueError):
+                    poll = False    # Windows: select solo acepta sockets, se lee bloqueando
+                else:
+                    if not ready:
+                        continue
+            try:
+                data = os.read(fd, BLOCK_FRAMES * frame_bytes)
+            except OSError as e:
+                print(f"[ERROR] Fuente {self.name}: {e}")
+                break
+            if not data:
+                if not waiting:
+                    break
+                time.sleep(PIPE_POLL_SECONDS)
+                continue
+            waiting = False
+            data = rest + data
+            usable = len(data) - len(data) % frame_bytes
+            rest = data[usable:]
+            frames = np.frombuffer(data[:usable], dtype=self.dtype)
+            if self.dtype == np.int16:
+                frames = frames.astype(np.float32) / 32768.0
+            else:
+                frames = frames.copy()
+            if len(frames):
+                submit(frames.reshape(-1, self.channels))
+
+    def describe(self) -> str:
+        return f"{self.name}: pipe {self.path} @ {self.rate}Hz x{self.channels}"
+
+
+def parse_source(spec: str) -> CaptureSource:
+    """Builds a source from "kind:NAME[=arg]".
+
+        input:MIC                  entrada por defecto
+        input:Sala 2=Yeti          entrada cuyo nombre contiene "Yeti" (o su indice)
+        loopback:SISTEMA           salida por defecto
+        loopback:Zoom=Auriculares  loopback de otra salida
+        file:Prueba=llamada.wav    archivo en tiempo real
+        pipe:Mezcla=-,48000,2,s16  PCM crudo por stdin (ruta, tasa, canales, formato)
+    """
+    kind, _, rest = spec.strip().partition(":")
+    name, _, arg = rest.partition("=")
+    name = name.strip()
+    if kind not in KINDS or not name:
+        raise ValueError(f"Fuente invalida: {spec!r} (tipo:NOMBRE[=argumento])")
+    arg = arg.strip()
+    device = (int(arg) if arg.isdigit() else arg) if arg else None
+    if kind == KIND_INPUT:
+        return InputSource(name, device)
+    if kind == KIND_LOOPBACK:
+        return LoopbackSource(name, device)
+    if not arg:
+        raise ValueError(f"Falta la ruta de la fuente {name!r}")
+    if kind == KIND_FILE:
+        return FileCaptureSource(name, arg)
+    path, *options = [p.strip() for p in arg.split(",")]
+    keys = ("rate", "channels", "fmt")
+    return PipeSource(name, path, **dict(zip(keys, options)))
+
+
+def parse_sources(specs: str) -> list[CaptureSource]:
+    """Several parse_source() specs separated by ";" (pipe arguments use ",")."""
+    return [parse_source(s) for s in specs.replace("\n", ";").split(";") if s.strip()]
+
+
+def list_devices() -> list[tuple[str, object, str]]:
+    """Capture devices on this machine as (kind, device, label).
+
+    device is what InputSource/LoopbackSource expect; an empty list for a
+    kind whose package is not installed.
+    """
+    devices = []
+    try:
+        import sounddevice as sd
+        for i, info in enumerate(sd.query_devices()):
+            if info["max_input_channels"] > 0:
+                devices.append((KIND_INPUT, i, info["name"]))
+    except (ImportError, OSError):
+        pass
+    try:
+        import pyaudiowpatch as pyaudio
+    except ImportError:
+        return devices
+    p = pyaudio.PyAudio()
+    try:
+        for info in p.get_loopback_device_info_generator():
+            devices.append((KIND_LOOPBACK, int(info["index"]), info["name"]))
+    except Exception as e:
+        print(f"[WARN] No se pudieron listar los dispositivos loopback: {e}")
+    finally:
+        p.terminate()
+    return devices
@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+
+from .buffer import SAMPLE_RATE
+
+STEP_SECONDS = 0.5          # cada cuanto llega audio nuevo y se re-decodifica
+STEP_SAMPLES = int(SAMPLE_RATE * STEP_SECONDS)
+MAX_WINDOW_SECONDS = 15     # si la ventana crece mas, se confirma todo a la fuerza
+PROMPT_CHARS = 200          # texto confirmado que se pasa como contexto
+
+
+def _norm(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+class LocalAgreement:
+    """Commits the longest word prefix on which two consecutive decodes agree.
+
+    Words are (start, end, text) tuples with times relative to the start of
+    the current window.
+    """
+
+    def __init__(self):
+        self._previous = []
+
+    def insert(self, words: list) -> tuple[list, list]:
+        """Returns (committed, unstable) for a new hypothesis of the window."""
+        n = 0
+        for old, new in zip(self._previous, words):
+            if _norm(old[2]) != _norm(new[2]):
+                break
+            n += 1
+        committed, unstable = words[:n], words[n:]
+        self._previous = unstable
+        return committed, unstable
+
+    def shift(self, seconds: float):
+        """Moves the pending hypothesis after trimming `seconds` off the window."""
+        self._previous = [(s - seconds, e - seconds, w) for s, e, w in self._previous]
+
+    def reset(self):
+        self._previous = []
+
+
+class StreamWindow:
+    """Growing audio window of one source plus its agreement state."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.agreement = LocalAgreement()
+        self.prompt = ""
+        self.dirty = False   # llego audio desde la ultima decodificacion
+        self.new_samples = 0     # muestras llegadas desde la ultima decodificacion (RTF)
+        self.silent = True   # la ultima decodificacion no dio palabras (nada pendiente)
+        self.captured_at = 0.0   # captura del ultimo paso recibido (time.monotonic)
+
+    @property
+    def seconds(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+    def append(self, audio: np.ndarray, captured_at: float):
+        self.audio = np.concatenate([self.audio, audio])
+        self.captured_at = captured_at
+        self.new_samples += len(audio)
+        self.dirty = True
+
+    def commit(self, words: list) -> str:
+        """Records committed words, trims the window after them and returns their text."""
+        text = join_words(words)
+        if not words:
+            return text
+        self.prompt = (self.prompt + " " + text).strip()[-PROMPT_CHARS:]
+        cut = max(0.0, words[-1][1])
+        self.audio = self.audio[int(cut * SAMPLE_RATE):]
+        self.agreement.shift(cut)
+        return text
+
+    def drop_silence(self, keep_seconds: float = 1.0):
+        """Keeps only the tail of a window that produced no words."""
+        self.audio = self.audio[-int(keep_seconds * SAMPLE_RATE):]
+        # la hipotesis anterior era de audio que ya no esta en la ventana
+        self.agreement.reset()
+
+    def reset(self):
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.agreement.reset()
+        self.dirty = False
+        self.silent = True
+
+
+def join_words(words: list) -> str:
+    # faster-whisper devuelve las palabras con el espacio inicial incluido
+    return "".join(w for _, _, w in words).strip()
@@ -0,0 +1,97 @@
+import threading
+
+
+def entry_time(entry: dict) -> float | None:
+    """Capture time that places an entry in a replaced range: the middle of its
+    speech ("start"/"end") when known, else "captured_at"."""
+    if entry.get("start") is not None and entry.get("end") is not None:
+        return (entry["start"] + entry["end"]) / 2
+    return entry.get("captured_at")
+
+
+def replace_range(entries: list[dict], source: str, start: float, end: float,
+                  new: list[dict]) -> tuple[list[dict], bool]:
+    """entries with the source's ones timed in (start, end] (entry_time) swapped for new.
+
+    new goes where the first replaced entry was, or at the end. The second
+    value is False when nothing changed.
+    """
+    covered = []
+    for i, e in enumerate(entries):
+        at = entry_time(e)
+        if e["source"] == source and at is not None and start < at <= end:
+            covered.append(i)
+    if not covered and not new:
+        return entries, False
+    at = covered[0] if covered else len(entries)
+    drop = set(covered)
+    kept = [e for i, e in enumerate(entries) if i not in drop]
+    at -= sum(1 for i in covered if i < at)
+    return kept[:at] + list(new) + kept[at:], True
+
+
+class TranscriptStore:
+    """Full transcript history, kept apart from the (windowed) Tk view.
+
+    Entries are dicts {"source", "text", "ts"} plus "captured_at" (wall
+    clock) when known, and "start"/"end" (wall clock span of the speech)
+    for live results with word timings. Readers iterate over a
+    snapshot of the length taken when they start, so an export running on
+    another thread never sees a half-built state while new results keep
+    arriving.
+    """
+
+    def __init__(self):
+        self._entries: list[dict] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+
+    def replace(self, source: str, start: float, end: float, entries: list[dict]):
+        """Swaps the source's entries timed in (start, end] for `entries` (refinement)."""
+        with self._lock:
+            self._entries, _ = replace_range(self._entries, source, start, end, entries)
+
+    def snapshot(self) -> "TranscriptStore":
+        """Copia (de la lista, no de las entradas) que ya no ve altas ni refinamientos."""
+        copy = TranscriptStore()
+        with self._lock:
+            copy._entries = list(self._entries)
+        return copy
+
+    def iter_entries(self):
+        entries = self._entries
+        for i in range(len(entries)):
+            yield entries[i]
+
+    def iter_lines(self, source_filter: str | None = None):
+        """
+        Lineas limpias (sin timestamps ni logs) para copiar/guardar.
+        - source_filter="MIC" o "SISTEMA": solo esa fuente, texto plano.
+        - source_filter=None: conversación completa con etiqueta mínima (MIC: / SISTEMA:).
+        """
+        for e in self.iter_entries():
+            if source_filter:
+                if e["source"] == source_filter:
+                    yield e["text"]
+            else:
+                yield f"{e['source']}: {e['text']}"
+
+    def write_to(self, f, source_filter: str | None = None) -> int:
+        """Streams the clean text into an open file; returns the number of lines."""
+        n = 0
+        for line in self.iter_lines(source_filter):
+            if n:
+                f.write("\n")
+            f.write(line)
+            n += 1
+        return n
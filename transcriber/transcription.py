@@ -2,9 +2,31 @@ import os
 import sys
 import queue
 import threading
+import time
 import numpy as np
 
+from .buffer import SAMPLE_RATE
+from .fingerprint import NON_SPEECH
+from .metrics import STAGE_DENOISE, STAGE_TRANSCRIBE, metrics, startup
+from .quality import Tier
+from .scheduler import ChunkScheduler, MAX_QUEUED_SECONDS, POLICY_DROP_OLDEST
+from .streaming import MAX_WINDOW_SECONDS, StreamWindow, join_words
+
 MODEL_SIZE = "medium"
+LANGUAGE = "es"
+BEAM_SIZE = 5
+VAD_PARAMETERS = dict(
+    min_silence_duration_ms=2000,
+    speech_pad_ms=400,
+)
+BATCH_WAIT_MS = 50           # cuanto esperar a que lleguen mas chunks para el lote
+# Umbrales de transcribe() (los de faster-whisper), compartidos con el camino por lotes
+NO_SPEECH_THRESHOLD = 0.6
+LOG_PROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+MAX_INITIAL_TIMESTAMP_INDEX = 50     # max_initial_timestamp=1.0 s en pasos de 20 ms
+WARMUP_SECONDS = 1.0         # audio sintetico para el decode de calentamiento
+FIXED_TIER = Tier("fija", beam_size=BEAM_SIZE)   # sin QualityController
 
 
 def _add_cuda_to_path():
@@ -23,56 +45,263 @@ def _add_cuda_to_path():
             print(f"[CUDA] PATH += {bin_dir}")
 
 
+def _set_loaded(models: list, loaded: bool, to_cpu=False):
+    """Loads/unloads the CTranslate2 weights of each distinct WhisperModel."""
+    seen = set()
+    for model in models:
+        if model is None or id(model) in seen:
+            continue
+        seen.add(id(model))
+        if loaded and not model.model.model_is_loaded:
+            model.model.load_model()
+        elif not loaded and model.model.model_is_loaded:
+            model.model.unload_model(to_cpu=to_cpu)
+
+
+def probe_device() -> tuple[str, str]:
+    """Cheap capability check: (device, compute_type) without loading any model.
+
+    Asks CTranslate2 for CUDA devices and supported compute types instead of
+    trying a full CUDA model load and waiting for it to fail.
+    """
+    _add_cuda_to_path()
+    try:
+        import ctranslate2
+        if ctranslate2.get_cuda_device_count() > 0:
+            types = ctranslate2.get_supported_compute_types("cuda")
+            return "cuda", "float16" if "float16" in types else "float32"
+    except Exception as e:
+        print(f"[WARN] No se pudo consultar CUDA: {e}")
+    return "cpu", "int8"
+
+
+def _chunk_info(item, tier: Tier) -> dict:
+    """Result info of a fixed chunk: capture times (monotonic) of its span and the tier."""
+    audio, _, captured_at = item[:3]
+    return {"captured_at": captured_at, "start": captured_at - len(audio) / SAMPLE_RATE,
+            "end": captured_at, "tier": tier.name}
+
+
+def _join_segments(texts) -> str:
+    """Text of one chunk from its segment texts."""
+    return " ".join(t.strip() for t in texts).strip()
+
+
+def _attempt_text(texts, avg_logprob, compression_ratio, no_speech_prob) -> str | None:
+    """What transcribe() keeps of its temperature 0 attempt: the text, "" if
+    it is silence, or None if it would retry at a higher temperature."""
+    if no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOG_PROB_THRESHOLD:
+        return ""
+    if compression_ratio > COMPRESSION_RATIO_THRESHOLD or avg_logprob < LOG_PROB_THRESHOLD:
+        return None
+    return _join_segments(texts)
+
+
+class _Flush:
+    """Marca en la cola: confirmar las hipotesis pendientes (de una fuente o de todas)."""
+
+    def __init__(self, source=None):
+        self.source = source
+
+
+_FLUSH = _Flush()
+
+
 class TranscriptionWorker:
-    """Loads faster-whisper and processes audio chunks from a queue."""
+    """Loads faster-whisper and processes audio chunks from a queue.
+
+    Pending chunks wait in a ChunkScheduler: per-source bounded queues served
+    oldest-first, with an overload policy (drop oldest, merge, keep latest)
+    once a source has more than max_queued_seconds waiting.
+
+    With batch_size > 1, chunks that are already queued (or arrive within
+    batch_wait_ms) are decoded together in one encoder/decoder pass.
+
+    In streaming mode chunks are short steps (see transcriber.streaming):
+    each source keeps a growing window that is re-decoded on every step,
+    words that two consecutive passes agree on go to on_result and the rest
+    goes to on_partial.
 
-    def __init__(self, on_result):
+    With a QualityController, beam size and model follow its current tier
+    (the fallback models are preloaded by load_model) and every result's
+    info carries the tier name.
+
+    With a FingerprintCache, chunks of its sources that match a cached
+    chunk reuse that text; in streaming mode, windows with nothing pending
+    that match known non-speech audio are not decoded.
+    """
+
+    def __init__(self, on_result, on_partial=None, streaming=False,
+                 batch_size=1, batch_wait_ms=BATCH_WAIT_MS,
+                 max_queued_seconds=MAX_QUEUED_SECONDS, overload_policy=POLICY_DROP_OLDEST,
+                 denoise_sources=(), quality=None, cache=None):
         self.on_result = on_result
-        self._queue = queue.Queue()
+        self.on_partial = on_partial   # callback(text: str, source: str)
+        self.on_done = None            # callback(source: str) por chunk procesado, con o sin texto
+        # streaming: callback(source, samples) tras decodificar una ventana, con las muestras
+        # que siguen sin confirmar (lo anterior ya salio como resultado o se descarto)
+        self.on_window = None
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        # Fuentes a limpiar con noisereduce antes de decodificar. La captura en
+        # vivo ya las limpia en el DSP (transcriber.denoise), por eso vacio.
+        self.denoise_sources = denoise_sources
+        self._queue = ChunkScheduler(max_queued_seconds, overload_policy)
         self._thread = None
         self._running = False
+        self.quality = quality
+        # FingerprintCache opcional: audio repetido (musica de espera, IVR) sin pasar por el modelo
+        self.cache = cache
         self._model = None
+        self._fallbacks = {}     # modelo por tamano para los niveles de calidad
+        self._windows: dict[str, StreamWindow] = {}
+        # Se activa cuando el hilo del worker empieza a atender la cola (tras el warm-up)
+        self.ready = threading.Event()
+        # Pesos del modelo en memoria (ver unload_model); las decodificaciones esperan
+        self.loaded = threading.Event()
+        self._decode_lock = threading.Lock()
+
+    def load_model(self, progress_callback=None, device="auto",
+                   model_size=MODEL_SIZE, cpu_threads=0, num_workers=1, compute_type=None):
+        """Loads the model once on the device picked by probe_device() (device="auto").
+
+        compute_type overrides the device default (e.g. from an autotune profile).
+        num_workers > 1 lets that many threads decode on the same model at
+        once (CTranslate2 inter_threads), each with cpu_threads intra-op threads.
+        """
+        requested_type = compute_type
+        if device == "auto":
+            with startup.phase("probe"):
+                device, compute_type = probe_device()
+        else:
+            _add_cuda_to_path()
+            compute_type = "float16" if device == "cuda" else "int8"
+        compute_type = requested_type or compute_type
 
-    def load_model(self, progress_callback=None):
-        _add_cuda_to_path()
-        from faster_whisper import WhisperModel
+        with startup.phase("import faster_whisper"):
+            from faster_whisper import WhisperModel
 
         if progress_callback:
-            progress_callback("Cargando modelo Whisper medium...")
+            progress_callback(f"Cargando modelo Whisper {model_size}...")
 
-        try:
-            self._model = WhisperModel(
-                MODEL_SIZE,
-                device="cuda",
-                compute_type="float16",
-            )
-            if progress_callback:
-                progress_callback("Modelo listo (CUDA)")
-        except Exception:
-            # Fallback to CPU if CUDA is not available
-            self._model = WhisperModel(
-                MODEL_SIZE,
+        def create(size):
+            if device == "cuda":
+                return WhisperModel(size, device="cuda", compute_type=compute_type,
+                                    num_workers=num_workers)
+            return WhisperModel(
+                size,
                 device="cpu",
-                compute_type="int8",
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers,
             )
-            if progress_callback:
-                progress_callback("Modelo listo (CPU)")
 
-    def start(self):
+        with startup.phase("modelo"):
+            try:
+                self._model = create(model_size)
+            except Exception as e:
+                if device != "cuda":
+                    raise
+                # Hay GPU pero faltan DLLs de CUDA/cuDNN
+                print(f"[WARN] CUDA no disponible, usando CPU: {e}")
+                device, compute_type = "cpu", "int8"
+                self._model = create(model_size)
+
+        # Precargar los modelos de los niveles de calidad inferiores
+        for size in sorted(self.quality.models if self.quality else ()):
+            if size != model_size and size not in self._fallbacks:
+                if progress_callback:
+                    progress_callback(f"Cargando modelo de respaldo {size}...")
+                with startup.phase(f"modelo {size}"):
+                    self._fallbacks[size] = create(size)
+        self.loaded.set()
+        if progress_callback:
+            progress_callback("Modelo listo (CUDA)" if device == "cuda" else "Modelo listo (CPU)")
+
+    def use_model(self, model, fallbacks=None):
+        """Decodes with an already created model (shared, injected by benchmarks/tests)."""
+        self._model = model
+        self._fallbacks = fallbacks if fallbacks is not None else {}
+        self.loaded.set()
+
+    def _models(self) -> list:
+        return [self._model, *self._fallbacks.values()]
+
+    def unload_model(self, to_cpu=False):
+        """Frees the model weights but keeps the WhisperModel (tokenizer, paths).
+
+        to_cpu=True moves CUDA weights to RAM instead (frees VRAM, reloads
+        faster). Decodes started afterwards wait until reload_model().
+        """
+        with self._decode_lock:
+            self.loaded.clear()
+            _set_loaded(self._models(), False, to_cpu)
+
+    def reload_model(self):
+        """Loads the weights back to their device after unload_model()."""
+        _set_loaded(self._models(), True)
+        self.loaded.set()
+
+    def hold(self, held: bool):
+        """Keeps queued chunks waiting (nothing dropped) while held. See ChunkScheduler.hold."""
+        self._queue.hold(held)
+
+    def warm_up(self):
+        """Runs one decode on synthetic audio so the first real chunk does not pay
+        for kernel selection, allocator growth and graph setup."""
+        t = np.arange(int(WARMUP_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+        audio = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        with startup.phase("warm-up"):
+            for model in [self._model, *self._fallbacks.values()]:
+                try:
+                    segments, _ = model.transcribe(
+                        audio, language=LANGUAGE, beam_size=BEAM_SIZE, vad_filter=False,
+                        word_timestamps=self.streaming, condition_on_previous_text=False,
+                    )
+                    list(segments)
+                except Exception as e:
+                    print(f"[WARN] Warm-up fallo: {e}")
+
+    def start(self, warm_up=False):
+        """Starts the worker thread; with warm_up, it first decodes synthetic audio
+        (chunks enqueued meanwhile wait in the queue)."""
         self._running = True
-        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread = threading.Thread(target=self._run, args=(warm_up,), daemon=True)
         self._thread.start()
 
+    def _run(self, warm_up):
+        if warm_up:
+            self.warm_up()
+        self.ready.set()
+        self._worker()
+
     def stop(self):
         self._running = False
         self._queue.put(None)  # sentinel to unblock the worker
 
-    def enqueue(self, audio: np.ndarray, source: str):
-        self._queue.put((audio, source))
+    def enqueue(self, audio: np.ndarray, source: str, captured_at: float | None = None):
+        """captured_at: time.monotonic() at which the chunk's last sample was captured."""
+        if captured_at is None:
+            captured_at = time.monotonic()
+        self._queue.put((audio, source, captured_at))
+
+    def queue_stats(self) -> dict:
+        """Per-source queue depth and dropped/merged audio counters."""
+        return self._queue.stats()
+
+    def finish(self, source=None):
+        """Commits pending partial text (streaming mode) once capture stops.
+
+        With source, only that source's window (e.g. a source that was removed).
+        """
+        if self.streaming:
+            self._queue.put(_FLUSH if source is None else _Flush(source))
 
     @staticmethod
     def _denoise(audio: np.ndarray) -> np.ndarray:
         """Reduccion de ruido espectral estatico para el microfono (noisereduce)."""
+        t0 = time.perf_counter()
         try:
             import noisereduce as nr
             return nr.reduce_noise(
@@ -84,30 +313,334 @@ class TranscriptionWorker:
         except Exception as e:
             print(f"[WARN] Denoise fallo, usando audio original: {e}")
             return audio
+        finally:
+            metrics.record(STAGE_DENOISE, time.perf_counter() - t0)
 
-    def _worker(self):
-        while self._running:
-            item = self._queue.get()
+    def current_tier(self) -> Tier:
+        return self.quality.tier if self.quality else FIXED_TIER
+
+    def _model_for(self, tier: Tier):
+        return self._fallbacks.get(tier.model, self._model) if tier.model else self._model
+
+    def _observe(self, audio_seconds: float, elapsed: float, captured_at: float | None = None):
+        """Feeds the quality controller with the last decode.
+
+        Chunks give their RTF and the worst queued audio; with captured_at
+        (streaming, where the queue is drained on every step) only how far
+        the decoded audio lags behind capture counts (see
+        QualityController.observe_lag).
+        """
+        if self.quality is None:
+            return
+        if captured_at is not None:
+            self.quality.observe_lag(time.monotonic() - captured_at)
+            return
+        stats = self._queue.stats().values()
+        backlog = max((s["queued_seconds"] for s in stats), default=0.0)
+        self.quality.observe(audio_seconds, elapsed, backlog)
+
+    def _transcribe(self, audio: np.ndarray, tier: Tier | None = None,
+                    new_seconds: float | None = None, captured_at: float | None = None,
+                    **kwargs):
+        """Decodes one chunk or window.
+
+        new_seconds is the audio this decode adds (streaming re-decodes the
+        whole window, but only the new steps count towards the RTF in the
+        metrics), and captured_at the capture time of its newest sample (see
+        _observe).
+        """
+        tier = tier or self.current_tier()
+        with self._decode_lock:
+            self.loaded.wait()      # modelo descargado por inactividad: esperar la recarga
+            t0 = time.perf_counter()
+            segments, _ = self._model_for(tier).transcribe(
+                audio,
+                language=LANGUAGE,
+                beam_size=tier.beam_size,
+                vad_filter=True,
+                vad_parameters=VAD_PARAMETERS,
+                no_speech_threshold=NO_SPEECH_THRESHOLD,
+                log_prob_threshold=LOG_PROB_THRESHOLD,
+                compression_ratio_threshold=COMPRESSION_RATIO_THRESHOLD,
+                **kwargs,
+            )
+            # segments es un generador — consumirlo completo para ejecutar la transcripcion
+            segments = list(segments)
+            elapsed = time.perf_counter() - t0
+        metrics.record(STAGE_TRANSCRIBE, elapsed)
+        audio_seconds = len(audio) / SAMPLE_RATE if new_seconds is None else new_seconds
+        metrics.add_work(audio_seconds, elapsed)
+        self._observe(audio_seconds, elapsed, captured_at)
+        return segments
+
+    def _transcribe_batch(self, audios: list, tier: Tier | None = None) -> list[str]:
+        """Decodes several chunks in one batched pass; returns one text per chunk.
+
+        Gives the same text as decoding each chunk on its own: the batch is
+        transcribe()'s first, temperature 0 attempt (see _decode_batch), and
+        a chunk whose attempt transcribe() would reject (compression ratio
+        or log probability over the thresholds) is decoded again on its own,
+        with the temperature fallback.
+        """
+        tier = tier or self.current_tier()
+        with self._decode_lock:
+            self.loaded.wait()
+            t0 = time.perf_counter()
+            attempts = self._decode_batch(self._model_for(tier), audios, tier.beam_size)
+            elapsed = time.perf_counter() - t0
+        metrics.record(STAGE_TRANSCRIBE, elapsed)
+        audio_seconds = sum(len(a) for a in audios) / SAMPLE_RATE
+        metrics.add_work(audio_seconds, elapsed)
+        self._observe(audio_seconds, elapsed)
+
+        texts = []
+        for audio, attempt in zip(audios, attempts):
+            text = _attempt_text(*attempt) if attempt else ""
+            if text is None:
+                # el audio ya se conto en el lote: el reintento solo suma computo
+                segments = self._transcribe(audio, tier, new_seconds=0.0)
+                text = _join_segments(seg.text for seg in segments)
+            texts.append(text)
+        return texts
+
+    def _decode_batch(self, model, audios: list, beam_size: int) -> list:
+        """transcribe()'s temperature 0 attempt for several chunks in one generate().
+
+        Same VAD (only the speech is kept), prompt with timestamps,
+        suppressed tokens and first-timestamp limit as transcribe(), each
+        chunk in its own 30 s window. Returns per chunk None (no speech) or
+        (segment texts, avg_logprob, compression_ratio, no_speech_prob),
+        computed as faster-whisper does.
+        """
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.transcribe import get_compression_ratio, get_suppressed_tokens
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        vad = VadOptions(**VAD_PARAMETERS)
+        speech = []
+        for audio in audios:
+            stamps = get_speech_timestamps(audio, vad)
+            speech.append(np.concatenate([audio[t["start"]:t["end"]] for t in stamps])
+                          if stamps else None)
+        attempts = [None] * len(audios)
+        idx = [i for i, a in enumerate(speech) if a is not None]
+        if not idx:
+            return attempts
+        tokenizer = Tokenizer(
+            model.hf_tokenizer, model.model.is_multilingual,
+            task="transcribe", language=LANGUAGE,
+        )
+        features = np.stack([
+            pad_or_trim(model.feature_extractor(speech[i])[..., :-1]) for i in idx
+        ])
+        results = model.model.generate(
+            model.encode(features),
+            [model.get_prompt(tokenizer, [], without_timestamps=False)] * len(idx),
+            beam_size=beam_size,
+            max_length=model.max_length,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+            max_initial_timestamp_index=MAX_INITIAL_TIMESTAMP_INDEX,
+            return_scores=True,
+            return_no_speech_prob=True,
+        )
+        for i, res in zip(idx, results):
+            tokens = res.sequences_ids[0]
+            # los tokens de tiempo separan los segmentos, como en transcribe()
+            texts, run = [], []
+            for token in tokens + [tokenizer.timestamp_begin]:
+                if token < tokenizer.eot:
+                    run.append(token)
+                elif run:
+                    texts.append(tokenizer.decode(run))
+                    run = []
+            avg_logprob = res.scores[0] * len(tokens) / (len(tokens) + 1)
+            attempts[i] = (texts, avg_logprob, get_compression_ratio(tokenizer.decode(tokens)),
+                           res.no_speech_prob)
+        return attempts
+
+    def _next_batch(self):
+        """Blocks for one chunk, then gathers up to batch_size within batch_wait_ms.
+
+        Returns None when the stop sentinel is reached.
+        """
+        item = self._queue.get()
+        if item is None:
+            return None
+        items = [item]
+        deadline = time.monotonic() + self.batch_wait_ms / 1000
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
             if item is None:
+                self._queue.put(None)   # procesar el lote y parar en la siguiente vuelta
                 break
-            audio, source = item
-            try:
-                if source == "MIC":
-                    audio = self._denoise(audio)
-
-                segments, _ = self._model.transcribe(
-                    audio,
-                    language="es",
-                    beam_size=5,
-                    vad_filter=True,
-                    vad_parameters=dict(
-                        min_silence_duration_ms=2000,
-                        speech_pad_ms=400,
-                    ),
-                )
-                # segments es un generador — consumirlo completo para ejecutar la transcripcion
-                text = " ".join(seg.text.strip() for seg in segments).strip()
+            items.append(item)
+        return items
+
+    def transcribe_chunks(self, items: list, tier: Tier | None = None) -> list[str]:
+        """Decodes (audio, source, ...) chunks synchronously, one text per chunk ("" if silent).
+
+        Same processing as the worker thread; used directly by the headless
+        tools in transcriber.batch.
+        """
+        texts = [None] * len(items)
+        fps = [None] * len(items)
+        if self.cache is not None:
+            for k, it in enumerate(items):
+                if self.cache.applies(it[1]):
+                    fps[k], texts[k] = self.cache.lookup(it[0])
+        todo = [k for k, text in enumerate(texts) if text is None]
+        audios = [
+            self._denoise(items[k][0]) if items[k][1] in self.denoise_sources else items[k][0]
+            for k in todo
+        ]
+        if len(audios) == 1:
+            decoded = [_join_segments(seg.text for seg in self._transcribe(audios[0], tier))]
+        elif audios:
+            decoded = self._transcribe_batch(audios, tier)
+        else:
+            decoded = []
+        for k, text in zip(todo, decoded):
+            texts[k] = text
+            if fps[k] is not None:
+                self.cache.store(fps[k], text)
+        return texts
+
+    def _process_batch(self, items: list):
+        tier = self.current_tier()
+        try:
+            texts = self.transcribe_chunks(items, tier)
+            for item, text in zip(items, texts):
                 if text:
-                    self.on_result(text, source)
-            except Exception as e:
-                print(f"[ERROR] Transcripcion: {e}")
+                    self.on_result(text, item[1], _chunk_info(item, tier))
+        except Exception as e:
+            print(f"[ERROR] Transcripcion: {e}")
+        if self.on_done:
+            for item in items:
+                self.on_done(item[1])
+
+    def _worker(self):
+        if self.streaming:
+            self._stream_worker()
+            return
+        while self._running:
+            items = self._next_batch()
+            if items is None:
+                break
+            self._process_batch(items)
+
+    # ------------------------------------------------------------------ #
+    #  Streaming                                                          #
+    # ------------------------------------------------------------------ #
+
+    def _stream_worker(self):
+        while self._running:
+            item = self._queue.get()
+            # Drenar todo lo que ya este en cola: si decodificar tarda mas que
+            # un paso, la ventana crece en lugar de acumular pasadas atrasadas.
+            items = [item]
+            while items[-1] is not None:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            flush = set()       # fuentes a confirmar; None = todas
+            folded = []         # fuente de cada paso agregado a su ventana
+            for it in items:
+                if it is None:
+                    return
+                if isinstance(it, _Flush):
+                    flush.add(it.source)
+                    continue
+                audio, source, captured_at = it
+                window = self._windows.get(source)
+                if window is None:
+                    window = self._windows[source] = StreamWindow(source)
+                window.append(audio, captured_at)
+                folded.append(source)
+            decoded = []
+            for window in self._windows.values():
+                final = None in flush or window.source in flush
+                if window.dirty or final:
+                    try:
+                        self._decode_window(window, final=final)
+                    except Exception as e:
+                        print(f"[ERROR] Transcripcion: {e}")
+                    decoded.append(window)
+            # primero los pasos ya incorporados, despues cuanto queda sin confirmar
+            if self.on_done:
+                for source in folded:
+                    self.on_done(source)
+            if self.on_window:
+                for window in decoded:
+                    self.on_window(window.source, len(window.audio))
+
+    def _decode_window(self, window: StreamWindow, final=False):
+        window.dirty = False
+        new_seconds = window.new_samples / SAMPLE_RATE
+        window.new_samples = 0
+        if len(window.audio) == 0:
+            return
+        audio = window.audio
+        fp = None
+        if self.cache is not None and window.silent and not final and self.cache.applies(window.source):
+            fp, text = self.cache.lookup(audio)
+            if text == NON_SPEECH:
+                window.drop_silence()
+                return
+        if window.source in self.denoise_sources:
+            audio = self._denoise(audio)
+        tier = self.current_tier()
+        segments = self._transcribe(
+            audio,
+            tier,
+            new_seconds=new_seconds,
+            captured_at=window.captured_at,
+            word_timestamps=True,
+            initial_prompt=window.prompt or None,
+            condition_on_previous_text=False,
+        )
+        words = [
+            (w.start, w.end, w.word)
+            for seg in segments
+            for w in (seg.words or [])
+            if w.end > 0.05
+        ]
+
+        forced = final or window.seconds >= MAX_WINDOW_SECONDS
+        if not words and not final:
+            if fp is not None:
+                self.cache.store(fp, NON_SPEECH)
+            window.drop_silence()
+            committed, unstable = [], []
+        elif forced:
+            committed, unstable = words, []
+        else:
+            committed, unstable = window.agreement.insert(words)
+
+        window.silent = not unstable
+        # inicio de la ventana en tiempo de captura: los pasos son contiguos hasta su ultimo
+        window_start = window.captured_at - window.seconds
+        text = window.commit(committed)
+        if final or window.seconds >= MAX_WINDOW_SECONDS:
+            window.reset()
+        elif forced:
+            # todo lo decodificado quedo confirmado: la hipotesis previa ya no aplica
+            window.agreement.reset()
+        if text:
+            self.on_result(text, window.source, {
+                "captured_at": window.captured_at,
+                "start": window_start + committed[0][0],
+                "end": window_start + committed[-1][1],
+                "tier": tier.name,
+            })
+        if self.on_partial:
+            self.on_partial(join_words(unstable), window.source)
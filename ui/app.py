@@ -1,8 +1,14 @@
 from datetime import datetime
 from tkinter import filedialog
+from collections import deque
+import queue
+import threading
+import time
 import tkinter as tk
 
 import customtkinter as ctk
+from transcriber.metrics import STAGE_END_TO_END, STAGE_UI, metrics
+from transcriber.transcript import TranscriptStore, replace_range
 from ui.waveform import WaveformWidget
 
 ctk.set_appearance_mode("dark")
@@ -10,25 +16,71 @@ ctk.set_default_color_theme("blue")
 
 MIC_COLOR = "#4FC3F7"
 SISTEMA_COLOR = "#A5D6A7"
+SOURCE_COLORS = {"MIC": MIC_COLOR, "SISTEMA": SISTEMA_COLOR}
+# Colores de las demas fuentes, en orden de alta
+SOURCE_PALETTE = ("#FFB74D", "#CE93D8", "#F48FB1", "#80CBC4", "#FFF176", "#9FA8DA",
+                  "#BCAAA4", "#E6EE9C")
 TIMESTAMP_COLOR = "#555555"
+PARTIAL_COLOR = "#888888"
+
+RENDER_INTERVAL_MS = 50     # cada cuanto se vuelcan los resultados pendientes al textbox
+MAX_VIEW_LINES = 500        # lineas visibles; el historial completo vive en TranscriptStore
+WAVEFORMS_PER_ROW = 4
+ALL_SOURCES = "Conversación"
+
+
+def source_color(name: str, taken) -> str:
+    """Fixed color for MIC/SISTEMA, else the first palette color not in use."""
+    if name in SOURCE_COLORS:
+        return SOURCE_COLORS[name]
+    free = [c for c in SOURCE_PALETTE if c not in taken]
+    return free[0] if free else SOURCE_PALETTE[len(taken) % len(SOURCE_PALETTE)]
 
 
 class App(ctk.CTk):
-    def __init__(self, on_start, on_stop):
+    def __init__(self, on_start, on_stop, store: TranscriptStore | None = None, search=None,
+                 sources=("MIC", "SISTEMA"), on_add_source=None, on_remove_source=None):
         super().__init__()
         self.on_start = on_start
         self.on_stop = on_stop
+        # on_add_source(CaptureSource) / on_remove_source(name): alta y baja en la captura;
+        # sin ellos no hay panel de fuentes
+        self.on_add_source = on_add_source
+        self.on_remove_source = on_remove_source
         self.is_running = False
+        self._colors: dict[str, str] = {}                   # toda fuente vista, con su color
+        self._waveforms: dict[str, WaveformWidget] = {}     # solo las fuentes activas
+        self._sources_panel = None
+        # SearchIndex opcional: habilita el panel de busqueda en sesiones pasadas
+        self._search = search
+        self._search_panel = None
 
         # Almacena los datos raw para exportar sin logs
-        # Cada entrada: {"source": "MIC"|"SISTEMA", "text": "..."}
-        self._entries: list[dict] = []
+        # Cada entrada: {"source": "MIC"|"SISTEMA"|..., "text": "...", "ts": "HH:MM:SS"}
+        # Copiar y guardar toman una instantanea de esta copia en memoria; el journal
+        # opcional (SessionJournal) solo la persiste, y leerlo esperaria al hilo escritor
+        self._store = TranscriptStore()
+        self._journal = store
+        # Resultados que llegan desde otros hilos; se dibujan por lotes en _render
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._refined: queue.SimpleQueue = queue.SimpleQueue()
+        # Entradas en la vista (las ultimas MAX_VIEW_LINES): un refinamiento se aplica
+        # aca en memoria, sin releer el historial del disco en el hilo de Tk
+        self._view: deque = deque(maxlen=MAX_VIEW_LINES)
+        # Texto parcial (aun no confirmado) del modo streaming, por fuente
+        self._partials: dict[str, str] = {}
+        self._partials_lock = threading.Lock()
+        self._partials_dirty = False
 
         self.title("Transcriptor")
         self.geometry("960x680")
         self.minsize(800, 500)
 
         self._build_ui()
+        for name in sources:
+            self.add_source(name)
+        self._show_history()
+        self.after(RENDER_INTERVAL_MS, self._render)
 
     # ------------------------------------------------------------------ #
     #  UI                                                                  #
@@ -55,15 +107,17 @@ class App(ctk.CTk):
         )
         self.status_label.pack(side="right", padx=20)
 
-        # ---- waveforms ----
-        wf_frame = ctk.CTkFrame(self, fg_color="transparent")
-        wf_frame.pack(fill="x", padx=16, pady=(8, 0))
-
-        self._wf_mic = WaveformWidget(wf_frame, color=MIC_COLOR, label="MIC")
-        self._wf_mic.pack(side="left", fill="both", expand=True, padx=(0, 4))
+        self.stats_label = ctk.CTkLabel(
+            header,
+            text="",
+            text_color="#888",
+            font=ctk.CTkFont(family="Consolas", size=11),
+        )
+        self.stats_label.pack(side="right", padx=(0, 8))
 
-        self._wf_sys = WaveformWidget(wf_frame, color=SISTEMA_COLOR, label="SISTEMA")
-        self._wf_sys.pack(side="left", fill="both", expand=True)
+        # ---- waveforms (una por fuente activa, ver add_source) ----
+        self._wf_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self._wf_frame.pack(fill="x", padx=16, pady=(8, 0))
 
         # ---- transcript ----
         self.textbox = ctk.CTkTextbox(
@@ -75,10 +129,18 @@ class App(ctk.CTk):
         )
         self.textbox.pack(fill="both", expand=True, padx=16, pady=8)
 
-        self.textbox.tag_config("MIC", foreground=MIC_COLOR)
-        self.textbox.tag_config("SISTEMA", foreground=SISTEMA_COLOR)
         self.textbox.tag_config("ts", foreground=TIMESTAMP_COLOR)
 
+        self.partial_label = ctk.CTkLabel(
+            self,
+            text="",
+            anchor="w",
+            justify="left",
+            text_color=PARTIAL_COLOR,
+            font=ctk.CTkFont(family="Consolas", size=12, slant="italic"),
+        )
+        self.partial_label.pack(fill="x", padx=20, pady=(0, 4))
+
         # ---- fila 1: control ----
         row1 = ctk.CTkFrame(self, height=48, corner_radius=0, fg_color="transparent")
         row1.pack(fill="x", padx=16, pady=(0, 4))
@@ -96,75 +158,47 @@ class App(ctk.CTk):
             command=self._clear,
         ).pack(side="left")
 
+        if self._search is not None:
+            ctk.CTkButton(
+                row1, text="Buscar", width=90, height=36,
+                fg_color="transparent", border_width=1,
+                command=self._open_search,
+            ).pack(side="left", padx=(8, 0))
+            self.bind("<Control-f>", lambda _e: self._open_search())
+
+        if self.on_add_source is not None:
+            ctk.CTkButton(
+                row1, text="Fuentes", width=90, height=36,
+                fg_color="transparent", border_width=1,
+                command=self._open_sources,
+            ).pack(side="left", padx=(8, 0))
+
         # ---- fila 2: copiar / guardar ----
         row2 = ctk.CTkFrame(self, height=48, corner_radius=0, fg_color="transparent")
         row2.pack(fill="x", padx=16, pady=(0, 10))
         row2.pack_propagate(False)
 
-        # separador visual
-        ctk.CTkLabel(row2, text="Copiar:", font=ctk.CTkFont(size=11),
-                     text_color="#888").pack(side="left", padx=(0, 6))
-
-        ctk.CTkButton(
-            row2, text="MIC", width=72, height=32,
-            fg_color="transparent", border_width=1,
-            border_color=MIC_COLOR, text_color=MIC_COLOR,
-            command=lambda: self._copy("MIC"),
-        ).pack(side="left", padx=(0, 4))
-
-        ctk.CTkButton(
-            row2, text="SISTEMA", width=88, height=32,
-            fg_color="transparent", border_width=1,
-            border_color=SISTEMA_COLOR, text_color=SISTEMA_COLOR,
-            command=lambda: self._copy("SISTEMA"),
-        ).pack(side="left", padx=(0, 4))
-
-        ctk.CTkButton(
-            row2, text="Conversación", width=110, height=32,
-            fg_color="transparent", border_width=1,
-            command=lambda: self._copy(None),
-        ).pack(side="left", padx=(0, 20))
-
-        ctk.CTkLabel(row2, text="Guardar:", font=ctk.CTkFont(size=11),
+        ctk.CTkLabel(row2, text="Fuente:", font=ctk.CTkFont(size=11),
                      text_color="#888").pack(side="left", padx=(0, 6))
 
-        ctk.CTkButton(
-            row2, text="MIC", width=72, height=32,
-            fg_color="transparent", border_width=1,
-            border_color=MIC_COLOR, text_color=MIC_COLOR,
-            command=lambda: self._save("MIC"),
-        ).pack(side="left", padx=(0, 4))
+        self._export_var = ctk.StringVar(value=ALL_SOURCES)
+        self._export_menu = ctk.CTkOptionMenu(
+            row2, values=[ALL_SOURCES], variable=self._export_var, width=140, height=32,
+        )
+        self._export_menu.pack(side="left", padx=(0, 8))
 
         ctk.CTkButton(
-            row2, text="SISTEMA", width=88, height=32,
+            row2, text="Copiar", width=90, height=32,
             fg_color="transparent", border_width=1,
-            border_color=SISTEMA_COLOR, text_color=SISTEMA_COLOR,
-            command=lambda: self._save("SISTEMA"),
+            command=lambda: self._copy(self._export_filter()),
         ).pack(side="left", padx=(0, 4))
 
         ctk.CTkButton(
-            row2, text="Conversación", width=110, height=32,
+            row2, text="Guardar", width=90, height=32,
             fg_color="transparent", border_width=1,
-            command=lambda: self._save(None),
+            command=lambda: self._save(self._export_filter()),
         ).pack(side="left")
 
-    # ------------------------------------------------------------------ #
-    #  Helpers de datos                                                    #
-    # ------------------------------------------------------------------ #
-
-    def _build_clean_text(self, source_filter: str | None) -> str:
-        """
-        Construye texto limpio (sin timestamps ni logs) para copiar/guardar.
-        - source_filter="MIC" o "SISTEMA": solo esa fuente, texto plano.
-        - source_filter=None: conversación completa con etiqueta mínima (MIC: / SISTEMA:).
-        """
-        if source_filter:
-            lines = [e["text"] for e in self._entries if e["source"] == source_filter]
-            return "\n".join(lines)
-        else:
-            lines = [f"{e['source']}: {e['text']}" for e in self._entries]
-            return "\n".join(lines)
-
     # ------------------------------------------------------------------ #
     #  Callbacks                                                           #
     # ------------------------------------------------------------------ #
@@ -179,28 +213,83 @@ class App(ctk.CTk):
             self.is_running = False
             self.toggle_btn.configure(text="▶  Iniciar", fg_color=("#3B8ED0", "#1F6AA5"))
             self.set_status("● Detenido", "#EF5350")
-            self._wf_mic.clear()
-            self._wf_sys.clear()
+            for wf in self._waveforms.values():
+                wf.clear()
             self.on_stop()
 
     def _clear(self):
-        self._entries.clear()
-        self._wf_mic.clear()
-        self._wf_sys.clear()
+        self._store.clear()
+        if self._journal is not None:
+            self._journal.clear()
+        with self._partials_lock:
+            self._partials.clear()
+            self._partials_dirty = False
+        self._view.clear()
+        self.partial_label.configure(text="")
+        for wf in self._waveforms.values():
+            wf.clear()
         self.textbox.configure(state="normal")
         self.textbox.delete("1.0", "end")
         self.textbox.configure(state="disabled")
 
+    def _open_search(self):
+        if self._search_panel is not None and self._search_panel.winfo_exists():
+            self._search_panel.focus()
+            return
+        from ui.search_panel import SearchPanel
+        self._search_panel = SearchPanel(self, self._search, dict(self._colors))
+
+    def _open_sources(self):
+        if self._sources_panel is not None and self._sources_panel.winfo_exists():
+            self._sources_panel.focus()
+            return
+        from ui.sources_panel import SourcesPanel
+        self._sources_panel = SourcesPanel(
+            self, self._request_add_source, self._request_remove_source,
+            lambda: [(name, self._colors[name]) for name in self._waveforms],
+        )
+
+    def _request_add_source(self, source):
+        """Desde el panel: ValueError si el nombre ya esta en uso."""
+        self.on_add_source(source)
+        self.add_source(source.name)
+
+    def _request_remove_source(self, name: str):
+        self.on_remove_source(name)
+        self.remove_source(name)
+
+    def _export_filter(self) -> str | None:
+        value = self._export_var.get()
+        return None if value == ALL_SOURCES else value
+
+    def _register_source(self, name: str):
+        """Gives a source its color: text tag and entry in the export menu."""
+        color = source_color(name, self._colors.values())
+        self._colors[name] = color
+        self.textbox.tag_config(name, foreground=color)
+        self._export_menu.configure(values=[ALL_SOURCES, *self._colors])
+
+    def _layout_waveforms(self):
+        # Hasta WAVEFORMS_PER_ROW por fila, repartiendo el ancho entre las columnas usadas
+        cols = min(len(self._waveforms), WAVEFORMS_PER_ROW)
+        for col in range(WAVEFORMS_PER_ROW):
+            self._wf_frame.grid_columnconfigure(col, weight=1 if col < cols else 0,
+                                                uniform="wf" if col < cols else "")
+        for i, wf in enumerate(self._waveforms.values()):
+            row, col = divmod(i, WAVEFORMS_PER_ROW)
+            wf.grid(row=row, column=col, sticky="nsew", padx=(0 if col == 0 else 4, 0),
+                    pady=(0 if row == 0 else 4, 0))
+
     def _copy(self, source_filter: str | None):
-        text = self._build_clean_text(source_filter)
+        # El portapapeles de Tk necesita un solo string: se arma en una pasada
+        text = "\n".join(self._store.snapshot().iter_lines(source_filter))
         if not text:
             return
         self.clipboard_clear()
         self.clipboard_append(text)
 
     def _save(self, source_filter: str | None):
-        text = self._build_clean_text(source_filter)
-        if not text:
+        if not len(self._store):
             return
         if source_filter:
             default_name = f"transcripcion_{source_filter.lower()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
@@ -212,35 +301,155 @@ class App(ctk.CTk):
             initialfile=default_name,
         )
         if path:
+            # Escribir en segundo plano para no congelar la ventana con historiales largos
+            threading.Thread(
+                target=self._write_file, args=(self._store.snapshot(), path, source_filter),
+                daemon=True,
+            ).start()
+
+    def _write_file(self, store: TranscriptStore, path: str, source_filter: str | None):
+        try:
             with open(path, "w", encoding="utf-8") as f:
-                f.write(text)
-
-    # ------------------------------------------------------------------ #
-    #  Public API                                                          #
-    # ------------------------------------------------------------------ #
-
-    def append_text(self, text: str, source: str):
-        # Guardar raw para exportar
-        self._entries.append({"source": source, "text": text})
+                n = store.write_to(f, source_filter)
+        except OSError as e:
+            print(f"[ERROR] No se pudo guardar {path}: {e}")
+            return
+        print(f"[OK] {n} lineas guardadas en {path}")
 
+    def _insert_line(self, ts: str, source: str, text: str):
         # Mostrar en UI con logs (timestamp + fuente coloreada)
-        ts = datetime.now().strftime("%H:%M:%S")
-        self.textbox.configure(state="normal")
+        if source not in self._colors:
+            self._register_source(source)     # fuente ya quitada o de una sesion recuperada
         self.textbox.insert("end", f"[{ts}] ", "ts")
         self.textbox.insert("end", f"[{source}] ", source)
         self.textbox.insert("end", f"{text}\n")
+
+    def _show_history(self):
+        """Carga la sesion recuperada del journal y muestra sus ultimas MAX_VIEW_LINES."""
+        if self._journal is None or not len(self._journal):
+            return
+        # Al arrancar el hilo escritor no tiene nada pendiente: leer no espera
+        for entry in self._journal.iter_entries():
+            self._store.append(entry)
+        self._view.extend(self._store.iter_entries())
+        self._redraw_view()
+
+    def _redraw_view(self):
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        for e in self._view:
+            self._insert_line(e.get("ts") or "--:--:--", e["source"], e["text"])
         self.textbox.see("end")
         self.textbox.configure(state="disabled")
 
-    def push_waveform(self, audio, source: str):
-        if source == "MIC":
-            self._wf_mic.push_audio(audio)
-        else:
-            self._wf_sys.push_audio(audio)
+    def _render(self):
+        """Vuelca a la vista todos los resultados pendientes de una vez."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+
+        if batch:
+            self.textbox.configure(state="normal")
+            excess = len(self._view) + len(batch) - MAX_VIEW_LINES
+            now = time.monotonic()
+            wall = time.time()
+            ts = datetime.now().strftime("%H:%M:%S")
+            for text, source, info, posted in batch:
+                entry = {"source": source, "text": text, "ts": ts}
+                metrics.record(STAGE_UI, now - posted)
+                if info and info.get("captured_at") is not None:
+                    metrics.record(STAGE_END_TO_END, now - info["captured_at"])
+                    # tiempos de captura (monotonic) -> hora de pared, como el archivo de audio
+                    for key in ("captured_at", "start", "end"):
+                        if info.get(key) is not None:
+                            entry[key] = wall - (now - info[key])
+                self._store.append(entry)
+                if self._journal is not None:
+                    self._journal.append(entry)
+                self._view.append(entry)
+                self._insert_line(ts, source, text)
+            if excess > 0:
+                self.textbox.delete("1.0", f"{excess + 1}.0")
+            self.textbox.see("end")
+            self.textbox.configure(state="disabled")
+
+        refined = False
+        while True:
+            try:
+                source, start, end, entries = self._refined.get_nowait()
+            except queue.Empty:
+                break
+            self._store.replace(source, start, end, entries)
+            if self._journal is not None:
+                self._journal.replace(source, start, end, entries)
+            view, changed = replace_range(list(self._view), source, start, end, entries)
+            if changed:
+                self._view = deque(view, maxlen=MAX_VIEW_LINES)
+                refined = True
+        if refined:
+            # Las lineas reemplazadas estaban en la vista: redibujarla desde memoria
+            self._redraw_view()
+
+        if self._partials_dirty:
+            with self._partials_lock:
+                text = "   ".join(f"[{s}] {t}" for s, t in self._partials.items() if t)
+                self._partials_dirty = False
+            self.partial_label.configure(text=text)
+
+        self.after(RENDER_INTERVAL_MS, self._render)
+
+    # ------------------------------------------------------------------ #
+    #  Public API                                                          #
+    # ------------------------------------------------------------------ #
+
+    def post_result(self, text: str, source: str, info: dict | None = None):
+        """Encola un resultado confirmado. Se puede llamar desde otro hilo."""
+        self._results.put((text, source, info, time.monotonic()))
+
+    def post_refined(self, source: str, start: float, end: float, entries: list[dict]):
+        """Reemplaza los resultados de una fuente capturados en (start, end]. Desde cualquier hilo."""
+        self._refined.put((source, start, end, entries))
+
+    def append_text(self, text: str, source: str):
+        self.post_result(text, source)
+
+    def set_partial(self, text: str, source: str):
+        """Texto aun no confirmado de una fuente (modo streaming). Se puede llamar desde otro hilo."""
+        with self._partials_lock:
+            self._partials[source] = text
+            self._partials_dirty = True
+
+    def push_waveform(self, peaks, source: str):
+        """Picos (min, max) decimados en la captura. Se puede llamar desde otro hilo."""
+        wf = self._waveforms.get(source)
+        if wf is not None:
+            wf.push_envelope(peaks)
+
+    def add_source(self, name: str):
+        """Shows a waveform for a capture source (Tk thread)."""
+        if name in self._waveforms:
+            return
+        if name not in self._colors:
+            self._register_source(name)
+        self._waveforms[name] = WaveformWidget(self._wf_frame, color=self._colors[name], label=name)
+        self._layout_waveforms()
+
+    def remove_source(self, name: str):
+        """Drops a source's waveform; its lines keep their color (Tk thread)."""
+        wf = self._waveforms.pop(name, None)
+        if wf is not None:
+            wf.destroy()
+            self._layout_waveforms()
 
     def set_status(self, text: str, color: str = "#E0E0E0"):
         self.status_label.configure(text=text, text_color=color)
 
+    def set_stats(self, text: str):
+        self.stats_label.configure(text=text)
+
     def set_ready(self):
         self.toggle_btn.configure(state="normal")
         self.set_status("● Listo", "#66BB6A")
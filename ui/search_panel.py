@@ -0,0 +1,97 @@
+import time
+
+import customtkinter as ctk
+
+from transcriber.search import HIGHLIGHT_END, HIGHLIGHT_START, SearchIndex
+
+SEARCH_DELAY_MS = 200       # espera tras la ultima tecla antes de buscar
+CONTEXT_COLOR = "#777777"
+MATCH_COLOR = "#FFD54F"
+
+
+class SearchPanel(ctk.CTkToplevel):
+    """Window that searches every indexed session as you type."""
+
+    def __init__(self, parent, index: SearchIndex, colors: dict[str, str]):
+        super().__init__(parent)
+        self.index = index
+        self._pending = None
+
+        self.title("Buscar en sesiones")
+        self.geometry("820x560")
+
+        top = ctk.CTkFrame(self, fg_color="transparent")
+        top.pack(fill="x", padx=12, pady=(12, 6))
+
+        self.entry = ctk.CTkEntry(top, placeholder_text="Palabras a buscar...", height=34)
+        self.entry.pack(side="left", fill="x", expand=True, padx=(0, 8))
+        self.entry.bind("<KeyRelease>", self._schedule)
+        self.entry.bind("<Return>", lambda _e: self._search())
+
+        self.source_var = ctk.StringVar(value="Todas")
+        ctk.CTkOptionMenu(
+            top, values=["Todas", *colors], variable=self.source_var, width=110,
+            command=lambda _v: self._search(),
+        ).pack(side="left")
+
+        self.info_label = ctk.CTkLabel(self, text="", anchor="w", text_color="#888",
+                                       font=ctk.CTkFont(size=11))
+        self.info_label.pack(fill="x", padx=16)
+
+        self.results = ctk.CTkTextbox(
+            self, font=ctk.CTkFont(family="Consolas", size=12), wrap="word", state="disabled",
+        )
+        self.results.pack(fill="both", expand=True, padx=12, pady=(4, 12))
+        self.results.tag_config("session", foreground="#E0E0E0")
+        self.results.tag_config("context", foreground=CONTEXT_COLOR)
+        self.results.tag_config("match", foreground=MATCH_COLOR)
+        for source, color in colors.items():
+            self.results.tag_config(source, foreground=color)
+
+        self.entry.focus_set()
+
+    def _schedule(self, _event=None):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(SEARCH_DELAY_MS, self._search)
+
+    def _search(self):
+        self._pending = None
+        source = self.source_var.get()
+        t0 = time.perf_counter()
+        hits = self.index.search(self.entry.get(), source=None if source == "Todas" else source)
+        elapsed = (time.perf_counter() - t0) * 1000
+
+        self.results.configure(state="normal")
+        self.results.delete("1.0", "end")
+        session = None
+        for hit in hits:
+            if hit["session"] != session:
+                session = hit["session"]
+                self.results.insert("end", f"── {hit['started'] or session} ──\n", "session")
+            for line in hit["before"]:
+                self._insert_context(line)
+            self.results.insert("end", f"[{hit['ts'] or '--:--:--'}] ", "context")
+            self.results.insert("end", f"[{hit['source']}] ", hit["source"])
+            self._insert_marked(hit["text"])
+            for line in hit["after"]:
+                self._insert_context(line)
+            self.results.insert("end", "\n")
+        self.results.configure(state="disabled")
+        if self.entry.get().strip():
+            self.info_label.configure(text=f"{len(hits)} resultados en {elapsed:.0f} ms")
+        else:
+            self.info_label.configure(text="")
+
+    def _insert_context(self, line: dict):
+        self.results.insert("end", f"[{line['ts'] or '--:--:--'}] [{line['source']}] {line['text']}\n",
+                            "context")
+
+    def _insert_marked(self, text: str):
+        # highlight() de FTS5 delimita los terminos encontrados
+        for i, part in enumerate(text.split(HIGHLIGHT_START)):
+            term, _, rest = part.partition(HIGHLIGHT_END) if i else ("", "", part)
+            if term:
+                self.results.insert("end", term, "match")
+            self.results.insert("end", rest)
+        self.results.insert("end", "\n")
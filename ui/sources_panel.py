@@ -0,0 +1,119 @@
+import os
+from tkinter import filedialog
+
+import customtkinter as ctk
+
+from transcriber.sources import (
+    KIND_INPUT, KIND_LOOPBACK, FileCaptureSource, InputSource, LoopbackSource, list_devices,
+    parse_source,
+)
+
+KIND_LABELS = {KIND_INPUT: "Entrada", KIND_LOOPBACK: "Salida"}
+ERROR_COLOR = "#EF5350"
+NAME_CHARS = 24             # nombre por defecto: el del dispositivo, recortado
+
+
+class SourcesPanel(ctk.CTkToplevel):
+    """Window to attach devices, files or pipes to the capture, and to detach them.
+
+    on_add(source) gets a CaptureSource and raises ValueError if its name is
+    taken; on_remove(name) detaches one; list_sources() returns the active
+    (name, color) pairs.
+    """
+
+    def __init__(self, parent, on_add, on_remove, list_sources):
+        super().__init__(parent)
+        self.on_add = on_add
+        self.on_remove = on_remove
+        self.list_sources = list_sources
+
+        self.title("Fuentes de audio")
+        self.geometry("620x480")
+
+        ctk.CTkLabel(self, text="Activas", font=ctk.CTkFont(size=13, weight="bold"),
+                     anchor="w").pack(fill="x", padx=16, pady=(12, 4))
+        self._active = ctk.CTkScrollableFrame(self, height=160)
+        self._active.pack(fill="both", expand=True, padx=12)
+
+        ctk.CTkLabel(self, text="Agregar", font=ctk.CTkFont(size=13, weight="bold"),
+                     anchor="w").pack(fill="x", padx=16, pady=(12, 4))
+
+        self.name_entry = ctk.CTkEntry(self, placeholder_text="Nombre (opcional)", height=32)
+        self.name_entry.pack(fill="x", padx=12, pady=(0, 6))
+
+        row = ctk.CTkFrame(self, fg_color="transparent")
+        row.pack(fill="x", padx=12, pady=(0, 6))
+        self._devices = {f"{KIND_LABELS[kind]}: {label}": (kind, device, label)
+                         for kind, device, label in list_devices()}
+        self.device_var = ctk.StringVar(value=next(iter(self._devices), "Sin dispositivos"))
+        ctk.CTkOptionMenu(row, values=list(self._devices) or ["Sin dispositivos"],
+                          variable=self.device_var, width=380).pack(side="left", padx=(0, 8))
+        ctk.CTkButton(row, text="Agregar", width=90, command=self._add_device,
+                      state="normal" if self._devices else "disabled").pack(side="left")
+
+        row = ctk.CTkFrame(self, fg_color="transparent")
+        row.pack(fill="x", padx=12, pady=(0, 6))
+        ctk.CTkButton(row, text="Archivo...", width=90, fg_color="transparent", border_width=1,
+                      command=self._add_file).pack(side="left", padx=(0, 8))
+        self.spec_entry = ctk.CTkEntry(row, placeholder_text="pipe:Mezcla=-,48000,2,s16", height=32)
+        self.spec_entry.pack(side="left", fill="x", expand=True, padx=(0, 8))
+        self.spec_entry.bind("<Return>", lambda _e: self._add_spec())
+        ctk.CTkButton(row, text="Agregar", width=90, command=self._add_spec).pack(side="left")
+
+        self.info_label = ctk.CTkLabel(self, text="", anchor="w", text_color="#888",
+                                       font=ctk.CTkFont(size=11))
+        self.info_label.pack(fill="x", padx=16, pady=(0, 10))
+
+        self._refresh()
+
+    def _refresh(self):
+        for child in self._active.winfo_children():
+            child.destroy()
+        for name, color in self.list_sources():
+            row = ctk.CTkFrame(self._active, fg_color="transparent")
+            row.pack(fill="x", pady=2)
+            ctk.CTkLabel(row, text=f"● {name}", text_color=color, anchor="w").pack(
+                side="left", fill="x", expand=True, padx=(4, 0))
+            ctk.CTkButton(row, text="Quitar", width=72, height=28,
+                          fg_color="transparent", border_width=1,
+                          command=lambda n=name: self._remove(n)).pack(side="right")
+
+    def _name(self, default: str) -> str:
+        return self.name_entry.get().strip() or default[:NAME_CHARS].strip()
+
+    def _add(self, source):
+        try:
+            self.on_add(source)
+        except ValueError as e:
+            self.info_label.configure(text=str(e), text_color=ERROR_COLOR)
+            return
+        self.info_label.configure(text=f"{source.name} agregada", text_color="#888")
+        self.name_entry.delete(0, "end")
+        self._refresh()
+
+    def _add_device(self):
+        kind, device, label = self._devices[self.device_var.get()]
+        cls = InputSource if kind == KIND_INPUT else LoopbackSource
+        self._add(cls(self._name(label), device))
+
+    def _add_file(self):
+        path = filedialog.askopenfilename(
+            parent=self, filetypes=[("Audio", "*.wav *.flac"), ("Todos", "*.*")],
+        )
+        if path:
+            self._add(FileCaptureSource(self._name(os.path.splitext(os.path.basename(path))[0]),
+                                        path))
+
+    def _add_spec(self):
+        try:
+            source = parse_source(self.spec_entry.get())
+        except ValueError as e:
+            self.info_label.configure(text=str(e), text_color=ERROR_COLOR)
+            return
+        self.spec_entry.delete(0, "end")
+        self._add(source)
+
+    def _remove(self, name: str):
+        self.on_remove(name)
+        self.info_label.configure(text=f"{name} quitada", text_color="#888")
+        self._refresh()
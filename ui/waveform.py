@@ -1,10 +1,27 @@
-import collections
+import threading
 import tkinter as tk
 
 import numpy as np
 import customtkinter as ctk
 
 
+def bar_coords(peaks: np.ndarray, w: int, h: int) -> np.ndarray:
+    """Rectangle coords (n, 4) for n (min, max) peaks in a w x h canvas.
+
+    Bars are auto-scaled to the loudest peak (at least 0.01).
+    """
+    n = len(peaks)
+    cy = h // 2 if h > 1 else 26
+    bar_w = max(1, (w - n) // n)
+    peak = max(float(np.abs(peaks).max()), 0.01)
+    scale = (cy - 2) / peak
+
+    x0 = np.arange(n) * (bar_w + 1)
+    top = np.maximum(1, (np.maximum(peaks[:, 1], 0) * scale).astype(int))
+    bottom = np.maximum(1, (np.maximum(-peaks[:, 0], 0) * scale).astype(int))
+    return np.stack([x0, cy - top, x0 + bar_w, cy + bottom], axis=1)
+
+
 class WaveformWidget(ctk.CTkFrame):
     _BAR_COUNT = 80
     _UPDATE_MS = 50
@@ -15,8 +32,14 @@ class WaveformWidget(ctk.CTkFrame):
         super().__init__(parent, **kwargs)
 
         self._color = color
-        self._buffer = collections.deque(maxlen=8192)
+        # Ring de picos (min, max) que llegan ya decimados desde el DSP
+        self._peaks = np.zeros((self._BAR_COUNT, 2), dtype=np.float32)
+        self._pos = 0
+        self._lock = threading.Lock()
         self._active = False
+        self._dirty = True
+        self._size = (0, 0)
+        self._after_id = None
 
         ctk.CTkLabel(
             self,
@@ -30,53 +53,62 @@ class WaveformWidget(ctk.CTkFrame):
         )
         self._canvas.pack(fill="both", expand=True, padx=6, pady=(2, 6))
 
+        # Items creados una sola vez; _animate solo mueve sus coordenadas
+        self._baseline = self._canvas.create_line(0, 0, 0, 0, fill="#1a1a2e", width=1)
+        self._bars = [
+            self._canvas.create_rectangle(0, 0, 0, 0, fill=color, outline="",
+                                          state="hidden", tags="bar")
+            for _ in range(self._BAR_COUNT)
+        ]
+
         self._animate()
 
-    def push_audio(self, audio: np.ndarray):
-        self._buffer.extend(audio.tolist())
-        self._active = True
+    def push_envelope(self, peaks: np.ndarray):
+        """Adds (min, max) peaks. Safe to call from the capture thread (no Tk calls)."""
+        with self._lock:
+            peaks = peaks[-self._BAR_COUNT:]
+            n = len(peaks)
+            end = self._pos + n
+            if end <= self._BAR_COUNT:
+                self._peaks[self._pos:end] = peaks
+            else:
+                split = self._BAR_COUNT - self._pos
+                self._peaks[self._pos:] = peaks[:split]
+                self._peaks[:n - split] = peaks[split:]
+            self._pos = end % self._BAR_COUNT
+            self._active = True
+            self._dirty = True
+
+    def destroy(self):
+        # fuente quitada en caliente: cortar el ciclo de _animate antes de destruir el canvas
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
 
     def clear(self):
-        self._buffer.clear()
-        self._active = False
+        with self._lock:
+            self._peaks[:] = 0
+            self._active = False
+            self._dirty = True
 
     def _animate(self):
         canvas = self._canvas
         w = canvas.winfo_width()
         h = canvas.winfo_height()
-        canvas.delete("all")
-
-        cy = h // 2 if h > 1 else 26
-
-        if w <= 1:
-            self.after(self._UPDATE_MS, self._animate)
-            return
-
-        # linea base
-        canvas.create_line(0, cy, w, cy, fill="#1a1a2e", width=1)
-
-        samples = list(self._buffer)
-        if samples and self._active:
-            n = self._BAR_COUNT
-            bar_w = max(1, (w - n) // n)
-            chunk_size = max(1, len(samples) // n)
-
-            amps = []
-            for i in range(n):
-                sl = samples[i * chunk_size: (i + 1) * chunk_size]
-                amps.append(float(np.max(np.abs(sl))) if sl else 0.0)
-
-            peak = max(amps) if max(amps) > 0.01 else 0.01
-            scale = (cy - 2) / peak
-
-            for i, amp in enumerate(amps):
-                x = i * (bar_w + 1)
-                bh = max(1, int(amp * scale))
-                # barra simetrica top/bottom
-                canvas.create_rectangle(
-                    x, cy - bh,
-                    x + bar_w, cy + bh,
-                    fill=self._color, outline="",
-                )
-
-        self.after(self._UPDATE_MS, self._animate)
+
+        if w > 1 and (self._dirty or (w, h) != self._size):
+            with self._lock:
+                peaks = np.roll(self._peaks, -self._pos, axis=0)
+                active = self._active
+                self._dirty = False
+            self._size = (w, h)
+
+            cy = h // 2 if h > 1 else 26
+            canvas.coords(self._baseline, 0, cy, w, cy)
+            if active:
+                for item, (x0, y0, x1, y1) in zip(self._bars, bar_coords(peaks, w, h).tolist()):
+                    canvas.coords(item, x0, y0, x1, y1)
+            canvas.itemconfigure("bar", state="normal" if active else "hidden")
+
+        self._after_id = self.after(self._UPDATE_MS, self._animate)